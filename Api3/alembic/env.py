@@ -1,5 +1,4 @@
 from logging.config import fileConfig
-import os
 import sys
 from pathlib import Path
 
@@ -23,10 +22,9 @@ from app.models.video import *
 # this is the Alembic Config object
 config = context.config
 
-# Set SQLite URL from env var, with a default
-config.set_main_option('sqlalchemy.url', os.getenv(
-    'DATABASE_URL', 'sqlite:///edu_platform.db'
-))
+# Same database as the app (DATABASE_URL from the environment or .env)
+from app.config import get_settings
+config.set_main_option('sqlalchemy.url', get_settings().DATABASE_URL.replace('%', '%%'))
 
 # Interpret the config file for Python logging
 if config.config_file_name is not None:
@@ -35,6 +33,11 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave the full-text search tables (created by raw DDL, see app/utils/search.py) out of autogenerate"""
+    return not (type_ == "table" and reflected and compare_to is None and "_fts" in name)
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -51,6 +54,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -75,7 +79,8 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
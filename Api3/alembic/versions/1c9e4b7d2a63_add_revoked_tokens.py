@@ -0,0 +1,41 @@
+"""add_revoked_tokens
+
+Revision ID: 1c9e4b7d2a63
+Revises: e7b3d9a4c218
+Create Date: 2026-10-17 01:10:42.183557
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c9e4b7d2a63'
+down_revision: Union[str, None] = 'e7b3d9a4c218'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'revoked_tokens',
+        sa.Column('token_digest', sa.String(length=64), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('token_digest')
+    )
+    op.create_index('ix_revoked_tokens_email', 'revoked_tokens', ['email'], unique=False)
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'], unique=False)
+    op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens', ['revoked_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_revoked_tokens_revoked_at', table_name='revoked_tokens')
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    op.drop_index('ix_revoked_tokens_email', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
@@ -0,0 +1,49 @@
+"""extend_student_listing_indexes
+
+Revision ID: 995ada4187cc
+Revises: 1c9e4b7d2a63
+Create Date: 2026-10-17 01:40:12.508314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '995ada4187cc'
+down_revision: Union[str, None] = '1c9e4b7d2a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The keyset sort columns follow the equality prefix, so /result and /books/active page without sorting
+    op.create_index(
+        'ix_evaluator_submissions_evaluator_student_date_id',
+        'evaluator_submissions',
+        ['evaluator_id', 'student_username', 'submission_date', 'id'],
+        unique=False
+    )
+    op.drop_index('ix_evaluator_submissions_evaluator_id_student_username', table_name='evaluator_submissions')
+    op.create_index(
+        'ix_book_lendings_username_is_active_borrow_date_id',
+        'book_lendings',
+        ['username', 'is_active', 'borrow_date', 'id'],
+        unique=False
+    )
+    op.drop_index('ix_book_lendings_username_is_active', table_name='book_lendings')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_book_lendings_username_is_active', 'book_lendings', ['username', 'is_active'], unique=False)
+    op.drop_index('ix_book_lendings_username_is_active_borrow_date_id', table_name='book_lendings')
+    op.create_index(
+        'ix_evaluator_submissions_evaluator_id_student_username',
+        'evaluator_submissions',
+        ['evaluator_id', 'student_username'],
+        unique=False
+    )
+    op.drop_index('ix_evaluator_submissions_evaluator_student_date_id', table_name='evaluator_submissions')
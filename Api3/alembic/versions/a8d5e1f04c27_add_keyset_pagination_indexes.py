@@ -0,0 +1,59 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: a8d5e1f04c27
+Revises: f3a9c2d17b64
+Create Date: 2026-10-17 00:52:40.671902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d5e1f04c27'
+down_revision: Union[str, None] = 'f3a9c2d17b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, timestamp column) pairs that list endpoints page through
+PAGINATED_TABLES = [
+    ('evaluators', 'created_at'),
+    ('evaluator_submissions', 'submission_date'),
+    ('books', 'created_at'),
+    ('book_lendings', 'borrow_date'),
+    ('video_lectures', 'created_at'),
+    ('bulk_evaluation_runs', 'created_at'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Cursors compare (timestamp, id), which never matches a NULL timestamp
+    for table, column in PAGINATED_TABLES:
+        op.execute(sa.text(f"UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE {column} IS NULL"))
+    op.create_index('ix_evaluators_created_at_id', 'evaluators', ['created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_evaluator_submissions_evaluator_id_submission_date_id',
+        'evaluator_submissions',
+        ['evaluator_id', 'submission_date', 'id'],
+        unique=False
+    )
+    op.create_index('ix_books_created_at_id', 'books', ['created_at', 'id'], unique=False)
+    op.create_index('ix_video_lectures_created_at_id', 'video_lectures', ['created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_video_lectures_teacher_username_created_at_id',
+        'video_lectures',
+        ['teacher_username', 'created_at', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_video_lectures_teacher_username_created_at_id', table_name='video_lectures')
+    op.drop_index('ix_video_lectures_created_at_id', table_name='video_lectures')
+    op.drop_index('ix_books_created_at_id', table_name='books')
+    op.drop_index('ix_evaluator_submissions_evaluator_id_submission_date_id', table_name='evaluator_submissions')
+    op.drop_index('ix_evaluators_created_at_id', table_name='evaluators')
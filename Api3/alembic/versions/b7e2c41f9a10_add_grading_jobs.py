@@ -0,0 +1,49 @@
+"""add_grading_jobs
+
+Revision ID: b7e2c41f9a10
+Revises: 6d0c9d88c7bf
+Create Date: 2026-10-16 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c41f9a10'
+down_revision: Union[str, None] = '6d0c9d88c7bf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'grading_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('submission_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('max_attempts', sa.Integer(), nullable=True),
+        sa.Column('next_run_at', sa.DateTime(), nullable=True),
+        sa.Column('locked_by', sa.String(), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['submission_id'], ['evaluator_submissions.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_grading_jobs_id', 'grading_jobs', ['id'], unique=False)
+    op.create_index('ix_grading_jobs_submission_id', 'grading_jobs', ['submission_id'], unique=False)
+    op.create_index('ix_grading_jobs_status_next_run_at', 'grading_jobs', ['status', 'next_run_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_grading_jobs_status_next_run_at', table_name='grading_jobs')
+    op.drop_index('ix_grading_jobs_submission_id', table_name='grading_jobs')
+    op.drop_index('ix_grading_jobs_id', table_name='grading_jobs')
+    op.drop_table('grading_jobs')
@@ -0,0 +1,67 @@
+"""add_full_text_search
+
+Revision ID: c5e8f2a91d36
+Revises: a8d5e1f04c27
+Create Date: 2026-10-17 01:14:08.209417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8f2a91d36'
+down_revision: Union[str, None] = 'a8d5e1f04c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Searchable columns of each table (app/utils/search.py SEARCH_INDEXES at this revision)
+SEARCHABLE = {
+    'books': ('title', 'tags'),
+    'video_lectures': ('title', 'description', 'subject', 'topic'),
+    'evaluators': ('title', 'description'),
+}
+
+
+def _sqlite_upgrade(table: str, columns: Sequence[str]) -> None:
+    fts, names = f'{table}_fts', ', '.join(columns)
+    new_values = ', '.join(f'new.{name}' for name in columns)
+    old_values = ', '.join(f'old.{name}' for name in columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values});"
+    op.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='id', "
+        "tokenize='porter unicode61', prefix='3 4')"
+    )
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert_new} END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete_old} END")
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN {delete_old} {insert_new} END"
+    )
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _postgres_document(columns: Sequence[str]) -> str:
+    text = " || ' ' || ".join(f"coalesce({name}, '')" for name in columns)
+    return f"to_tsvector('english', {text})"
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for table, columns in SEARCHABLE.items():
+        if dialect == 'sqlite':
+            _sqlite_upgrade(table, columns)
+        elif dialect == 'postgresql':
+            op.execute(f'CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN ({_postgres_document(columns)})')
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for table in SEARCHABLE:
+        if dialect == 'sqlite':
+            for trigger in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{trigger}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_search')
@@ -0,0 +1,54 @@
+"""add_bulk_evaluation_runs
+
+Revision ID: d41a7c3e8b52
+Revises: b7e2c41f9a10
+Create Date: 2026-10-17 00:02:11.540318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7c3e8b52'
+down_revision: Union[str, None] = 'b7e2c41f9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'bulk_evaluation_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('evaluator_id', sa.Integer(), nullable=True),
+        sa.Column('requested_by', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('filters', sa.JSON(), nullable=True),
+        sa.Column('max_parallel', sa.Integer(), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['evaluator_id'], ['evaluators.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_bulk_evaluation_runs_id', 'bulk_evaluation_runs', ['id'], unique=False)
+    op.create_index('ix_bulk_evaluation_runs_evaluator_id', 'bulk_evaluation_runs', ['evaluator_id'], unique=False)
+    with op.batch_alter_table('grading_jobs') as batch_op:
+        batch_op.add_column(sa.Column('run_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_grading_jobs_run_id', ['run_id'], unique=False)
+        batch_op.create_foreign_key('fk_grading_jobs_run_id', 'bulk_evaluation_runs', ['run_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('grading_jobs') as batch_op:
+        batch_op.drop_constraint('fk_grading_jobs_run_id', type_='foreignkey')
+        batch_op.drop_index('ix_grading_jobs_run_id')
+        batch_op.drop_column('run_id')
+    op.drop_index('ix_bulk_evaluation_runs_evaluator_id', table_name='bulk_evaluation_runs')
+    op.drop_index('ix_bulk_evaluation_runs_id', table_name='bulk_evaluation_runs')
+    op.drop_table('bulk_evaluation_runs')
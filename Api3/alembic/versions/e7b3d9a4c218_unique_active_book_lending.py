@@ -0,0 +1,54 @@
+"""unique_active_book_lending
+
+Revision ID: e7b3d9a4c218
+Revises: c5e8f2a91d36
+Create Date: 2026-10-17 01:42:51.380264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3d9a4c218'
+down_revision: Union[str, None] = 'c5e8f2a91d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Active lendings that duplicate an earlier active lending of the same book by the same user
+DUPLICATES = (
+    "is_active = 1 AND id NOT IN ("
+    "SELECT MIN(id) FROM book_lendings WHERE is_active = 1 GROUP BY book_id, username)"
+)
+
+
+def upgrade() -> None:
+    # Races in the old read-check-write rent could leave duplicate lendings and oversold
+    # books; close the duplicates (returning their copies) so the unique index can be built
+    op.execute(
+        "UPDATE books SET copies_available = copies_available + ("
+        f"SELECT COUNT(*) FROM book_lendings WHERE book_lendings.book_id = books.id AND {DUPLICATES})"
+    )
+    op.execute(f"UPDATE book_lendings SET is_active = 0, return_date = CURRENT_TIMESTAMP WHERE {DUPLICATES}")
+    op.execute("UPDATE books SET copies_available = 0 WHERE copies_available < 0")
+
+    op.drop_index('ix_book_lendings_book_id_username_is_active', table_name='book_lendings')
+    op.create_index(
+        'uq_book_lendings_active_book_id_username',
+        'book_lendings',
+        ['book_id', 'username'],
+        unique=True,
+        sqlite_where=sa.text('is_active = 1'),
+        postgresql_where=sa.text('is_active = 1')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_book_lendings_active_book_id_username', table_name='book_lendings')
+    op.create_index(
+        'ix_book_lendings_book_id_username_is_active',
+        'book_lendings',
+        ['book_id', 'username', 'is_active']
+    )
@@ -0,0 +1,43 @@
+"""add_submission_and_lending_indexes
+
+Revision ID: f3a9c2d17b64
+Revises: d41a7c3e8b52
+Create Date: 2026-10-17 00:31:05.218733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c2d17b64'
+down_revision: Union[str, None] = 'd41a7c3e8b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_evaluator_submissions_evaluator_id_student_username',
+        'evaluator_submissions',
+        ['evaluator_id', 'student_username'],
+        unique=False
+    )
+    op.create_index(
+        'ix_book_lendings_book_id_username_is_active',
+        'book_lendings',
+        ['book_id', 'username', 'is_active'],
+        unique=False
+    )
+    op.create_index('ix_book_lendings_username_is_active', 'book_lendings', ['username', 'is_active'], unique=False)
+    op.create_index('ix_books_copies_available', 'books', ['copies_available'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_copies_available', table_name='books')
+    op.drop_index('ix_book_lendings_username_is_active', table_name='book_lendings')
+    op.drop_index('ix_book_lendings_book_id_username_is_active', table_name='book_lendings')
+    op.drop_index('ix_evaluator_submissions_evaluator_id_student_username', table_name='evaluator_submissions')
@@ -1 +1,6 @@
-from .main import app
\ No newline at end of file
+def __getattr__(name):
+    # `from app import app` keeps working without every `import app.x` building the whole application
+    if name == "app":
+        from .main import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security import HTTPAuthorizationCredentials, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ....database.database import get_db
+from starlette.concurrency import run_in_threadpool
+from ....database.database import get_db, get_async_db
 from ....models.user import User
 from ....schemas.user import UserCreate, UserResponse, UserSession, Token
-from ....utils.auth import get_password_hash, verify_password, create_access_token
+from ....utils.auth import get_password_hash, verify_password, create_access_token, get_token_data
+from ....utils.external_auth import security, verify_token_from_user_management_api, revoke_external_token
 from datetime import timedelta
 from ....config import get_settings
 
@@ -12,10 +16,10 @@ router = APIRouter()
 settings = get_settings()
 
 @router.post("/register", response_model=UserResponse)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if username already exists
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = await db.scalar(select(User).where(User.username == user.username).limit(1))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -23,15 +27,15 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email).limit(1))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create new user with hashed password
-    hashed_password = get_password_hash(user.password)
+    # Create new user with hashed password; bcrypt is slow, so keep it off the event loop
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -39,18 +43,18 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get access token using username and password"""
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.username == form_data.username).limit(1))
+    if not user or not await run_in_threadpool(verify_password, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -65,8 +69,18 @@ async def login_for_access_token(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+@router.post("/logout")
+def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user_data: dict = Depends(verify_token_from_user_management_api),
+    db: Session = Depends(get_db)
+):
+    """Revoke the presented token so it is rejected until it expires"""
+    revoke_external_token(db, credentials.credentials)
+    return {"message": "Token revoked"}
+
 @router.get("/validate", response_model=UserSession)
-async def validate_session(db: Session = Depends(get_db)):
+async def validate_session(token_data: dict = Depends(get_token_data)):
     """Validate current session"""
-    # The actual auth happens via the JWT token validation middleware
-    pass
+    # The user comes from user_cache after the first request, so this usually runs no query
+    return token_data
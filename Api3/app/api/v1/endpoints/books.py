@@ -1,11 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 from typing import List
-from ....database.database import get_db
+from ....database.database import get_db, get_read_db
 from ....models.book import Book, BookLending
-from ....schemas.book import BookCreate, BookResponse, BookLendingCreate, BookLendingResponse
+from ....schemas.book import (
+    BookCreate,
+    BookResponse,
+    BookSearchResult,
+    BookLendingCreate,
+    BookLendingResponse,
+    BookBulkLendingCreate,
+    BookBulkLendingResult
+)
 from ....utils.external_auth import verify_token_from_user_management_api, require_teacher_or_admin
-from datetime import datetime
+from ....utils.pagination import PageParams, paginate
+from ....utils.response_cache import cached_response
+from ....utils.search import search
+from ....utils.serialization import json_response
+from ....utils.lending import rent_book, rent_books, return_lending
 
 router = APIRouter()
 
@@ -30,10 +42,14 @@ def upload_book(
 
 @router.get("/available", response_model=List[BookResponse])
 def get_available_books(
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+    cache: None = Depends(cached_response(Book.__tablename__))
 ):
     # Public endpoint - no authentication required for browsing books
-    return db.query(Book).filter(Book.copies_available > 0).all()
+    query = db.query(Book).filter(Book.copies_available > 0)
+    books = paginate(query, page, Book.created_at, Book.id)
+    return json_response(books.items, List[BookResponse], page.response)
 
 @router.post("/rent", response_model=BookLendingResponse)
 def lend_book(
@@ -41,37 +57,17 @@ def lend_book(
     db: Session = Depends(get_db),
     user_data: dict = Depends(verify_token_from_user_management_api)
 ):
-    book = db.query(Book).filter(Book.id == lending.book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    
-    if book.copies_available <= 0:
-        raise HTTPException(status_code=400, detail="No copies available")
-    
-    # Check if user already has an active lending for this book
-    active_lending = db.query(BookLending).filter(
-        BookLending.book_id == lending.book_id,
-        BookLending.username == user_data["email"],  # Use email as username
-        BookLending.is_active == 1
-    ).first()
-    
-    if active_lending:
-        raise HTTPException(
-            status_code=400,
-            detail="You already have an active lending for this book"
-        )
-    
-    db_lending = BookLending(
-        book_id=lending.book_id,
-        username=user_data["email"]  # Use email as username
-    )
-    
-    book.copies_available -= 1
-    
-    db.add(db_lending)
-    db.commit()
-    db.refresh(db_lending)
-    return db_lending
+    # A single conditional decrement; safe against concurrent requests for the last copy
+    return rent_book(db, lending.book_id, user_data["email"])  # Use email as username
+
+@router.post("/rent/bulk", response_model=List[BookBulkLendingResult])
+def lend_books(
+    checkout: BookBulkLendingCreate,
+    db: Session = Depends(get_db),
+    user_data: dict = Depends(verify_token_from_user_management_api)
+):
+    """Borrow several books in one transaction; unavailable books are reported, not fatal"""
+    return rent_books(db, checkout.book_ids, user_data["email"])
 
 @router.post("/return/{lending_id}")
 def return_book(
@@ -79,41 +75,28 @@ def return_book(
     db: Session = Depends(get_db),
     user_data: dict = Depends(verify_token_from_user_management_api)
 ):
-    lending = db.query(BookLending).filter(
-        BookLending.id == lending_id,
-        BookLending.username == user_data["email"],  # Use email as username
-        BookLending.is_active == 1
-    ).first()
-    
-    if not lending:
-        raise HTTPException(status_code=404, detail="Active lending not found")
-    
-    lending.is_active = 0
-    lending.return_date = datetime.utcnow()
-    
-    book = db.query(Book).filter(Book.id == lending.book_id).first()
-    book.copies_available += 1
-    
-    db.commit()
+    return_lending(db, lending_id, user_data["email"])
     return {"message": "Book returned successfully"}
 
-@router.get("/search")
+@router.get("/search", response_model=List[BookSearchResult])
 def search_books(
     query: str,
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db)
 ):
     # Public endpoint - no authentication required for searching books
-    return db.query(Book).filter(
-        (Book.title.ilike(f"%{query}%")) |
-        (Book.tags.ilike(f"%{query}%"))
-    ).all()
+    # Full-text search on title and tags, best matches first
+    return search(db, Book, query, page).items
 
 @router.get("/active", response_model=List[BookLendingResponse])
 def get_active_lendings(
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
     user_data: dict = Depends(verify_token_from_user_management_api)
 ):
-    return db.query(BookLending).filter(
+    query = db.query(BookLending).filter(
         BookLending.username == user_data["email"],  # Use email as username
         BookLending.is_active == 1
-    ).all()
+    )
+    lendings = paginate(query, page, BookLending.borrow_date, BookLending.id)
+    return json_response(lendings.items, List[BookLendingResponse], page.response)
@@ -1,27 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from pydantic import BaseModel
-from ....database.database import get_db
-from ....models.evaluator import Evaluator, EvaluatorSubmission, EvaluatorType
+from ....database.database import get_db, get_read_db, get_async_db, get_async_read_db
+from ....models.evaluator import Evaluator, EvaluatorSubmission
+from ....models.grading import GradingJob, BulkEvaluationRun
 from ....schemas.evaluator import (
     EvaluatorCreate,
     EvaluatorResponse,
+    EvaluatorSearchResult,
     EvaluatorUpdate,
     SubmissionCreate,
     SubmissionResponse,
+    SubmissionListItem,
     EvaluatorStatusResponse,
     QuizType,
-    GradeSubmission
+    GradeSubmission,
+    BulkEvaluationCreate
 )
-from ....utils.external_auth import verify_token_from_user_management_api, require_teacher_or_admin
-from ....utils.gemini_utils import evaluate_quiz, evaluate_multiple_choice, evaluate_code
-import logging
-import json
+from ....utils.auth import user_cache
+from ....utils.external_auth import verify_token_from_user_management_api, require_teacher_or_admin, claims_cache
+from ....utils.grading import grade_submission as auto_grade_submission, supports_auto_grading, grading_version
+from ....utils.grading_queue import enqueue_grading_job, cancel_pending_jobs, grading_pool
+from ....utils.eval_cache import evaluation_cache
+from ....utils.gemini_scheduler import gemini_scheduler
+from ....utils.gemini_utils import gemini_health
+from ....utils.code_runner import sandbox_pool
+from ....utils.mcq_scoring import rescore_multiple_choice
+from ....utils.feedback_stream import feedback_events, feedback_streams
+from ....utils.similarity import similarity_index
+from ....utils.bulk_evaluation import create_run, run_progress, cancel_run, resume_run
+from ....utils.pagination import PageParams, paginate, paginate_async
+from ....utils.row_counts import COUNT_MODE_PATTERN, count_rows, count_cache
+from ....utils.response_cache import cached_response, response_cache
+from ....utils.search import match_filter, search
+from ....utils.serialization import json_response
+from ....config import get_settings
 from datetime import datetime
 from fastapi import Query
 
 router = APIRouter()
+settings = get_settings()
 
 @router.post("/", response_model=EvaluatorResponse)
 def create_evaluator(
@@ -49,21 +71,20 @@ def create_evaluator(
 
 @router.get("/list")
 def get_evaluators(
-    skip: int = 0,
-    limit: int = 10,
+    page: PageParams = Depends(),
     search: Optional[str] = Query(None, description="Search in title and description"),
     type: Optional[str] = Query(None, pattern="^(quiz|assignment)$"),
     quiz_type: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    count: str = Query("exact", pattern=COUNT_MODE_PATTERN, description="Total: exact (cached), estimate or none"),
+    db: Session = Depends(get_read_db),
+    cache: None = Depends(cached_response(Evaluator.__tablename__))
     # Public endpoint - no authentication required for browsing evaluators
 ):
     query = db.query(Evaluator)
     
     if search:
-        query = query.filter(
-            (Evaluator.title.contains(search)) | 
-            (Evaluator.description.contains(search))
-        )
+        # Full-text match on title and description; /search ranks the matches instead
+        query = query.filter(match_filter(db, Evaluator, search))
     
     if type:
         query = query.filter(Evaluator.type == type)
@@ -71,38 +92,73 @@ def get_evaluators(
     if quiz_type:
         query = query.filter(Evaluator.quiz_type == quiz_type)
     
-    total = query.count()
-    evaluators = query.offset(skip).limit(limit).all()
+    total = count_rows(db, query, count, Evaluator.id)
+    evaluators = paginate(query, page, Evaluator.created_at, Evaluator.id)
     
-    evaluator_list = [evaluator.to_dict() for evaluator in evaluators]
+    evaluator_list = [evaluator.to_dict() for evaluator in evaluators.items]
     
-    return {
+    return json_response({
         "items": evaluator_list,
         "total": total,
-        "skip": skip,
-        "limit": limit,
-        "has_more": (skip + limit) < total
+        "limit": page.limit,
+        "has_more": evaluators.has_more,
+        "next_cursor": evaluators.next_cursor
+    }, response=page.response)
+
+@router.get("/search", response_model=List[EvaluatorSearchResult])
+def search_evaluators(
+    query: str,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db)
+    # Public endpoint - no authentication required for browsing evaluators
+):
+    """Full-text search on title and description, best matches first"""
+    hits = search(db, Evaluator, query, page)
+    return [
+        {**hit.row.to_dict(), "score": hit.score, "highlights": hit.highlights}
+        for hit in hits.items
+    ]
+
+@router.get("/metrics")
+def get_grading_metrics(
+    db: Session = Depends(get_db),
+    user_data: dict = Depends(require_teacher_or_admin)
+):
+    """Operational metrics for the auto-grading pipeline"""
+    return {
+        "grading_queue": grading_pool.stats(db),
+        "evaluation_cache": evaluation_cache.stats(),
+        "gemini_scheduler": gemini_scheduler.stats(),
+        "gemini_health": gemini_health(),
+        "code_runner": sandbox_pool.stats(),
+        "feedback_streams": feedback_streams.stats(),
+        "similarity": similarity_index.stats(),
+        "row_counts": count_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "token_cache": claims_cache.stats(),
+        "user_cache": user_cache.stats()
     }
 
 @router.post("/{evaluator_id}/submit", response_model=SubmissionResponse)
 async def submit_response(
     evaluator_id: int,
     submission: SubmissionCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_data: dict = Depends(verify_token_from_user_management_api)
 ):
-    evaluator = db.query(Evaluator).filter(Evaluator.id == evaluator_id).first()
+    evaluator = await db.get(Evaluator, evaluator_id)
     if not evaluator:
         raise HTTPException(status_code=404, detail="Evaluator not found")
       # Check submission deadline
     deadline = getattr(evaluator, 'deadline', None)
     if deadline and datetime.now() > deadline:
         raise HTTPException(status_code=400, detail="Submission deadline has passed")    # Check max attempts
-    existing_submissions = db.query(EvaluatorSubmission).filter(
-        EvaluatorSubmission.evaluator_id == evaluator_id,
-        EvaluatorSubmission.student_username == user_data["email"]  # Use email as username
-    ).count()
+    existing_submissions = await db.scalar(
+        select(func.count()).select_from(EvaluatorSubmission).where(
+            EvaluatorSubmission.evaluator_id == evaluator_id,
+            EvaluatorSubmission.student_username == user_data["email"]  # Use email as username
+        )
+    )
 
     max_attempts = getattr(evaluator, 'max_attempts', 1)
     if existing_submissions >= max_attempts:
@@ -112,53 +168,20 @@ async def submit_response(
         )
 
     db_submission = EvaluatorSubmission(
-        evaluator_id=evaluator_id,
+        evaluator=evaluator,
         student_username=user_data["email"],  # Use email as username
         submission_content=submission.submission_content,
         status="submitted"
-    )# If it's an auto-evaluated quiz
-    is_auto_eval = getattr(evaluator, 'is_auto_eval', 0)
-    evaluator_type = getattr(evaluator, 'type', None)
-    if is_auto_eval and evaluator_type == EvaluatorType.QUIZ:
-        try:
-            quiz_data = getattr(evaluator, 'quiz_data', None) or {}
-            quiz_type = getattr(evaluator, 'quiz_type', None)
-            if quiz_type == QuizType.MULTIPLE_CHOICE:
-                # For multiple choice quizzes
-                student_answers = json.loads(submission.submission_content)
-                score, feedback = await evaluate_multiple_choice(
-                    correct_answers=quiz_data.get("correct_answers", []),
-                    student_answers=student_answers
-                )
-            elif quiz_type == QuizType.CODE_EVALUATION:
-                # For code evaluation quizzes
-                description = getattr(evaluator, 'description', '') or ""
-                score, feedback = await evaluate_code(
-                    problem_description=description,
-                    test_cases=quiz_data.get("test_cases", []),
-                    student_code=submission.submission_content,
-                    language=quiz_data.get("language", "python")
-                )
-            else:
-                # For open-ended quizzes
-                description = getattr(evaluator, 'description', '') or ""
-                score, feedback = await evaluate_quiz(
-                    quiz_content=description,
-                    student_answer=submission.submission_content
-                )
+    )
+    db.add(db_submission)
 
-            setattr(db_submission, 'provisional_grade', score)
-            setattr(db_submission, 'feedback', feedback)
-            setattr(db_submission, 'status', "auto_graded")
-            
-        except Exception as e:
-            logging.error(f"Auto-evaluation failed: {str(e)}")
-            setattr(db_submission, 'status', "submitted_pending_auto_grade")
-            setattr(db_submission, 'feedback', "Auto-evaluation failed. A teacher will review your submission manually.")
+    # Auto-evaluated quizzes are graded by the background grading workers;
+    # results show up through the /status and /result endpoints
+    if supports_auto_grading(evaluator):
+        enqueue_grading_job(db, db_submission)
 
-    db.add(db_submission)
-    db.commit()
-    db.refresh(db_submission)
+    await db.commit()
+    grading_pool.notify()
     return db_submission.to_dict()
 
 @router.post("/{evaluator_id}/grade/{submission_id}", response_model=SubmissionResponse)
@@ -194,13 +217,52 @@ def grade_submission(    evaluator_id: int,
     
     db.commit()
     db.refresh(submission)
+    # Teacher grades are the best reference for near-duplicate answers
+    similarity_index.record_grade(
+        evaluator_id, submission_id, submission.submission_content or "", grade_data.grade, grade_data.feedback or ""
+    )
     return submission.to_dict()
 
-@router.get("/{evaluator_id}/submissions", response_model=List[SubmissionResponse])
-def get_submissions(
+@router.get("/{evaluator_id}/similar-submissions")
+def get_similar_submissions(
     evaluator_id: int,
+    threshold: Optional[float] = Query(None, ge=0.5, le=1.0, description="Minimum estimated Jaccard similarity"),
     db: Session = Depends(get_db),
     user_data: dict = Depends(require_teacher_or_admin)
+):
+    """Clusters of near-identical submissions, e.g. to spot copy-paste"""
+    evaluator = db.query(Evaluator).filter(Evaluator.id == evaluator_id).first()
+    if not evaluator:
+        raise HTTPException(status_code=404, detail="Evaluator not found")
+
+    threshold = threshold or settings.SIMILARITY_CLUSTER_THRESHOLD
+    clusters = similarity_index.clusters(evaluator_id, grading_version(evaluator), threshold)
+
+    submission_ids = [sid for cluster in clusters for sid in cluster["submission_ids"]]
+    students = dict(
+        db.query(EvaluatorSubmission.id, EvaluatorSubmission.student_username).filter(
+            EvaluatorSubmission.id.in_(submission_ids)
+        ).all()
+    ) if submission_ids else {}
+    return {
+        "evaluator_id": evaluator_id,
+        "threshold": threshold,
+        "clusters": [
+            {
+                **cluster,
+                "size": len(cluster["submission_ids"]),
+                "students": [students.get(sid) for sid in cluster["submission_ids"]]
+            }
+            for cluster in clusters
+        ]
+    }
+
+@router.get("/{evaluator_id}/submissions", response_model=List[SubmissionListItem])
+def get_submissions(
+    evaluator_id: int,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+    user_data: dict = Depends(require_teacher_or_admin)
 ):
     evaluator = db.query(Evaluator).filter(Evaluator.id == evaluator_id).first()
     if not evaluator:
@@ -214,23 +276,56 @@ def get_submissions(
     #         detail="You can only view submissions for your own evaluators"
     #     )
 
-    submissions = db.query(EvaluatorSubmission).filter(
+    query = db.query(EvaluatorSubmission).filter(
         EvaluatorSubmission.evaluator_id == evaluator_id
-    ).all()
+    )
+    submissions = paginate(query, page, EvaluatorSubmission.submission_date, EvaluatorSubmission.id)
     
-    return [submission.to_dict() for submission in submissions]
+    # to_dict() already has the SubmissionListItem shape, so it is encoded without re-validation
+    return json_response([submission.to_dict(evaluator_detail=False) for submission in submissions.items], response=page.response)
+
+@router.get("/{evaluator_id}/submissions/{submission_id}/stream")
+async def stream_submission_feedback(
+    evaluator_id: int,
+    submission_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user_data: dict = Depends(verify_token_from_user_management_api)
+):
+    """Stream AI feedback for a submission as Server-Sent Events while it is being graded"""
+    submission = await db.scalar(
+        select(EvaluatorSubmission).where(
+            EvaluatorSubmission.id == submission_id,
+            EvaluatorSubmission.evaluator_id == evaluator_id
+        ).limit(1)
+    )
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    if submission.student_username != user_data["email"] and user_data["role"] not in ["instructor", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only stream feedback for your own submissions"
+        )
+
+    return StreamingResponse(
+        feedback_events(submission_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{evaluator_id}/status", response_model=EvaluatorStatusResponse)
 async def check_submission_status(
     evaluator_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     user_data: dict = Depends(verify_token_from_user_management_api)
 ):
     """Check the submission status for a student's submission"""
-    submission = db.query(EvaluatorSubmission).filter(
-        EvaluatorSubmission.evaluator_id == evaluator_id,
-        EvaluatorSubmission.student_username == user_data["email"]
-    ).first()
+    submission = await db.scalar(
+        select(EvaluatorSubmission).where(
+            EvaluatorSubmission.evaluator_id == evaluator_id,
+            EvaluatorSubmission.student_username == user_data["email"]
+        ).limit(1)
+    )
     
     if not submission:        return EvaluatorStatusResponse(
             status="not_submitted"
@@ -248,11 +343,12 @@ async def check_submission_status(
 @router.get("/{evaluator_id}/view", response_model=EvaluatorResponse)
 async def view_evaluator_details(
     evaluator_id: int,
-    db: Session = Depends(get_db),
-    user_data: dict = Depends(verify_token_from_user_management_api)
+    db: AsyncSession = Depends(get_async_read_db),
+    user_data: dict = Depends(verify_token_from_user_management_api),
+    cache: None = Depends(cached_response(Evaluator.__tablename__))
 ):
     """View detailed information about an evaluator"""
-    evaluator = db.query(Evaluator).filter(Evaluator.id == evaluator_id).first()
+    evaluator = await db.get(Evaluator, evaluator_id)
     if not evaluator:
         raise HTTPException(status_code=404, detail="Evaluator not found")
     return evaluator.to_dict()
@@ -261,67 +357,44 @@ async def view_evaluator_details(
 async def trigger_auto_evaluation(
     evaluator_id: int,
     submission_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_data: dict = Depends(verify_token_from_user_management_api)
 ):
     """Manually trigger auto-evaluation for a specific submission"""
-    submission = db.query(EvaluatorSubmission).filter(
-        EvaluatorSubmission.id == submission_id,
-        EvaluatorSubmission.evaluator_id == evaluator_id
-    ).first()
+    submission = await db.scalar(
+        select(EvaluatorSubmission).where(
+            EvaluatorSubmission.id == submission_id,
+            EvaluatorSubmission.evaluator_id == evaluator_id
+        ).limit(1)
+    )
     
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
         
-    evaluator = db.query(Evaluator).filter(Evaluator.id == evaluator_id).first()
+    evaluator = await db.get(Evaluator, evaluator_id)
     if not evaluator:
         raise HTTPException(status_code=404, detail="Evaluator not found")
         
-    is_auto_eval = getattr(evaluator, 'is_auto_eval', 0)
-    evaluator_type = getattr(evaluator, 'type', None)
-    if not is_auto_eval or evaluator_type != EvaluatorType.QUIZ:
+    if not supports_auto_grading(evaluator):
         raise HTTPException(
             status_code=400,
             detail="This evaluator does not support auto-evaluation"
         )
     
+    # Hand the connection back to the pool while waiting on Gemini
+    await db.commit()
     try:
-        quiz_data = getattr(evaluator, 'quiz_data', None) or {}
-        quiz_type = getattr(evaluator, 'quiz_type', None)
-        if quiz_type == QuizType.MULTIPLE_CHOICE:
-            # For multiple choice quizzes
-            submission_content = getattr(submission, 'submission_content', '')
-            student_answers = json.loads(submission_content)
-            score, feedback = await evaluate_multiple_choice(
-                correct_answers=quiz_data.get("correct_answers", []),
-                student_answers=student_answers
-            )
-        elif quiz_type == QuizType.CODE_EVALUATION:
-            # For code evaluation quizzes
-            description = getattr(evaluator, 'description', '') or ""
-            submission_content = getattr(submission, 'submission_content', '')
-            score, feedback = await evaluate_code(
-                problem_description=description,
-                test_cases=quiz_data.get("test_cases", []),
-                student_code=submission_content,
-                language=quiz_data.get("language", "python")
-            )
-        else:
-            # For open-ended quizzes
-            description = getattr(evaluator, 'description', '') or ""
-            submission_content = getattr(submission, 'submission_content', '')
-            score, feedback = await evaluate_quiz(
-                quiz_content=description,
-                student_answer=submission_content
-            )
+        submission_content = getattr(submission, 'submission_content', '')
+        score, feedback = await auto_grade_submission(evaluator, submission_content)
             
         # Update submission with evaluation results
         setattr(submission, 'provisional_grade', score)
         setattr(submission, 'feedback', feedback)
         setattr(submission, 'status', "auto_graded")
+        # The submission is graded now, so a queued job would only repeat the work
+        await db.run_sync(cancel_pending_jobs, submission_id)
         
-        db.commit()
-        db.refresh(submission)
+        await db.commit()
         
         return {
             "message": "Auto-evaluation complete",
@@ -330,25 +403,135 @@ async def trigger_auto_evaluation(
         }
     except Exception as e:
         setattr(submission, 'status', "auto_eval_failed")
-        db.commit()
+        await db.commit()
         raise HTTPException(
             status_code=500,
             detail=f"Auto-evaluation failed: {str(e)}"
         )
 
-@router.get("/{evaluator_id}/result", response_model=List[SubmissionResponse])
+@router.get("/{evaluator_id}/result", response_model=List[SubmissionListItem])
 async def get_evaluation_results(
     evaluator_id: int,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     user_data: dict = Depends(verify_token_from_user_management_api)
 ):
     """Get evaluation results for the student's submissions"""
-    submissions = db.query(EvaluatorSubmission).filter(
+    statement = select(EvaluatorSubmission).options(selectinload(EvaluatorSubmission.evaluator)).where(
         EvaluatorSubmission.evaluator_id == evaluator_id,
         EvaluatorSubmission.student_username == user_data["email"]
-    ).all()
+    )
+    submissions = await paginate_async(
+        db, statement, page, EvaluatorSubmission.submission_date, EvaluatorSubmission.id
+    )
     
-    return [submission.to_dict() for submission in submissions]
+    return json_response([submission.to_dict(evaluator_detail=False) for submission in submissions.items], response=page.response)
+
+def _get_owned_evaluator(db: Session, evaluator_id: int, user_data: dict) -> Evaluator:
+    evaluator = db.query(Evaluator).filter(Evaluator.id == evaluator_id).first()
+    if not evaluator:
+        raise HTTPException(status_code=404, detail="Evaluator not found")
+    if evaluator.teacher_username != user_data["email"]:
+        raise HTTPException(
+            status_code=403,
+            detail="Only the creator can re-evaluate this evaluator"
+        )
+    return evaluator
+
+def _get_run(db: Session, evaluator_id: int, run_id: int) -> BulkEvaluationRun:
+    run = db.query(BulkEvaluationRun).filter(
+        BulkEvaluationRun.id == run_id,
+        BulkEvaluationRun.evaluator_id == evaluator_id
+    ).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Bulk evaluation run not found")
+    return run
+
+@router.post("/{evaluator_id}/bulk-evaluations", status_code=status.HTTP_202_ACCEPTED)
+def start_bulk_evaluation(
+    evaluator_id: int,
+    request: BulkEvaluationCreate,
+    db: Session = Depends(get_db),
+    user_data: dict = Depends(require_teacher_or_admin)
+):
+    """Re-evaluate every submission matching the filters through the grading queue"""
+    evaluator = _get_owned_evaluator(db, evaluator_id, user_data)
+    if not supports_auto_grading(evaluator):
+        raise HTTPException(
+            status_code=400,
+            detail="This evaluator does not support auto-evaluation"
+        )
+
+    try:
+        run = create_run(
+            db,
+            evaluator,
+            requested_by=user_data["email"],
+            statuses=request.statuses,
+            submitted_after=request.submitted_after,
+            submitted_before=request.submitted_before,
+            failed_only=request.failed_only,
+            max_parallel=request.max_parallel
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    grading_pool.notify()
+    return run_progress(db, run)
+
+@router.get("/{evaluator_id}/bulk-evaluations")
+def list_bulk_evaluations(
+    evaluator_id: int,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    user_data: dict = Depends(require_teacher_or_admin)
+):
+    query = db.query(BulkEvaluationRun).filter(
+        BulkEvaluationRun.evaluator_id == evaluator_id
+    )
+    runs = paginate(query, page, BulkEvaluationRun.created_at, BulkEvaluationRun.id, descending=True)
+    return [run.to_dict() for run in runs.items]
+
+@router.get("/{evaluator_id}/bulk-evaluations/{run_id}")
+def get_bulk_evaluation(
+    evaluator_id: int,
+    run_id: int,
+    db: Session = Depends(get_db),
+    user_data: dict = Depends(require_teacher_or_admin)
+):
+    """Progress of a bulk re-evaluation: counts per state, ETA and failed submissions"""
+    return run_progress(db, _get_run(db, evaluator_id, run_id))
+
+@router.post("/{evaluator_id}/bulk-evaluations/{run_id}/cancel")
+def cancel_bulk_evaluation(
+    evaluator_id: int,
+    run_id: int,
+    db: Session = Depends(get_db),
+    user_data: dict = Depends(require_teacher_or_admin)
+):
+    _get_owned_evaluator(db, evaluator_id, user_data)
+    run = _get_run(db, evaluator_id, run_id)
+    try:
+        cancel_run(db, run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return run_progress(db, run)
+
+@router.post("/{evaluator_id}/bulk-evaluations/{run_id}/resume")
+def resume_bulk_evaluation(
+    evaluator_id: int,
+    run_id: int,
+    retry_failed: bool = Query(False, description="Also re-queue submissions that failed in this run"),
+    db: Session = Depends(get_db),
+    user_data: dict = Depends(require_teacher_or_admin)
+):
+    _get_owned_evaluator(db, evaluator_id, user_data)
+    run = _get_run(db, evaluator_id, run_id)
+    try:
+        resume_run(db, run, retry_failed=retry_failed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    grading_pool.notify()
+    return run_progress(db, run)
 
 @router.put("/{evaluator_id}", response_model=EvaluatorResponse)
 def update_evaluator(
@@ -398,6 +581,12 @@ def update_evaluator(
                 status_code=400,
                 detail="Multiple choice quizzes require questions and correct_answers"
             )
+        if not quiz_data["correct_answers"]:
+            # Checked before committing: the answer key is re-scored right after
+            raise HTTPException(
+                status_code=400,
+                detail="Multiple choice quizzes require at least one correct answer"
+            )
         if len(quiz_data["questions"]) != len(quiz_data["correct_answers"]):
             raise HTTPException(
                 status_code=400,
@@ -415,14 +604,53 @@ def update_evaluator(
                 detail="Auto-evaluated quizzes must specify quiz_type"
             )
 
+    # A changed answer key invalidates the grades of existing multiple choice submissions
+    old_answers = (getattr(db_evaluator, 'quiz_data', None) or {}).get("correct_answers")
+    key_changed = (
+        "quiz_data" in update_data
+        and quiz_type == QuizType.MULTIPLE_CHOICE
+        and update_data["quiz_data"].get("correct_answers") != old_answers
+    )
+
     # Apply updates
     for key, value in update_data.items():
         setattr(db_evaluator, key, value)
 
     db.commit()
     db.refresh(db_evaluator)
+
+    if key_changed:
+        rescore_multiple_choice(db, db_evaluator)
     return db_evaluator.to_dict()
 
+@router.post("/{evaluator_id}/rescore")
+def rescore_submissions(
+    evaluator_id: int,
+    db: Session = Depends(get_db),
+    user_data: dict = Depends(require_teacher_or_admin)
+):
+    """Re-score all graded submissions of a multiple choice quiz against its current answer key"""
+    evaluator = db.query(Evaluator).filter(Evaluator.id == evaluator_id).first()
+    if not evaluator:
+        raise HTTPException(status_code=404, detail="Evaluator not found")
+
+    if evaluator.teacher_username != user_data["email"]:
+        raise HTTPException(
+            status_code=403,
+            detail="Only the creator can re-score this evaluator"
+        )
+
+    if getattr(evaluator, 'quiz_type', None) != QuizType.MULTIPLE_CHOICE:
+        raise HTTPException(
+            status_code=400,
+            detail="Only multiple choice quizzes can be re-scored"
+        )
+
+    try:
+        return rescore_multiple_choice(db, evaluator)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.delete("/{evaluator_id}")
 def delete_evaluator(
     evaluator_id: int,
@@ -439,13 +667,23 @@ def delete_evaluator(
             detail="Only the creator can delete this evaluator"
         )
     
-    # Delete all submissions first
+    # Delete grading jobs and submissions first
+    submission_ids = db.query(EvaluatorSubmission.id).filter(
+        EvaluatorSubmission.evaluator_id == evaluator_id
+    )
+    db.query(GradingJob).filter(
+        GradingJob.submission_id.in_(submission_ids.scalar_subquery())
+    ).delete(synchronize_session=False)
     db.query(EvaluatorSubmission).filter(
         EvaluatorSubmission.evaluator_id == evaluator_id
     ).delete()
+    db.query(BulkEvaluationRun).filter(
+        BulkEvaluationRun.evaluator_id == evaluator_id
+    ).delete()
     
     # Delete the evaluator
     db.delete(evaluator)
     db.commit()
+    similarity_index.forget(evaluator_id)
     
     return {"message": "Evaluator deleted successfully"}
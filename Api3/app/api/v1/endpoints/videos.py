@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from ....database.database import get_db
+from ....database.database import get_db, get_read_db
 from ....models.video import VideoLecture
-from ....schemas.video import VideoLectureCreate, VideoLectureResponse
+from ....schemas.video import VideoLectureCreate, VideoLectureResponse, VideoLectureSearchResult
 from ....utils.external_auth import verify_token_from_user_management_api, require_teacher_or_admin
+from ....utils.pagination import PageParams, paginate
+from ....utils.response_cache import cached_response
+from ....utils.search import search
+from ....utils.serialization import json_response
 
 router = APIRouter()
 
@@ -28,7 +32,9 @@ def create_video_lecture(
 def get_video_lectures(
     subject: Optional[str] = None,
     topic: Optional[str] = None,
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+    cache: None = Depends(cached_response(VideoLecture.__tablename__))
 ):
     # Public endpoint - no authentication required for browsing videos
     query = db.query(VideoLecture)
@@ -36,12 +42,23 @@ def get_video_lectures(
         query = query.filter(VideoLecture.subject == subject)
     if topic:
         query = query.filter(VideoLecture.topic == topic)
-    return query.all()
+    videos = paginate(query, page, VideoLecture.created_at, VideoLecture.id)
+    return json_response(videos.items, List[VideoLectureResponse], page.response)
+
+@router.get("/search", response_model=List[VideoLectureSearchResult])
+def search_video_lectures(
+    query: str,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db)
+):
+    # Public endpoint - full-text search on title, description, subject and topic, best matches first
+    return search(db, VideoLecture, query, page).items
 
 @router.get("/{video_id}", response_model=VideoLectureResponse)
 def get_video_lecture(
     video_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
+    cache: None = Depends(cached_response(VideoLecture.__tablename__))
 ):
     # Public endpoint - no authentication required for viewing individual videos
     video = db.query(VideoLecture).filter(VideoLecture.id == video_id).first()
@@ -51,10 +68,13 @@ def get_video_lecture(
 
 @router.get("/teacher/lectures", response_model=List[VideoLectureResponse])
 def get_teacher_lectures(
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
     user_data: dict = Depends(require_teacher_or_admin)
 ):
-    return db.query(VideoLecture).filter(VideoLecture.teacher_username == user_data["email"]).all()
+    query = db.query(VideoLecture).filter(VideoLecture.teacher_username == user_data["email"])
+    videos = paginate(query, page, VideoLecture.created_at, VideoLecture.id)
+    return json_response(videos.items, List[VideoLectureResponse], page.response)
 
 @router.delete("/{video_id}")
 def delete_video_lecture(
@@ -1,14 +1,47 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     # JWT Settings
     SECRET_KEY: str = "your-secret-key-keep-it-secret"  # Will be overridden by environment variable
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_CACHE_MAX_ENTRIES: int = 10_000  # Verified tokens whose claims are reused without re-checking the signature
+    TOKEN_CACHE_TTL: int = 300  # Seconds a verification is reused at most; entries also drop out at the token's exp
+    TOKEN_REVOCATION_SYNC: float = 5.0  # Seconds between reads of tokens revoked through other workers
+    USER_CACHE_TTL: int = 30  # Seconds a user's role is trusted without a query; bounds staleness across workers
+    USER_CACHE_MAX_ENTRIES: int = 10_000
     
     # Database Settings
     DATABASE_URL: str = "sqlite:///edu_platform.db"
+    DATABASE_READ_URL: str = ""  # Read replica for read-heavy endpoints; empty reads from DATABASE_URL
+    DATABASE_POOL_SIZE: int = 10  # Connections kept open per engine
+    DATABASE_MAX_OVERFLOW: int = 20  # Extra connections allowed under bursts
+    DATABASE_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DATABASE_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced (Postgres)
+    DATABASE_ECHO: bool = False  # Log every SQL statement
+    ENVIRONMENT: str = "development"  # production: no DDL at startup, and the database must be at the Alembic head
+    
+    # Server Settings (python -m app.server)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1  # Worker processes; 0 starts one per CPU core
+    SERVER_LOOP: str = "auto"  # auto (uvloop when installed), uvloop or asyncio
+    SERVER_HTTP: str = "auto"  # auto (httptools when installed), httptools or h11
+    SERVER_PRELOAD: bool = True  # Import the app and prepare the database once before starting workers
+    SERVER_MAX_REQUESTS: int = 0  # Requests before a worker is replaced; 0 never recycles
+    SERVER_MAX_REQUESTS_JITTER: int = 0  # Random extra requests per worker so they don't all restart together
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # Seconds in-flight requests get to finish on SIGTERM
+    SERVER_KEEPALIVE_TIMEOUT: int = 5  # Seconds an idle keep-alive connection stays open
+    
+    # SQLite Settings (applied to every new connection)
+    SQLITE_JOURNAL_MODE: str = "WAL"  # Readers and the writer no longer block each other
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Safe with WAL; fsync only at checkpoints
+    SQLITE_MMAP_SIZE: int = 268_435_456  # 256MB of the database file memory-mapped
+    SQLITE_CACHE_SIZE: int = -65_536  # Page cache; negative values are KiB (64MB)
+    SQLITE_BUSY_TIMEOUT: int = 5000  # Milliseconds to wait on a locked database
+    QUERY_COUNT_WARN_THRESHOLD: int = 20  # Requests running more SQL statements are logged (likely N+1)
     
     # File Upload Settings
     MAX_FILE_SIZE: int = 5_242_880  # 5MB
@@ -17,11 +50,75 @@ class Settings(BaseSettings):
     
     # Gemini AI Settings
     GEMINI_API_KEY: str = ""
+    GEMINI_MODEL: str = "gemini-1.5-flash"
     GEMINI_MAX_RETRIES: int = 3
     GEMINI_TIMEOUT: int = 30
+    GEMINI_MAX_CONCURRENCY: int = 8  # Concurrent Gemini calls per process
+    GEMINI_PER_EVALUATOR_CONCURRENCY: int = 4  # So one busy quiz can't take every slot
+    GEMINI_RATE_LIMIT: float = 5.0  # Requests per second; 0 disables rate limiting
+    GEMINI_BURST: int = 10
+    GEMINI_RETRY_BASE_DELAY: float = 0.5  # Seconds, doubled on every retry
+    GEMINI_HEALTH_INTERVAL: int = 300  # Seconds between background health probes
+    GEMINI_BACKEND: str = "google"  # "fake" swaps in the offline stand-in for load testing
+    
+    # Fake Gemini Settings (only used with GEMINI_BACKEND=fake)
+    FAKE_GEMINI_LATENCY_MEDIAN: float = 2.0  # Seconds; latency is log-normally distributed
+    FAKE_GEMINI_LATENCY_SIGMA: float = 0.5  # Spread of the log-normal latency; 0 makes it constant
+    FAKE_GEMINI_ERROR_RATE: float = 0.0  # Share of calls failing with a retryable 429/503
+    FAKE_GEMINI_STREAM_CHUNKS: int = 8  # Chunks per streamed response
+    FAKE_GEMINI_FIRST_TOKEN_FRACTION: float = 0.2  # Share of the latency spent before the first chunk
+    FAKE_GEMINI_SEED: Optional[int] = None  # Fixed seed for reproducible runs
+    
+    # Code Runner Settings (local test-case execution for code_evaluation quizzes)
+    CODE_RUNNER_ENABLED: bool = True
+    CODE_RUNNER_WORKERS: int = 2  # Pre-warmed sandbox processes
+    CODE_RUNNER_CPU_SECONDS: int = 2  # Per test case
+    CODE_RUNNER_MEMORY_MB: int = 256  # Per test case
+    CODE_RUNNER_WALL_SECONDS: float = 5.0  # Per test case
+    CODE_RUNNER_SANDBOX_UID: int = 65534  # Unprivileged user student code runs as (nobody)
+    CODE_RUNNER_SANDBOX_GID: int = 65534  # Its group (nogroup)
+    CODE_RUNNER_LLM_FEEDBACK: bool = False  # Also ask Gemini for qualitative feedback
+    
+    # Grading Queue Settings
+    GRADING_WORKERS: int = 4  # 0 disables in-process workers (e.g. when a separate worker process runs them)
+    GRADING_MAX_ATTEMPTS: int = 3
+    GRADING_RETRY_BASE_DELAY: float = 5.0  # Seconds, doubled on every failed attempt
+    GRADING_POLL_INTERVAL: float = 1.0  # Seconds between queue polls when idle
+    GRADING_LEASE_TIMEOUT: int = 300  # Seconds before a running job is considered abandoned
+    GRADING_DRAIN_TIMEOUT: float = 30.0  # Seconds in-flight jobs get to finish on shutdown before they are re-queued
+    BULK_EVAL_MAX_PARALLEL: int = 2  # Default jobs graded at once per bulk re-evaluation run
+    
+    # Similarity Settings (reusing grades of near-duplicate free-text answers)
+    SIMILARITY_ENABLED: bool = True
+    SIMILARITY_REUSE_THRESHOLD: float = 0.9  # Estimated Jaccard similarity needed to reuse a grade
+    SIMILARITY_CLUSTER_THRESHOLD: float = 0.8  # Default threshold for copy-paste clusters
+    SIMILARITY_MAX_EVALUATORS: int = 200  # Evaluator indexes kept in memory
+    
+    # Feedback Streaming Settings (Server-Sent Events)
+    FEEDBACK_STREAM_HEARTBEAT: float = 10.0  # Seconds between keep-alives (and result checks) on idle streams
+    FEEDBACK_STREAM_LINGER: float = 60.0  # Seconds a finished stream is kept for late subscribers
+    
+    # Pagination Settings
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200  # Larger pages are rejected; admins can opt out with unpaginated=true
+    COUNT_CACHE_TTL: int = 60  # Bounds how stale a cached total can be after writes from other processes
+    COUNT_CACHE_MAX_ENTRIES: int = 1000
+    COUNT_ESTIMATE_SAMPLE: int = 1000  # Newest rows sampled for count=estimate on SQLite
+    
+    # Response Cache Settings (public catalog endpoints)
+    RESPONSE_CACHE_TTL: int = 30  # Bounds how stale a response can be after writes from other processes
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000
+    RESPONSE_CACHE_WAIT: float = 5.0  # Seconds a request waits for an identical one to rebuild a missing entry
+    
+    # Response Compression Settings (gzip, or brotli when installed and accepted)
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Smaller bodies are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; higher compresses better but much slower
     
     # Cache Settings
     CACHE_TTL: int = 3600  # 1 hour
+    EVAL_CACHE_MAX_ENTRIES: int = 10_000  # In-process LRU tier size
+    EVAL_CACHE_DB_PATH: str = ""  # SQLite file for the persistent tier; empty disables it
     
     class Config:
         env_file = ".env"
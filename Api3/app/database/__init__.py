@@ -1,2 +1,18 @@
 # Database package
-from .database import Base, engine, SessionLocal, get_db
+from .database import (
+    Base,
+    engine,
+    SessionLocal,
+    get_db,
+    read_engine,
+    ReadSessionLocal,
+    get_read_db,
+    async_engine,
+    AsyncSessionLocal,
+    get_async_db,
+    async_read_engine,
+    AsyncReadSessionLocal,
+    get_async_read_db,
+    create_db_engine,
+    create_async_db_engine
+)
@@ -0,0 +1,72 @@
+"""
+Database checks run once per worker at startup, before it takes requests.
+
+Schema changes belong to the Alembic migrations in alembic/versions. In
+development an empty database is created from the models (search indexes
+included) and stamped at the Alembic head, so a fresh checkout runs without a
+migration step; a database that is behind the head only gets a warning,
+because creating tables under a pending migration would make that migration
+fail. In production (ENVIRONMENT=production) no DDL is run at all: startup
+fails unless the database is at the head revision.
+"""
+from pathlib import Path
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from typing import Optional
+from ..config import get_settings
+from .database import Base, engine
+from .. import models  # noqa: F401 - registers every table on Base.metadata
+from ..utils import search  # noqa: F401 - creates the search indexes along with the tables
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[2] / "alembic"
+
+def is_production() -> bool:
+    return settings.ENVIRONMENT.lower() == "production"
+
+def prepare_database(bind: Engine = engine) -> Optional[str]:
+    """Check the schema against the Alembic head, creating it in development
+    if the database is empty; returns the database's revision"""
+    try:
+        from alembic.runtime.migration import MigrationContext
+        from alembic.script import ScriptDirectory
+    except ImportError:
+        if is_production():
+            raise RuntimeError("alembic is required to check the database revision in production")
+        logger.warning("alembic is not installed; creating missing tables without a revision check")
+        Base.metadata.create_all(bind=bind)
+        return None
+
+    script = ScriptDirectory(str(ALEMBIC_DIR))
+    head = script.get_current_head()
+    with bind.begin() as connection:
+        context = MigrationContext.configure(connection)
+        current = context.get_current_revision()
+        if current == head:
+            logger.info(f"Database is at revision {head}")
+            return current
+
+        if is_production():
+            raise RuntimeError(
+                f"Database is at revision {current}, expected {head}; run `alembic upgrade head` before starting"
+            )
+
+        if current is None:
+            fresh = not inspect(connection).get_table_names()
+            # Tables from before migrations were tracked only get the ones they are missing
+            Base.metadata.create_all(bind=connection)
+            if fresh:
+                context.stamp(script, head)
+                logger.info(f"Created the database schema at revision {head}")
+                return head
+            logger.warning(
+                "Database has no Alembic revision; once its schema matches the models, "
+                "run `alembic stamp head` so migrations apply to it"
+            )
+            return None
+
+        logger.warning(f"Database is at revision {current}, not the head {head}; run `alembic upgrade head`")
+        return current
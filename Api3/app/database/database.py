@@ -1,13 +1,118 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from typing import Any, Dict, Optional
+from ..config import get_settings
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./edu_platform.db"
+settings = get_settings()
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Sync drivers and the asyncio driver used for the same database
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+pg8000": "postgresql+asyncpg"
+}
+
+def async_database_url(url: str) -> URL:
+    """The given database URL with its driver swapped for an asyncio one"""
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
+
+def _is_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+def _is_sqlite_file(url: URL) -> bool:
+    return _is_sqlite(url) and url.database not in (None, "", ":memory:")
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """Pragmas run on every new SQLite connection"""
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT
+    }
+
+def _engine_options(url: URL) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"echo": settings.DATABASE_ECHO}
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if not _is_sqlite_file(url):
+            # In-memory databases live in a single connection, so there is no pool to size
+            return options
+    else:
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = settings.DATABASE_POOL_RECYCLE
+    options["pool_size"] = settings.DATABASE_POOL_SIZE
+    options["max_overflow"] = settings.DATABASE_MAX_OVERFLOW
+    options["pool_timeout"] = settings.DATABASE_POOL_TIMEOUT
+    return options
+
+def _configure_connections(engine: Engine, url: URL, read_only: bool, pragmas: Optional[Dict[str, Any]]) -> None:
+    """Apply SQLite pragmas, and make reader connections refuse writes"""
+    sqlite = _is_sqlite(url)
+    if sqlite and pragmas is None:
+        pragmas = sqlite_pragmas()
+    if not sqlite and not read_only:
+        return
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if sqlite:
+            cursor = dbapi_connection.cursor()
+            for name, value in (pragmas or {}).items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+            cursor.close()
+            return
+        # Outside a transaction, so the setting isn't rolled back with it
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+        cursor.close()
+        dbapi_connection.autocommit = autocommit
+
+def create_db_engine(url: str, read_only: bool = False, pragmas: Optional[Dict[str, Any]] = None) -> Engine:
+    """Engine for a database URL with pool sizing and SQLite pragmas from settings"""
+    parsed = make_url(url)
+    db_engine = create_engine(parsed, **_engine_options(parsed))
+    _configure_connections(db_engine, parsed, read_only, pragmas)
+    return db_engine
+
+def create_async_db_engine(url: str, read_only: bool = False, pragmas: Optional[Dict[str, Any]] = None) -> AsyncEngine:
+    """Async counterpart of create_db_engine, using the asyncio driver for the same database"""
+    parsed = make_url(url)
+    db_engine = create_async_engine(async_database_url(url), **_engine_options(parsed))
+    _configure_connections(db_engine.sync_engine, parsed, read_only, pragmas)
+    return db_engine
+
+engine = create_db_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async endpoints use this engine so their queries don't block the event loop.
+# Objects stay loaded after commit, since lazy loading isn't possible on an AsyncSession.
+async_engine = create_async_db_engine(settings.DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read-heavy endpoints use read-only engines: a replica when DATABASE_READ_URL is set, otherwise
+# a separate pool of query_only SQLite connections, which WAL lets run alongside the writer.
+# Postgres without a replica simply reads through the primary pool.
+_read_url = settings.DATABASE_READ_URL or settings.DATABASE_URL
+if settings.DATABASE_READ_URL or _is_sqlite_file(make_url(settings.DATABASE_URL)):
+    read_engine = create_db_engine(_read_url, read_only=True)
+    async_read_engine = create_async_db_engine(_read_url, read_only=True)
+else:
+    read_engine = engine
+    async_read_engine = async_engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -16,3 +121,18 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -1,5 +1,6 @@
 # Models package
 from .book import Book
 from .evaluator import Evaluator
-from .user import User
+from .grading import GradingJob, BulkEvaluationRun
+from .user import User, RevokedToken
 from .video import VideoLecture
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index, text
 from sqlalchemy.orm import relationship
 from ..database.database import Base
 from datetime import datetime
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        # /books/available ranges over copies_available > 0
+        Index("ix_books_copies_available", "copies_available"),
+        # Keyset pagination order
+        Index("ix_books_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
@@ -16,6 +22,20 @@ class Book(Base):
 
 class BookLending(Base):
     __tablename__ = "book_lendings"
+    __table_args__ = (
+        # At most one active lending of a book per user, enforced by the database so
+        # concurrent rent requests can't both succeed (see utils/lending.py)
+        Index(
+            "uq_book_lendings_active_book_id_username",
+            "book_id",
+            "username",
+            unique=True,
+            sqlite_where=text("is_active = 1"),
+            postgresql_where=text("is_active = 1")
+        ),
+        # A user's active lendings, paged in borrow order
+        Index("ix_book_lendings_username_is_active_borrow_date_id", "username", "is_active", "borrow_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     book_id = Column(Integer, ForeignKey("books.id"))
@@ -24,4 +44,5 @@ class BookLending(Base):
     return_date = Column(DateTime, nullable=True)
     is_active = Column(Integer, default=1)  # 1 for active, 0 for returned
 
-    book = relationship("Book")
+    # Every lending response nests its book, so load books for a whole result set at once
+    book = relationship("Book", lazy="selectin")
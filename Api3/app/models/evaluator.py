@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum as SQLAEnum, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index, Enum as SQLAEnum, JSON
 from sqlalchemy.orm import relationship
 from ..database.database import Base
 import enum
@@ -23,6 +23,10 @@ class QuizType(str, enum.Enum):
 
 class Evaluator(Base):
     __tablename__ = "evaluators"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_evaluators_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
@@ -64,8 +68,36 @@ class Evaluator(Base):
             "max_attempts": getattr(self, 'max_attempts', 1)
         }
 
+    def to_summary_dict(self):
+        """The evaluator fields needed alongside a submission in a list"""
+        deadline = getattr(self, 'deadline', None)
+        type_value = getattr(self, 'type', None)
+        quiz_type_value = getattr(self, 'quiz_type', None)
+
+        return {
+            "id": self.id,
+            "title": self.title,
+            "type": type_value.value if type_value else None,
+            "quiz_type": quiz_type_value.value if quiz_type_value else None,
+            "deadline": deadline.isoformat() if deadline else None,
+            "max_attempts": getattr(self, 'max_attempts', 1)
+        }
+
 class EvaluatorSubmission(Base):
     __tablename__ = "evaluator_submissions"
+    __table_args__ = (
+        # A student's submissions to an evaluator (attempt count, status, results paged in date order);
+        # the evaluator_id prefix also serves per-evaluator listings
+        Index(
+            "ix_evaluator_submissions_evaluator_student_date_id",
+            "evaluator_id",
+            "student_username",
+            "submission_date",
+            "id"
+        ),
+        # Keyset pagination of an evaluator's submissions
+        Index("ix_evaluator_submissions_evaluator_id_submission_date_id", "evaluator_id", "submission_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     evaluator_id = Column(Integer, ForeignKey("evaluators.id"))
@@ -77,11 +109,20 @@ class EvaluatorSubmission(Base):
     feedback = Column(Text, nullable=True)
     status = Column(String)  # submitted, graded, etc.
 
-    evaluator = relationship("Evaluator")
+    # Loaded for a whole result set in one IN query (skipping evaluators already in the
+    # session) rather than lazily per row; async sessions can't lazy load at all
+    evaluator = relationship("Evaluator", lazy="selectin")
 
-    def to_dict(self):
-        """Convert submission to dictionary for serialization"""
+    def to_dict(self, evaluator_detail: bool = True):
+        """Convert submission to dictionary for serialization; lists pass evaluator_detail=False
+        to nest a summary of the evaluator instead of repeating its full quiz_data per row"""
         submission_date = getattr(self, 'submission_date', None)
+        if self.evaluator is None:
+            evaluator = None
+        elif evaluator_detail:
+            evaluator = self.evaluator.to_dict()
+        else:
+            evaluator = self.evaluator.to_summary_dict()
         
         return {
             "id": self.id,
@@ -93,5 +134,5 @@ class EvaluatorSubmission(Base):
             "final_grade": self.final_grade,
             "feedback": self.feedback,
             "status": self.status,
-            "evaluator": self.evaluator.to_dict() if self.evaluator else None
+            "evaluator": evaluator
         }
@@ -0,0 +1,72 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index, JSON
+from sqlalchemy.orm import relationship
+from ..database.database import Base
+import enum
+from datetime import datetime
+
+class GradingJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class BulkRunStatus(str, enum.Enum):
+    RUNNING = "running"
+    CANCELLED = "cancelled"
+    COMPLETED = "completed"
+
+class GradingJob(Base):
+    """Durable work item for grading one auto-evaluated submission"""
+    __tablename__ = "grading_jobs"
+    __table_args__ = (
+        # Workers poll for the oldest due job in the queued state
+        Index("ix_grading_jobs_status_next_run_at", "status", "next_run_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    submission_id = Column(Integer, ForeignKey("evaluator_submissions.id"), index=True)
+    run_id = Column(Integer, ForeignKey("bulk_evaluation_runs.id"), nullable=True, index=True)  # Set for bulk re-evaluations
+    status = Column(String, default=GradingJobStatus.QUEUED.value)  # queued, running, completed, failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    next_run_at = Column(DateTime, default=datetime.utcnow)
+    locked_by = Column(String, nullable=True)  # Worker that currently holds the job
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    submission = relationship("EvaluatorSubmission")
+    run = relationship("BulkEvaluationRun", back_populates="jobs")
+
+class BulkEvaluationRun(Base):
+    """A teacher-requested re-evaluation of many submissions of one evaluator"""
+    __tablename__ = "bulk_evaluation_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    evaluator_id = Column(Integer, ForeignKey("evaluators.id"), index=True)
+    requested_by = Column(String)
+    status = Column(String, default=BulkRunStatus.RUNNING.value)  # running, cancelled, completed
+    filters = Column(JSON, nullable=True)  # Filters used to select the submissions
+    max_parallel = Column(Integer, default=2)  # Jobs of this run graded at the same time
+    total = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    jobs = relationship("GradingJob", back_populates="run")
+
+    def to_dict(self):
+        """Convert run to dictionary for serialization"""
+        return {
+            "id": self.id,
+            "evaluator_id": self.evaluator_id,
+            "requested_by": self.requested_by,
+            "status": self.status,
+            "filters": self.filters,
+            "max_parallel": self.max_parallel,
+            "total": self.total,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
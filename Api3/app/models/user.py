@@ -13,3 +13,12 @@ class User(Base):
     role = Column(SQLAEnum(UserRole), default=UserRole.STUDENT)
     jwt_key = Column(String, index=True, nullable=True)
     last_activity = Column(DateTime, default=datetime.utcnow)
+
+class RevokedToken(Base):
+    """Bearer token that must no longer be accepted, kept until it would have expired anyway"""
+    __tablename__ = "revoked_tokens"
+
+    token_digest = Column(String(64), primary_key=True)  # SHA-256 of the token, never the token itself
+    email = Column(String, index=True)
+    expires_at = Column(DateTime, nullable=True, index=True)  # The token's exp; null if it has none
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from ..database.database import Base
 from datetime import datetime
 
 class VideoLecture(Base):
     __tablename__ = "video_lectures"
+    __table_args__ = (
+        # Keyset pagination order, overall and per teacher
+        Index("ix_video_lectures_created_at_id", "created_at", "id"),
+        Index("ix_video_lectures_teacher_username_created_at_id", "teacher_username", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
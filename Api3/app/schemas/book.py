@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 class BookBase(BaseModel):
     title: str
@@ -18,6 +18,10 @@ class BookResponse(BookBase):
     class Config:
         from_attributes = True
 
+class BookSearchResult(BookResponse):
+    score: float  # Lower is a better match
+    highlights: Dict[str, Optional[str]]  # HTML-escaped, matched words wrapped in <mark></mark>
+
 class BookLendingCreate(BaseModel):
     book_id: int
 
@@ -32,3 +36,11 @@ class BookLendingResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class BookBulkLendingCreate(BaseModel):
+    book_ids: List[int] = Field(..., min_length=1, max_length=20)
+
+class BookBulkLendingResult(BaseModel):
+    book_id: int
+    status: str  # lent, unavailable, already_lent or not_found
+    lending: Optional[BookLendingResponse] = None
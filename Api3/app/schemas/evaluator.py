@@ -80,24 +80,31 @@ class EvaluatorBase(BaseModel):
 class EvaluatorCreate(EvaluatorBase):
     pass
 
-class EvaluatorResponse(EvaluatorBase):
+# Response schemas are a separate hierarchy from the request ones above: they
+# describe rows already in the database, so they carry no field constraints or
+# validators (a past deadline or an old title must still serialize) and are
+# read straight from ORM attributes.
+class EvaluatorResponse(BaseModel):
     id: int
+    title: str
+    description: str
+    type: EvaluatorType
     teacher_username: str
     created_at: datetime
-
-    @model_validator(mode='before')
-    @classmethod
-    def convert_auto_eval(cls, data):
-        if not isinstance(data, dict):
-            data = dict(data)
-        # Convert integer is_auto_eval to boolean if needed
-        if 'is_auto_eval' in data and isinstance(data['is_auto_eval'], int):
-            data['is_auto_eval'] = bool(data['is_auto_eval'])
-        return data
+    submission_type: SubmissionType
+    is_auto_eval: bool  # Stored as 0/1
+    deadline: Optional[datetime] = None
+    quiz_type: Optional[QuizType] = None
+    quiz_data: Optional[Dict] = None
+    max_attempts: int = 1
 
     class Config:
         from_attributes = True
 
+class EvaluatorSearchResult(EvaluatorResponse):
+    score: float  # Lower is a better match
+    highlights: Dict[str, Optional[str]]  # HTML-escaped, matched words wrapped in <mark></mark>
+
 class SubmissionCreate(BaseModel):
     submission_content: str = Field(
         ...,
@@ -130,6 +137,20 @@ class SubmissionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class EvaluatorSummary(BaseModel):
+    id: int
+    title: str
+    type: EvaluatorType
+    quiz_type: Optional[QuizType] = None
+    deadline: Optional[datetime] = None
+    max_attempts: Optional[int] = 1
+
+    class Config:
+        from_attributes = True
+
+class SubmissionListItem(SubmissionResponse):
+    evaluator: Optional[EvaluatorSummary] = None
+
 class EvaluatorStatusResponse(BaseModel):
     status: str
     submission_date: Optional[datetime] = None
@@ -161,3 +182,13 @@ class EvaluatorUpdate(BaseModel):
         json_encoders = {
             datetime: lambda v: v.isoformat() if v else None
         }
+
+class BulkEvaluationCreate(BaseModel):
+    statuses: Optional[List[str]] = Field(
+        None,
+        description="Submission statuses to re-evaluate; defaults to auto_graded and failed auto-evaluations"
+    )
+    submitted_after: Optional[datetime] = None
+    submitted_before: Optional[datetime] = None
+    failed_only: bool = Field(False, description="Only re-evaluate submissions whose auto-evaluation failed")
+    max_parallel: Optional[int] = Field(None, ge=1, le=50, description="Submissions graded at the same time")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
 class VideoLectureBase(BaseModel):
     title: str
@@ -20,3 +20,7 @@ class VideoLectureResponse(VideoLectureBase):
 
     class Config:
         from_attributes = True  # Updated for Pydantic v2
+
+class VideoLectureSearchResult(VideoLectureResponse):
+    score: float  # Lower is a better match
+    highlights: Dict[str, Optional[str]]  # HTML-escaped, matched words wrapped in <mark></mark>
@@ -0,0 +1,138 @@
+"""
+Production entrypoint: python -m app.server
+
+Runs the API under uvicorn with SERVER_WORKERS processes behind uvicorn's
+supervisor, which restarts workers that die and replaces them one at a time on
+SIGHUP. The event loop and HTTP parser come from SERVER_LOOP / SERVER_HTTP
+(uvloop and httptools by default, when installed).
+
+With SERVER_PRELOAD the supervisor imports the app and prepares the database
+once before any worker starts. A broken deploy (import error, database behind
+the Alembic head in production) then fails once, instead of every worker
+failing in a restart loop. Workers don't race on creating a new development
+database either.
+
+SERVER_MAX_REQUESTS recycles a worker after that many requests, plus up to
+SERVER_MAX_REQUESTS_JITTER more so workers don't all restart at the same time.
+The supervisor starts a replacement.
+
+On SIGTERM each worker stops accepting connections and gives in-flight
+requests SERVER_GRACEFUL_TIMEOUT seconds. Its lifespan shutdown then gives
+in-flight grading jobs GRADING_DRAIN_TIMEOUT seconds and puts the rest back in
+the queue for the next worker. Give the process manager at least the sum of
+both before it sends SIGKILL.
+"""
+from importlib.util import find_spec
+from typing import List, Optional
+from .config import get_settings
+from .utils.logging_config import setup_logging
+import argparse
+import logging
+import os
+import random
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+settings = get_settings()
+logger = logging.getLogger("app.server")  # __name__ is __main__ under python -m
+
+APP = "app.main:app"
+LOOPS = ("auto", "uvloop", "asyncio")
+HTTP_PROTOCOLS = ("auto", "httptools", "h11")
+
+class RecyclingServer(uvicorn.Server):
+    """uvicorn Server that adds this worker's share of the max-requests jitter"""
+
+    def __init__(self, config: uvicorn.Config, jitter: int = 0):
+        super().__init__(config)
+        self.jitter = jitter
+
+    def run(self, sockets=None) -> None:
+        # Runs in the worker process, so every worker draws its own limit
+        if self.config.limit_max_requests and self.jitter > 0:
+            self.config.limit_max_requests += random.randint(0, self.jitter)
+        super().run(sockets=sockets)
+
+def resolve_workers(workers: int) -> int:
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+def resolve_loop(loop: str) -> str:
+    if loop == "uvloop" and find_spec("uvloop") is None:
+        raise SystemExit("SERVER_LOOP=uvloop but uvloop is not installed")
+    return loop
+
+def resolve_http(http: str) -> str:
+    if http == "httptools" and find_spec("httptools") is None:
+        raise SystemExit("SERVER_HTTP=httptools but httptools is not installed")
+    return http
+
+def preload() -> None:
+    """Import the app and bring the database up to date in the supervisor"""
+    from .database.bootstrap import prepare_database
+    from .database.database import engine
+    from .main import app  # noqa: F401 - fails fast on import errors
+    prepare_database()
+    # Workers open their own connections
+    engine.dispose()
+
+def build_config(args: argparse.Namespace) -> uvicorn.Config:
+    return uvicorn.Config(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=resolve_loop(args.loop),
+        http=resolve_http(args.http),
+        lifespan="on",  # A failed startup stops the worker instead of serving without it
+        limit_max_requests=args.max_requests or None,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        timeout_keep_alive=args.keepalive_timeout,
+        proxy_headers=True,
+        server_header=False
+    )
+
+def serve(args: argparse.Namespace) -> None:
+    setup_logging()
+    if args.preload:
+        preload()
+    config = build_config(args)
+    server = RecyclingServer(config, jitter=args.max_requests_jitter)
+    logger.info(
+        f"Serving on {args.host}:{args.port} with {args.workers} worker(s), loop={config.loop}, "
+        f"http={config.http}, max_requests={args.max_requests or 'off'}, "
+        f"{args.workers * settings.GRADING_WORKERS} grading worker(s) in total"
+    )
+    if args.workers > 1 and settings.RESPONSE_CACHE_TTL > 0:
+        # Table versions live in each worker, so a write seen by one worker doesn't reach the others' caches
+        logger.warning(
+            f"Response caches are per worker: cached responses may lag a write made "
+            f"through another worker by up to RESPONSE_CACHE_TTL ({settings.RESPONSE_CACHE_TTL}s)"
+        )
+    if args.workers > 1 or args.max_requests:
+        # The supervisor replaces recycled workers, so it runs even for a single worker
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Educational Platform API")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 starts one per CPU core")
+    parser.add_argument("--loop", choices=LOOPS, default=settings.SERVER_LOOP)
+    parser.add_argument("--http", choices=HTTP_PROTOCOLS, default=settings.SERVER_HTTP)
+    parser.add_argument("--max-requests", type=int, default=settings.SERVER_MAX_REQUESTS, help="0 never recycles workers")
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.SERVER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT)
+    parser.add_argument("--keepalive-timeout", type=int, default=settings.SERVER_KEEPALIVE_TIMEOUT)
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=settings.SERVER_PRELOAD)
+    args = parser.parse_args(argv)
+    args.workers = resolve_workers(args.workers)
+    return args
+
+def main(argv: Optional[List[str]] = None) -> None:
+    serve(parse_args(argv))
+
+if __name__ == "__main__":
+    main()
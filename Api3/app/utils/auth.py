@@ -1,13 +1,21 @@
+from collections import OrderedDict
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from itertools import chain
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, Any, Iterable, Tuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..database.database import get_db
+from ..database.database import get_async_db
 from ..models.user import User
+from ..schemas.user import UserRole
 from ..config import get_settings
+import threading
+import time
 
 settings = get_settings()
 
@@ -36,10 +44,134 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """What authorization needs from a User, detached from any session so it can be shared between requests"""
+    id: int
+    username: str
+    email: str
+    role: UserRole
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(id=user.id, username=user.username, email=user.email, role=user.role)
+
+class UserCache:
+    """LRU of CurrentUser keyed on username, so authenticated requests skip the users query.
+
+    Commits that change a user's username, role or password (or delete the
+    user) invalidate the entry in this process. Other worker processes see
+    the change once their entry expires after ttl seconds."""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CurrentUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped on every invalidation
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, username: str) -> Optional[CurrentUser]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None:
+                expires_at, user = entry
+                if expires_at > now:
+                    self._entries.move_to_end(username)
+                    self.hits += 1
+                    return user
+                del self._entries[username]
+            self.misses += 1
+            return None
+
+    def set(self, user: CurrentUser, generation: int) -> None:
+        """Store a user read while the cache was at generation; dropped if an invalidation happened since"""
+        with self._lock:
+            if self.max_entries <= 0 or self.ttl <= 0 or generation != self._generation:
+                return
+            self._entries[user.username] = (time.time() + self.ttl, user)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, usernames: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for username in usernames:
+                if self._entries.pop(username, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+user_cache = UserCache(ttl=settings.USER_CACHE_TTL, max_entries=settings.USER_CACHE_MAX_ENTRIES)
+
+# Attributes whose change must reach authorization checks at once
+_AUTH_ATTRIBUTES = ("username", "role", "hashed_password")
+_ALL_USERS = "*"
+
+def _pending_users(session: Session) -> set:
+    return session.info.setdefault("user_cache_invalidate", set())
+
+@event.listens_for(Session, "after_flush")
+def _record_changed_users(session, flush_context):
+    for obj in chain(session.dirty, session.deleted):
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        if obj in session.deleted or any(state.attrs[name].history.has_changes() for name in _AUTH_ATTRIBUTES):
+            # Old and new names, in case the username itself changed
+            _pending_users(session).update(name for name in state.attrs.username.history.sum() if name)
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_user_changes(orm_execute_state):
+    # query(User).update() / .delete() bypass the flush; which users changed isn't known
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+            orm_execute_state.statement.table.name == User.__tablename__:
+        _pending_users(orm_execute_state.session).add(_ALL_USERS)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    # Only once the change is visible, so a lookup between flush and commit can't re-cache the old row
+    usernames = session.info.pop("user_cache_invalidate", None)
+    if not usernames:
+        return
+    if _ALL_USERS in usernames:
+        user_cache.clear()
+    else:
+        user_cache.invalidate(usernames)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_users(session):
+    session.info.pop("user_cache_invalidate", None)
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -53,13 +185,19 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
         
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+    generation = user_cache.generation
+    db_user = await db.scalar(select(User).where(User.username == username).limit(1))
+    if db_user is None:
         raise credentials_exception
+    user = CurrentUser.from_user(db_user)
+    user_cache.set(user, generation)
     return user
 
 async def get_token_data(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
     """Extract useful data from the token and user"""
     return {
@@ -0,0 +1,200 @@
+"""
+Bulk re-evaluation of an evaluator's submissions.
+
+A run selects submissions by status and date, then enqueues one grading job
+per submission tagged with the run's id. The grading pool works through them
+at most max_parallel at a time, after interactive submissions. Progress, ETA
+and failures come from the run's jobs. Cancelling a run parks its queued
+jobs, and resuming re-queues them, optionally with the failed ones too.
+"""
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+from ..config import get_settings
+from ..models.evaluator import Evaluator, EvaluatorSubmission
+from ..models.grading import GradingJob, GradingJobStatus, BulkEvaluationRun, BulkRunStatus
+from .grading import (
+    STATUS_AUTO_GRADED,
+    STATUS_PENDING_MANUAL,
+    STATUS_AUTO_EVAL_FAILED,
+    STATUS_TEACHER_GRADED
+)
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+REEVALUABLE_STATUSES = [STATUS_AUTO_GRADED, STATUS_PENDING_MANUAL, STATUS_AUTO_EVAL_FAILED, STATUS_TEACHER_GRADED]
+# Teacher-graded submissions are only re-evaluated when asked for explicitly
+DEFAULT_STATUSES = [STATUS_AUTO_GRADED, STATUS_PENDING_MANUAL, STATUS_AUTO_EVAL_FAILED]
+FAILED_STATUSES = [STATUS_PENDING_MANUAL, STATUS_AUTO_EVAL_FAILED]
+MAX_REPORTED_FAILURES = 100
+ETA_SAMPLE_SIZE = 50
+
+def create_run(
+    db: Session,
+    evaluator: Evaluator,
+    requested_by: str,
+    statuses: Optional[List[str]] = None,
+    submitted_after: Optional[datetime] = None,
+    submitted_before: Optional[datetime] = None,
+    failed_only: bool = False,
+    max_parallel: Optional[int] = None
+) -> BulkEvaluationRun:
+    """
+    Create a run and enqueue a grading job for every matching submission.
+    Raises ValueError for statuses that cannot be re-evaluated.
+    """
+    invalid = set(statuses or []) - set(REEVALUABLE_STATUSES)
+    if invalid:
+        raise ValueError(f"Cannot re-evaluate submissions with status: {', '.join(sorted(invalid))}")
+    selected = statuses or DEFAULT_STATUSES
+    if failed_only:
+        selected = [s for s in selected if s in FAILED_STATUSES] if statuses else FAILED_STATUSES
+
+    query = db.query(EvaluatorSubmission.id).filter(
+        EvaluatorSubmission.evaluator_id == evaluator.id,
+        EvaluatorSubmission.status.in_(selected)
+    )
+    if submitted_after:
+        query = query.filter(EvaluatorSubmission.submission_date >= submitted_after)
+    if submitted_before:
+        query = query.filter(EvaluatorSubmission.submission_date <= submitted_before)
+    # Submissions already waiting for a grader would only be graded twice
+    active_jobs = db.query(GradingJob.submission_id).filter(
+        GradingJob.status.in_([GradingJobStatus.QUEUED.value, GradingJobStatus.RUNNING.value])
+    )
+    query = query.filter(~EvaluatorSubmission.id.in_(active_jobs.scalar_subquery()))
+    submission_ids = [submission_id for (submission_id,) in query.order_by(EvaluatorSubmission.id).all()]
+
+    now = datetime.utcnow()
+    run = BulkEvaluationRun(
+        evaluator_id=evaluator.id,
+        requested_by=requested_by,
+        status=BulkRunStatus.RUNNING.value if submission_ids else BulkRunStatus.COMPLETED.value,
+        filters={
+            "statuses": selected,
+            "submitted_after": submitted_after.isoformat() if submitted_after else None,
+            "submitted_before": submitted_before.isoformat() if submitted_before else None,
+            "failed_only": failed_only
+        },
+        max_parallel=max_parallel or settings.BULK_EVAL_MAX_PARALLEL,
+        total=len(submission_ids),
+        finished_at=None if submission_ids else now
+    )
+    db.add(run)
+    db.flush()
+    if submission_ids:
+        db.execute(insert(GradingJob), [
+            {
+                "submission_id": submission_id,
+                "run_id": run.id,
+                "status": GradingJobStatus.QUEUED.value,
+                "attempts": 0,
+                "max_attempts": settings.GRADING_MAX_ATTEMPTS,
+                "next_run_at": now,
+                "created_at": now,
+                "updated_at": now
+            }
+            for submission_id in submission_ids
+        ])
+    db.commit()
+    db.refresh(run)
+    logger.info(f"Bulk evaluation run {run.id} queued {len(submission_ids)} submission(s) of evaluator {evaluator.id}")
+    return run
+
+def _eta_seconds(db: Session, run: BulkEvaluationRun, remaining: int) -> Optional[float]:
+    """Extrapolate from the pace of the most recently finished jobs"""
+    if remaining == 0 or run.status != BulkRunStatus.RUNNING.value:
+        return None
+    finished_at = [
+        updated_at for (updated_at,) in db.query(GradingJob.updated_at).filter(
+            GradingJob.run_id == run.id,
+            GradingJob.status.in_([GradingJobStatus.COMPLETED.value, GradingJobStatus.FAILED.value])
+        ).order_by(GradingJob.updated_at.desc()).limit(ETA_SAMPLE_SIZE).all()
+    ]
+    if len(finished_at) < 2:
+        return None
+    span = (finished_at[0] - finished_at[-1]).total_seconds()
+    if span <= 0:
+        return None
+    rate = (len(finished_at) - 1) / span
+    return round(remaining / rate, 1)
+
+def run_progress(db: Session, run: BulkEvaluationRun) -> Dict[str, Any]:
+    """Counts, ETA and failures of a run; marks the run completed once nothing is left"""
+    counts = dict(
+        db.query(GradingJob.status, func.count(GradingJob.id)).filter(
+            GradingJob.run_id == run.id
+        ).group_by(GradingJob.status).all()
+    )
+    progress = {s.value: counts.get(s.value, 0) for s in GradingJobStatus}
+    remaining = progress[GradingJobStatus.QUEUED.value] + progress[GradingJobStatus.RUNNING.value]
+
+    if run.status == BulkRunStatus.RUNNING.value and remaining == 0:
+        run.status = BulkRunStatus.COMPLETED.value
+        run.finished_at = db.query(func.max(GradingJob.updated_at)).filter(
+            GradingJob.run_id == run.id
+        ).scalar() or datetime.utcnow()
+        db.commit()
+
+    finished = progress[GradingJobStatus.COMPLETED.value] + progress[GradingJobStatus.FAILED.value]
+    failures = db.query(GradingJob.submission_id, GradingJob.attempts, GradingJob.last_error).filter(
+        GradingJob.run_id == run.id,
+        GradingJob.status == GradingJobStatus.FAILED.value
+    ).order_by(GradingJob.submission_id).limit(MAX_REPORTED_FAILURES).all()
+
+    return {
+        **run.to_dict(),
+        "progress": {
+            **progress,
+            "total": run.total,
+            "percent": round(finished * 100 / run.total, 1) if run.total else 100.0
+        },
+        "eta_seconds": _eta_seconds(db, run, remaining),
+        "failures": [
+            {"submission_id": submission_id, "attempts": attempts, "error": error}
+            for submission_id, attempts, error in failures
+        ]
+    }
+
+def cancel_run(db: Session, run: BulkEvaluationRun) -> int:
+    """Stop a run; jobs already being graded finish, queued ones are parked. Returns the parked count"""
+    if run.status != BulkRunStatus.RUNNING.value:
+        raise ValueError(f"Run is {run.status}, only running runs can be cancelled")
+    cancelled = db.query(GradingJob).filter(
+        GradingJob.run_id == run.id,
+        GradingJob.status == GradingJobStatus.QUEUED.value
+    ).update({
+        GradingJob.status: GradingJobStatus.CANCELLED.value,
+        GradingJob.updated_at: datetime.utcnow()
+    }, synchronize_session=False)
+    run.status = BulkRunStatus.CANCELLED.value
+    run.finished_at = datetime.utcnow()
+    db.commit()
+    return cancelled
+
+def resume_run(db: Session, run: BulkEvaluationRun, retry_failed: bool = False) -> int:
+    """Re-queue a run's cancelled jobs (and failed ones if asked). Returns the re-queued count"""
+    if run.status == BulkRunStatus.RUNNING.value:
+        raise ValueError("Run is already running")
+    statuses = [GradingJobStatus.CANCELLED.value]
+    if retry_failed:
+        statuses.append(GradingJobStatus.FAILED.value)
+    now = datetime.utcnow()
+    requeued = db.query(GradingJob).filter(
+        GradingJob.run_id == run.id,
+        GradingJob.status.in_(statuses)
+    ).update({
+        GradingJob.status: GradingJobStatus.QUEUED.value,
+        GradingJob.attempts: 0,
+        GradingJob.next_run_at: now,
+        GradingJob.last_error: None,
+        GradingJob.updated_at: now
+    }, synchronize_session=False)
+    if requeued:
+        run.status = BulkRunStatus.RUNNING.value
+        run.finished_at = None
+    db.commit()
+    return requeued
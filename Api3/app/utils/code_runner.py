@@ -0,0 +1,273 @@
+"""
+Local test-case runner for CODE_EVALUATION quizzes.
+
+Keeps a pool of pre-warmed sandbox_worker processes and runs the student's
+code once per stored test case, comparing stdout with the expected output.
+Scoring is deterministic and costs a fork per test case instead of an LLM call.
+
+Workers run as CODE_RUNNER_SANDBOX_UID/GID in their own user, mount, network,
+PID, IPC and UTS namespaces with a read-only filesystem (see sandbox_worker),
+set up with setpriv and unshare from util-linux. Only Python is supported, and
+only where that isolation can actually be set up, which needs root (or
+CAP_SETUID/CAP_SETGID) and user namespaces; everything else falls back to the
+Gemini evaluation path.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from ..config import get_settings
+import asyncio
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+SUPPORTED_LANGUAGES = {"python", "python3"}
+# Result lines carry up to 64KB each of stdout and stderr, JSON-escaped
+RESULT_LINE_LIMIT = 1024 * 1024
+
+def _worker_env() -> Dict[str, str]:
+    return {"PATH": os.environ.get("PATH", ""), "PYTHONIOENCODING": "utf-8"}
+
+def sandbox_command(*worker_args: str) -> Optional[List[str]]:
+    """Command line starting an isolated sandbox worker, or None without setpriv and unshare"""
+    setpriv, unshare = shutil.which("setpriv"), shutil.which("unshare")
+    if not setpriv or not unshare:
+        return None
+    uid, gid = str(settings.CODE_RUNNER_SANDBOX_UID), str(settings.CODE_RUNNER_SANDBOX_GID)
+    return [
+        setpriv, f"--reuid={uid}", f"--regid={gid}", "--clear-groups", "--no-new-privs", "--",
+        unshare, "--map-root-user", "--mount", "--net", "--pid", "--ipc", "--uts",
+        "--fork", "--kill-child", "--mount-proc", "--",
+        sys.executable, "-I", WORKER_SCRIPT, "--confine", unshare, uid, gid, *worker_args
+    ]
+
+@lru_cache(maxsize=None)
+def sandbox_supported() -> bool:
+    """Whether student code can run fully isolated; checked once by starting a worker in --check mode"""
+    if not hasattr(os, "fork"):
+        return False
+    try:
+        import resource  # noqa: F401
+    except ImportError:
+        return False
+    command = sandbox_command("--check")
+    if command is None:
+        logger.warning("Code runner disabled: setpriv and unshare (util-linux) are needed to isolate student code")
+        return False
+    try:
+        probe = subprocess.run(command, cwd="/", env=_worker_env(), capture_output=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Code runner disabled: could not start the sandbox: {e}")
+        return False
+    if probe.returncode != 0:
+        reason = probe.stderr.decode("utf-8", errors="replace").strip() or f"exit code {probe.returncode}"
+        logger.warning(f"Code runner disabled: sandbox isolation is not available: {reason}")
+        return False
+    return True
+
+def _expected_output(test_case: Dict[str, Any]) -> Optional[str]:
+    for key in ("expected_output", "output", "expected"):
+        if key in test_case and test_case[key] is not None:
+            return str(test_case[key])
+    return None
+
+def _test_input(test_case: Dict[str, Any]) -> str:
+    value = test_case.get("input", "")
+    if isinstance(value, list):
+        return "\n".join(str(line) for line in value) + "\n"
+    return str(value) if value is not None else ""
+
+def _normalize_output(output: str) -> str:
+    lines = output.replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+def can_run_locally(language: str, test_cases: List[Dict[str, Any]]) -> bool:
+    """Whether the quiz can be graded by actually running the test cases"""
+    return (
+        settings.CODE_RUNNER_ENABLED
+        and (language or "").lower() in SUPPORTED_LANGUAGES
+        and bool(test_cases)
+        and all(isinstance(tc, dict) and _expected_output(tc) is not None for tc in test_cases)
+        and sandbox_supported()
+    )
+
+class SandboxPool:
+    """Fixed-size pool of sandbox worker processes"""
+
+    def __init__(self, size: int, cpu_seconds: int, memory_mb: int, wall_seconds: float):
+        self.size = max(size, 1)
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.wall_seconds = wall_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.subprocess.Process] = []
+        self._workdir: Optional[str] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self.runs = 0
+        self.restarts = 0
+
+    async def start(self) -> None:
+        """Spawn the workers so the first submission doesn't pay interpreter start-up"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+        if self._loop is not loop:
+            # Subprocess transports belong to the loop that created them
+            self._discard_workers()
+            self._loop = loop
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._workers:
+                return
+            self._workdir = self._workdir or tempfile.mkdtemp(prefix="sandbox-")
+            os.chmod(self._workdir, 0o755)
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                worker = await self._spawn()
+                self._workers.append(worker)
+                self._idle.put_nowait(worker)
+            logger.info(f"Started {self.size} sandbox worker(s)")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            if worker.returncode is None:
+                worker.kill()
+                await worker.wait()
+        self._workers = []
+        self._idle = None
+        if self._workdir:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+
+    def _discard_workers(self) -> None:
+        for worker in self._workers:
+            if worker.returncode is None:
+                try:
+                    worker.kill()
+                except ProcessLookupError:
+                    pass
+        self._workers = []
+        self._idle = None
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        command = sandbox_command()
+        if command is None:
+            raise RuntimeError("setpriv and unshare are needed to start sandbox workers")
+        return await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=RESULT_LINE_LIMIT,
+            cwd=self._workdir,
+            env=_worker_env()
+        )
+
+    async def _replace(self, worker: asyncio.subprocess.Process) -> asyncio.subprocess.Process:
+        if worker.returncode is None:
+            worker.kill()
+            await worker.wait()
+        replacement = await self._spawn()
+        self._workers = [replacement if w is worker else w for w in self._workers]
+        self.restarts += 1
+        return replacement
+
+    async def run(self, code: str, stdin: str) -> Dict[str, Any]:
+        """Run code once with the given stdin under the sandbox limits"""
+        await self.start()
+        worker = await self._idle.get()
+        request = {
+            "code": code,
+            "stdin": stdin,
+            "cpu_seconds": self.cpu_seconds,
+            "memory_mb": self.memory_mb,
+            "wall_seconds": self.wall_seconds
+        }
+        try:
+            worker.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+            await worker.stdin.drain()
+            # The worker enforces the wall-clock limit itself; this only catches a wedged worker
+            line = await asyncio.wait_for(worker.stdout.readline(), timeout=self.wall_seconds + 5)
+            if not line:
+                raise ConnectionError("sandbox worker exited")
+            self.runs += 1
+            return json.loads(line)
+        except (asyncio.TimeoutError, ConnectionError, BrokenPipeError, ValueError) as e:
+            logger.error(f"Sandbox worker failed, restarting it: {e}")
+            worker = await self._replace(worker)
+            return {"status": "sandbox_error", "stdout": "", "stderr": "", "duration_ms": 0, "cpu_ms": 0}
+        finally:
+            self._idle.put_nowait(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "idle": self._idle.qsize() if self._idle else 0,
+            "runs": self.runs,
+            "restarts": self.restarts
+        }
+
+async def run_test_cases(code: str, test_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run every test case (in parallel across the pool) and mark each as passed or failed"""
+    runs = await asyncio.gather(*[sandbox_pool.run(code, _test_input(tc)) for tc in test_cases])
+    results = []
+    for test_case, run in zip(test_cases, runs):
+        expected = _normalize_output(_expected_output(test_case) or "")
+        actual = _normalize_output(run.get("stdout", ""))
+        results.append({
+            **run,
+            "input": _test_input(test_case),
+            "expected": expected,
+            "actual": actual,
+            "passed": run.get("status") == "ok" and actual == expected
+        })
+    return results
+
+def _shorten(text: str, limit: int = 200) -> str:
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit] + "…"
+
+def summarize_test_results(results: List[Dict[str, Any]]) -> tuple[int, str]:
+    """Deterministic score and feedback from test-case results"""
+    total = len(results)
+    passed = sum(1 for r in results if r["passed"])
+    score = round(passed * 100 / total) if total else 0
+
+    feedback_parts = [f"🧪 Passed {passed}/{total} test cases."]
+    status_messages = {
+        "timeout": "⏱️ time limit exceeded",
+        "cpu_limit": "⏱️ CPU time limit exceeded",
+        "memory_limit": "💾 memory limit exceeded",
+        "output_limit": "📜 produced too much output",
+        "sandbox_error": "⚠️ could not be run, please contact your teacher"
+    }
+    for index, result in enumerate(results, start=1):
+        if result["passed"]:
+            continue
+        status = result.get("status")
+        if status in status_messages:
+            detail = status_messages[status]
+        elif status == "runtime_error":
+            error_lines = result.get("stderr", "").strip().splitlines()
+            detail = f"💥 runtime error: {_shorten(error_lines[-1] if error_lines else 'unknown error')}"
+        else:
+            detail = f"expected {_shorten(result['expected'])!r}, got {_shorten(result['actual'])!r}"
+        feedback_parts.append(f"❌ Test {index}: {detail}")
+    if passed == total:
+        feedback_parts.append("🏆 All test cases pass!")
+    return score, "\n".join(feedback_parts)
+
+sandbox_pool = SandboxPool(
+    size=settings.CODE_RUNNER_WORKERS,
+    cpu_seconds=settings.CODE_RUNNER_CPU_SECONDS,
+    memory_mb=settings.CODE_RUNNER_MEMORY_MB,
+    wall_seconds=settings.CODE_RUNNER_WALL_SECONDS
+)
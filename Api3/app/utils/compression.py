@@ -0,0 +1,121 @@
+"""
+gzip/brotli response compression.
+
+The encoding is negotiated from Accept-Encoding: brotli when the client
+accepts it and the brotli package is installed, gzip otherwise. Only
+compressible content types are touched, and only once the whole body is at
+least COMPRESSION_MINIMUM_SIZE bytes; small bodies cost more to compress than
+they save. Server-Sent Event streams pass through unbuffered. A compressed
+response's ETag is made weak, since its bytes differ from the identity
+encoding the strong ETag describes; If-None-Match uses weak comparison, so
+revalidation keeps working.
+"""
+from typing import List, Optional, Tuple
+from ..config import get_settings
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+settings = get_settings()
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+STREAMING_TYPES = ("text/event-stream",)
+
+def accepted_encodings(header: str) -> List[str]:
+    """Encodings in an Accept-Encoding header, excluding those with q=0"""
+    encodings = []
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            encodings.append(name.strip().lower())
+    return encodings
+
+def choose_encoding(header: str) -> Optional[str]:
+    accepted = accepted_encodings(header)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+def _weak(etag: bytes) -> bytes:
+    return etag if etag.startswith(b"W/") else b"W/" + etag
+
+class CompressionMiddleware:
+    """ASGI middleware; add it last so it wraps every other middleware"""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = dict(scope["headers"])
+        encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[dict] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if message["status"] == 304:
+                    # Same validator as the compressed 200 the client is revalidating
+                    start["headers"] = self._replace_etag(message.get("headers", []))
+                    passthrough = True
+                elif (
+                    b"content-encoding" in headers
+                    or content_type.startswith(STREAMING_TYPES)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                if passthrough:
+                    await send(start)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = [(name, value) for name, value in start.get("headers", []) if name != b"content-length"]
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers = self._replace_etag(headers)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"vary", b"Accept-Encoding"))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _replace_etag(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+        return [(name, _weak(value) if name == b"etag" else value) for name, value in headers]
@@ -0,0 +1,187 @@
+"""
+Content-addressed cache for AI evaluation results.
+
+Entries are keyed on a SHA-256 digest of the evaluator id and version, the
+grader kind, the model name and the normalized submission, so a byte-for-byte
+repeat of a graded answer is served without another Gemini call. The cache has
+an in-process LRU tier with TTL eviction and an optional SQLite tier that
+survives restarts and is shared between worker processes. get() and set() are
+coroutines: memory hits return straight away, while the SQLite tier is read and
+written in the threadpool so the event loop never waits on the file.
+"""
+from collections import OrderedDict
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, Dict, Any, Tuple
+from ..config import get_settings
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CachedResult = Tuple[int, str]
+
+def normalize_submission(content: str) -> str:
+    """Normalize line endings and surrounding whitespace without changing code indentation"""
+    lines = content.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+def evaluator_version(description: Optional[str], quiz_type: Optional[str], quiz_data: Optional[Dict]) -> str:
+    """Short digest of the fields that influence grading, so edits invalidate cached results"""
+    payload = json.dumps([description or "", quiz_type or "", quiz_data or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+class EvaluationCache:
+    """Two-tier (memory LRU + optional SQLite) cache of (score, feedback) results"""
+
+    def __init__(self, ttl: int, max_entries: int, persistent_path: str = ""):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CachedResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes_since_purge = 0
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        if persistent_path:
+            self._open_persistent(persistent_path)
+
+    def _open_persistent(self, path: str) -> None:
+        try:
+            db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS eval_cache ("
+                "key TEXT PRIMARY KEY, score INTEGER, feedback TEXT, expires_at REAL)"
+            )
+            db.commit()
+            self._db = db
+        except sqlite3.Error as e:
+            logger.error(f"Could not open persistent evaluation cache at {path}: {e}")
+            self._db = None
+
+    @staticmethod
+    def make_key(
+        evaluator_id: int,
+        evaluator_version: Optional[str],
+        kind: str,
+        model_name: str,
+        submission: str,
+        *extra: Any
+    ) -> str:
+        payload = json.dumps(
+            [evaluator_id, evaluator_version or "", kind, model_name, normalize_submission(submission), list(extra)],
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[CachedResult]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._entries[key]
+
+        value = await run_in_threadpool(self._get_persistent, key, now) if self._db is not None else None
+        if value is not None:
+            score, feedback, expires_at = value
+            self._put_memory(key, (score, feedback), expires_at)
+            with self._lock:
+                self.persistent_hits += 1
+            return score, feedback
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def set(self, key: str, score: int, feedback: str) -> None:
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, (score, feedback), expires_at)
+        with self._lock:
+            self.stores += 1
+        if self._db is not None:
+            await run_in_threadpool(self._set_persistent, key, score, feedback, expires_at)
+
+    def _put_memory(self, key: str, value: CachedResult, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _get_persistent(self, key: str, now: float) -> Optional[Tuple[int, str, float]]:
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT score, feedback, expires_at FROM eval_cache WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+            return (row[0], row[1], row[2]) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Persistent evaluation cache read failed: {e}")
+            return None
+
+    def _set_persistent(self, key: str, score: int, feedback: str, expires_at: float) -> None:
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO eval_cache (key, score, feedback, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, score, feedback, expires_at)
+                )
+                self._writes_since_purge += 1
+                if self._writes_since_purge >= 500:
+                    self._db.execute("DELETE FROM eval_cache WHERE expires_at <= ?", (time.time(),))
+                    self._writes_since_purge = 0
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Persistent evaluation cache write failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM eval_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.persistent_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "persistent": self._db is not None,
+                "memory_hits": self.memory_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
+
+evaluation_cache = EvaluationCache(
+    ttl=settings.CACHE_TTL,
+    max_entries=settings.EVAL_CACHE_MAX_ENTRIES,
+    persistent_path=settings.EVAL_CACHE_DB_PATH
+)
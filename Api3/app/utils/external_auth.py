@@ -1,51 +1,240 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from typing import Optional
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, Tuple
+from ..config import get_settings
+from ..database.database import SessionLocal
+from ..models.user import RevokedToken
+import hashlib
+import logging
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
 
 # JWT configuration - should match Api2 configuration
 JWT_SECRET = os.getenv('SECRET_KEY', 'your-super-secret-key-change-this-in-production')
 ALGORITHM = "HS256"
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    """Seconds since the epoch of a naive UTC datetime as stored in the database"""
+    return value.replace(tzinfo=timezone.utc).timestamp() if value is not None else None
+
+class ClaimsCache:
+    """LRU of verified token claims keyed on a SHA-256 digest of the token.
+
+    A token is verified (signature, exp, required fields) once; until its exp,
+    or for at most ttl seconds so a rotated secret takes effect, repeat
+    requests cost a digest and a dict lookup. Revoked digests are remembered
+    until the token would have expired and rejected before the cache is
+    consulted."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}  # digest -> expires_at (inf when the token has no exp)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                expires_at, claims = entry
+                if expires_at > now:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return claims
+                del self._entries[digest]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def set(self, digest: str, claims: Dict[str, Any], exp: Optional[float]) -> None:
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        with self._lock:
+            if self.max_entries <= 0 or digest in self._revoked:
+                return
+            self._entries[digest] = (expires_at, claims)
+            self._entries.move_to_end(digest)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def is_revoked(self, digest: str) -> bool:
+        with self._lock:
+            expires_at = self._revoked.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                # Past its exp the signature check rejects the token anyway
+                del self._revoked[digest]
+                return False
+            self.rejected += 1
+            return True
+
+    def revoke(self, digest: str, expires_at: Optional[float]) -> None:
+        with self._lock:
+            self._revoked[digest] = expires_at if expires_at is not None else float("inf")
+            self._entries.pop(digest, None)
+            if len(self._revoked) > self.max_entries:
+                now = time.time()
+                self._revoked = {d: e for d, e in self._revoked.items() if e > now}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "revoked": len(self._revoked),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejected_revoked": self.rejected,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+claims_cache = ClaimsCache(max_entries=settings.TOKEN_CACHE_MAX_ENTRIES, ttl=settings.TOKEN_CACHE_TTL)
+
+class RevocationSync:
+    """Pulls tokens revoked through other worker processes into claims_cache every few seconds"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._synced_at = 0.0
+        self._since: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def maybe_sync(self) -> None:
+        if time.time() - self._synced_at < self.interval:
+            return
+        # One thread syncs; the others carry on with what is already known
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._sync()
+        finally:
+            self._lock.release()
+
+    def _sync(self) -> None:
+        started = datetime.utcnow()
+        try:
+            with SessionLocal() as db:
+                query = db.query(RevokedToken.token_digest, RevokedToken.expires_at).filter(
+                    or_(RevokedToken.expires_at.is_(None), RevokedToken.expires_at > started)
+                )
+                if self._since is not None:
+                    query = query.filter(RevokedToken.revoked_at >= self._since)
+                rows = query.all()
+        except SQLAlchemyError as e:
+            logger.error(f"Could not read revoked tokens: {str(e)}")
+            self._synced_at = time.time()
+            return
+        for digest, expires_at in rows:
+            claims_cache.revoke(digest, _epoch(expires_at))
+        # Overlap by one interval so a revocation committed while this query ran isn't missed
+        self._since = started - timedelta(seconds=self.interval)
+        self._synced_at = time.time()
+
+revocation_sync = RevocationSync(interval=settings.TOKEN_REVOCATION_SYNC)
+
+def _credentials_error(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def verify_external_token(token: str) -> Dict[str, Any]:
+    """Claims of a token issued by the User Management API; repeat tokens come from claims_cache"""
+    digest = token_digest(token)
+    revocation_sync.maybe_sync()
+    if claims_cache.is_revoked(digest):
+        raise _credentials_error("Could not validate credentials: Token has been revoked")
+    claims = claims_cache.get(digest)
+    if claims is not None:
+        # Callers may add keys to the dict they get; the cached one stays as verified
+        return dict(claims)
+
+    try:
+        # Decode the JWT token using the same secret as Api2
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+    except JWTError as e:
+        raise _credentials_error(f"Could not validate credentials: {str(e)}")
+
+    # Extract user data from token payload (Api2 format)
+    user_id = payload.get("userId")  # API2 uses "userId" field
+    role = payload.get("role")
+    email = payload.get("email")
+
+    if user_id is None or role is None or email is None:
+        raise _credentials_error("Invalid token format - missing required fields")
+
+    claims = {
+        "userId": user_id,
+        "role": role,
+        "email": email,
+        "username": email  # Use email as username for compatibility
+    }
+    exp = payload.get("exp")
+    claims_cache.set(digest, claims, float(exp) if isinstance(exp, (int, float)) else None)
+    return dict(claims)
+
+def revoke_external_token(db: Session, token: str) -> None:
+    """Stop accepting a token, in this process at once and in the others within TOKEN_REVOCATION_SYNC seconds"""
+    claims = jwt.get_unverified_claims(token)
+    exp = claims.get("exp")
+    expires_at = datetime.utcfromtimestamp(exp) if isinstance(exp, (int, float)) else None
+    digest = token_digest(token)
+    claims_cache.revoke(digest, _epoch(expires_at))
+    try:
+        if db.get(RevokedToken, digest) is None:
+            db.add(RevokedToken(token_digest=digest, email=claims.get("email"), expires_at=expires_at))
+        # Rows are only needed until the tokens they block expire
+        db.query(RevokedToken).filter(RevokedToken.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+        db.commit()
+    except IntegrityError:
+        # Revoked concurrently through another worker
+        db.rollback()
 
 def verify_token_from_user_management_api(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
     Verify JWT token issued by the User Management API (Api2)
     Returns user data from the token
     """
-    token = credentials.credentials
-    
-    try:
-        # Decode the JWT token using the same secret as Api2
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        
-        # Extract user data from token payload (Api2 format)
-        user_id = payload.get("userId")  # API2 uses "userId" field
-        role = payload.get("role")
-        email = payload.get("email")
-        
-        if user_id is None or role is None or email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token format - missing required fields",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        return {
-            "userId": user_id,
-            "role": role,
-            "email": email,
-            "username": email  # Use email as username for compatibility
-        }
-        
-    except JWTError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Could not validate credentials: {str(e)}",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    return verify_external_token(credentials.credentials)
 
 def require_teacher_or_admin(user_data: dict = Depends(verify_token_from_user_management_api)) -> dict:
     """
@@ -59,33 +248,14 @@ def require_teacher_or_admin(user_data: dict = Depends(verify_token_from_user_ma
     return user_data
 
 # Optional authentication - doesn't require token but extracts user data if present
-def optional_auth(authorization: Optional[str] = Depends(lambda: None)) -> Optional[dict]:
+def optional_auth(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[dict]:
     """
     Optional authentication - extracts user data if token is present, otherwise returns None
     """
-    if not authorization:
+    if not credentials:
         return None
-    
+
     try:
-        # Simple Bearer token extraction
-        if not authorization.startswith("Bearer "):
-            return None
-            
-        token = authorization[7:]  # Remove "Bearer " prefix
-        
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        
-        user_id: str = payload.get("userId")
-        role: str = payload.get("role") 
-        email: str = payload.get("email")
-        
-        if user_id and role and email:
-            return {
-                "userId": user_id,
-                "role": role,
-                "email": email
-            }
-    except:
-        pass
-    
-    return None
+        return verify_external_token(credentials.credentials)
+    except HTTPException:
+        return None
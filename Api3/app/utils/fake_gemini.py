@@ -0,0 +1,109 @@
+"""
+Offline stand-in for the Gemini model, selected with GEMINI_BACKEND=fake.
+
+FakeGenerativeModel implements the part of google.generativeai.GenerativeModel
+the app uses (generate_content_async, with or without stream=True), so the whole
+grading path runs unchanged: scheduler, retries, timeouts, cache and streaming.
+Latency is drawn from a log-normal distribution, a configurable share of calls
+fails with a retryable provider error, and streamed responses are split into
+chunks spread over the call's latency. Responses are derived from a hash of the
+prompt, so the same prompt always gets the same score.
+"""
+from typing import Any, AsyncIterator, List, Optional
+import asyncio
+import hashlib
+import math
+import random
+
+class FakeGeminiError(Exception):
+    """Provider error carrying an HTTP-style status code, like google.api_core exceptions"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeStreamingResponse:
+    """Async-iterable response whose chunks arrive spread over the remaining latency"""
+
+    def __init__(self, chunks: List[str], delay_between_chunks: float):
+        self._chunks = chunks
+        self._delay = delay_between_chunks
+        self.text = "".join(chunks)
+
+    def __aiter__(self) -> AsyncIterator[FakeChunk]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[FakeChunk]:
+        for index, chunk in enumerate(self._chunks):
+            if index:
+                await asyncio.sleep(self._delay)
+            yield FakeChunk(chunk)
+
+class FakeGenerativeModel:
+    """Drop-in replacement for genai.GenerativeModel with simulated latency and failures"""
+
+    def __init__(
+        self,
+        latency_median: float,
+        latency_sigma: float,
+        error_rate: float,
+        stream_chunks: int,
+        first_token_fraction: float,
+        seed: Optional[int] = None
+    ):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.stream_chunks = max(stream_chunks, 1)
+        self.first_token_fraction = min(max(first_token_fraction, 0.0), 1.0)
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def _latency(self) -> float:
+        if self.latency_median <= 0:
+            return 0.0
+        return self._random.lognormvariate(math.log(self.latency_median), self.latency_sigma)
+
+    @staticmethod
+    def _response_text(prompt: str) -> str:
+        digest = int(hashlib.sha256(str(prompt).encode("utf-8")).hexdigest(), 16)
+        score = 40 + digest % 61
+        return (
+            f"Score: {score}\n"
+            f"Feedback: The answer covers the main points of the question and is scored {score}. "
+            "Strengths: clear structure and relevant terminology. "
+            "To improve: add a concrete example and explain the reasoning step by step. "
+            "(Generated by the offline fake Gemini backend.)"
+        )
+
+    def _split(self, text: str) -> List[str]:
+        size = math.ceil(len(text) / self.stream_chunks)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    async def generate_content_async(self, prompt: Any, stream: bool = False) -> Any:
+        self.calls += 1
+        latency = self._latency()
+        if self._random.random() < self.error_rate:
+            # Fail part-way through, like a provider that gives up under load
+            await asyncio.sleep(latency * self._random.random())
+            self.errors += 1
+            raise FakeGeminiError(self._random.choice([429, 503]), "Simulated Gemini provider error")
+
+        text = self._response_text(prompt)
+        if not stream:
+            await asyncio.sleep(latency)
+            return FakeResponse(text)
+
+        chunks = self._split(text)
+        await asyncio.sleep(latency * self.first_token_fraction)
+        remaining = latency * (1 - self.first_token_fraction)
+        return FakeStreamingResponse(chunks, remaining / max(len(chunks) - 1, 1))
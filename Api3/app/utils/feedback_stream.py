@@ -0,0 +1,143 @@
+"""
+Live AI feedback for a submission, delivered as Server-Sent Events.
+
+Grading workers publish Gemini's text chunks for a submission as they arrive
+and finish the stream with the result they persisted. Subscribers that connect
+late first receive the text streamed so far. Streams only live in the process
+that grades the submission, so the SSE generator also checks the database
+between heartbeats; a client served by another process still gets the final
+result, just without the intermediate chunks.
+"""
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from ..config import get_settings
+from ..database.database import SessionLocal
+from ..models.evaluator import EvaluatorSubmission
+from .grading import STATUS_QUEUED, STATUS_GRADING
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+class FeedbackStream:
+    """Chunks and final result of one submission's evaluation"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.subscribers: Set[asyncio.Queue] = set()
+
+    def push(self, event: str, data: Dict[str, Any]) -> None:
+        for queue in self.subscribers:
+            queue.put_nowait((event, data))
+
+class FeedbackStreamHub:
+    """Fans out feedback chunks from the grading worker to SSE subscribers"""
+
+    def __init__(self, linger: float):
+        self.linger = linger
+        self._streams: Dict[int, FeedbackStream] = {}
+
+    def publish(self, submission_id: int, text: Optional[str]) -> None:
+        """Forward a chunk of feedback text; None discards what was streamed so far (a retry or a dropped result)"""
+        if text is None:
+            stream = self._streams.get(submission_id)
+            if stream is None:
+                return
+            if stream.chunks:
+                stream.chunks.clear()
+                stream.push("reset", {})
+            # The next attempt may run in another process, or never, so don't hold on to the stream
+            self._discard_later(submission_id, stream)
+            return
+        stream = self._streams.setdefault(submission_id, FeedbackStream())
+        stream.chunks.append(text)
+        stream.push("chunk", {"text": text})
+
+    def finish(self, submission_id: int, result: Dict[str, Any]) -> None:
+        """Send the persisted result and keep it around briefly for late subscribers"""
+        stream = self._streams.setdefault(submission_id, FeedbackStream())
+        stream.result = result
+        stream.push("result", result)
+        self._discard_later(submission_id, stream)
+
+    def _discard_later(self, submission_id: int, stream: FeedbackStream) -> None:
+        asyncio.get_running_loop().call_later(self.linger, self._discard, submission_id, stream)
+
+    def _discard(self, submission_id: int, stream: FeedbackStream) -> None:
+        # A retry in this process may have started streaming into it again; its own end discards it then
+        if stream.result is None and stream.chunks:
+            return
+        if self._streams.get(submission_id) is stream and not stream.subscribers:
+            del self._streams[submission_id]
+
+    @asynccontextmanager
+    async def subscribe(self, submission_id: int) -> AsyncIterator[asyncio.Queue]:
+        """Queue of (event, data) tuples for a submission, starting with a replay of earlier chunks"""
+        stream = self._streams.setdefault(submission_id, FeedbackStream())
+        queue: asyncio.Queue = asyncio.Queue()
+        if stream.chunks:
+            queue.put_nowait(("chunk", {"text": "".join(stream.chunks)}))
+        if stream.result is not None:
+            queue.put_nowait(("result", stream.result))
+        stream.subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            stream.subscribers.discard(queue)
+            # Drop streams nobody is producing into, or whose result was already delivered
+            if not stream.subscribers and (stream.result is not None or not stream.chunks):
+                if self._streams.get(submission_id) is stream:
+                    del self._streams[submission_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_streams": len(self._streams),
+            "subscribers": sum(len(s.subscribers) for s in self._streams.values())
+        }
+
+def _format_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _final_result(submission_id: int) -> Optional[Dict[str, Any]]:
+    """The stored result, or None while the submission is still waiting to be graded"""
+    with SessionLocal() as db:
+        submission = db.query(EvaluatorSubmission).filter(EvaluatorSubmission.id == submission_id).first()
+        if not submission:
+            return {"status": "not_found", "provisional_grade": None, "feedback": None}
+        if submission.status in (STATUS_QUEUED, STATUS_GRADING):
+            return None
+        return {
+            "status": submission.status,
+            "provisional_grade": submission.provisional_grade,
+            "feedback": submission.feedback
+        }
+
+async def feedback_events(submission_id: int) -> AsyncIterator[str]:
+    """SSE body: chunk/reset events while the submission is graded, then a single result event"""
+    async with feedback_streams.subscribe(submission_id) as queue:
+        # Subscribed before checking, so a result persisted in between still reaches the queue
+        result = await run_in_threadpool(_final_result, submission_id)
+        if result is not None:
+            yield _format_event("result", result)
+            return
+        # Flush the response headers right away so the client knows the stream is open
+        yield ": connected\n\n"
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=settings.FEEDBACK_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                result = await run_in_threadpool(_final_result, submission_id)
+                if result is not None:
+                    yield _format_event("result", result)
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            yield _format_event(event, data)
+            if event == "result":
+                return
+
+feedback_streams = FeedbackStreamHub(linger=settings.FEEDBACK_STREAM_LINGER)
@@ -0,0 +1,205 @@
+"""
+Single entry point for outbound Gemini calls.
+
+Every call acquires a per-evaluator slot, a global slot and a token from a
+request-rate bucket before it runs, is bounded by GEMINI_TIMEOUT, and is retried
+with jittered exponential backoff on timeouts and transient provider errors up
+to GEMINI_MAX_RETRIES times. Queue depth and wait times are tracked so the
+limits can be sized from production traffic.
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+from ..config import get_settings
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+# HTTP status codes reported by google.api_core exceptions that are worth retrying
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection problems and rate-limit/server errors are transient"""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return getattr(exc, "code", None) in RETRYABLE_STATUS_CODES
+
+class TokenBucket:
+    """Async token bucket limiting the request rate; rate <= 0 disables it"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class GeminiScheduler:
+    """Bounded-concurrency, rate-limited, deadline-enforcing gateway to Gemini"""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        per_evaluator_concurrency: int,
+        rate: float,
+        burst: int,
+        timeout: float,
+        max_retries: int,
+        retry_base_delay: float
+    ):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.per_evaluator_concurrency = max(per_evaluator_concurrency, 1)
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.max_retries = max(max_retries, 0)
+        self.retry_base_delay = retry_base_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+        self._per_evaluator: Dict[int, asyncio.Semaphore] = {}
+        self._per_evaluator_users: Dict[int, int] = {}
+        self._waits: deque = deque(maxlen=1000)
+        self.waiting = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def _ensure_loop(self) -> None:
+        """Synchronization primitives are bound to one event loop, so rebuild them on a new loop"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_concurrency)
+            self._bucket = TokenBucket(self.rate, self.burst)
+            self._per_evaluator = {}
+            self._per_evaluator_users = {}
+
+    @asynccontextmanager
+    async def slot(self, evaluator_id: Optional[int] = None) -> AsyncIterator[None]:
+        """Hold one concurrency slot (and one rate token) for the duration of the block"""
+        self._ensure_loop()
+        evaluator_sem = None
+        if evaluator_id is not None:
+            evaluator_sem = self._per_evaluator.setdefault(
+                evaluator_id, asyncio.Semaphore(self.per_evaluator_concurrency)
+            )
+            self._per_evaluator_users[evaluator_id] = self._per_evaluator_users.get(evaluator_id, 0) + 1
+
+        self.waiting += 1
+        queued_at = time.monotonic()
+        acquired_evaluator = acquired_global = False
+        try:
+            if evaluator_sem is not None:
+                await evaluator_sem.acquire()
+                acquired_evaluator = True
+            await self._global.acquire()
+            acquired_global = True
+            await self._bucket.acquire()
+        except BaseException:
+            self.waiting -= 1
+            if acquired_global:
+                self._global.release()
+            if acquired_evaluator:
+                evaluator_sem.release()
+            self._drop_evaluator(evaluator_id)
+            raise
+        self.waiting -= 1
+        self._waits.append(time.monotonic() - queued_at)
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._global.release()
+            if evaluator_sem is not None:
+                evaluator_sem.release()
+            self._drop_evaluator(evaluator_id)
+
+    def _drop_evaluator(self, evaluator_id: Optional[int]) -> None:
+        """Forget an evaluator's semaphore once nobody holds or waits for it"""
+        if evaluator_id is None:
+            return
+        users = self._per_evaluator_users.get(evaluator_id, 1) - 1
+        if users <= 0:
+            self._per_evaluator_users.pop(evaluator_id, None)
+            self._per_evaluator.pop(evaluator_id, None)
+        else:
+            self._per_evaluator_users[evaluator_id] = users
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.retry_base_delay * (2 ** attempt), 10.0))
+
+    async def call(self, factory: Callable[[], Awaitable[T]], evaluator_id: Optional[int] = None) -> T:
+        """
+        Run factory() under the scheduler's limits.
+        factory must create a fresh awaitable on every call so it can be retried.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(evaluator_id):
+                    self.calls += 1
+                    return await asyncio.wait_for(factory(), timeout=self.timeout)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                delay = self._backoff(attempt)
+                attempt += 1
+                logger.warning(
+                    f"Gemini call failed ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "per_evaluator_concurrency": self.per_evaluator_concurrency,
+            "rate_limit": self.rate,
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+            "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0.0,
+            "max_wait_ms": round(waits[-1] * 1000, 2) if waits else 0.0
+        }
+
+gemini_scheduler = GeminiScheduler(
+    max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+    per_evaluator_concurrency=settings.GEMINI_PER_EVALUATOR_CONCURRENCY,
+    rate=settings.GEMINI_RATE_LIMIT,
+    burst=settings.GEMINI_BURST,
+    timeout=settings.GEMINI_TIMEOUT,
+    max_retries=settings.GEMINI_MAX_RETRIES,
+    retry_base_delay=settings.GEMINI_RETRY_BASE_DELAY
+)
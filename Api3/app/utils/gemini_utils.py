@@ -1,54 +1,203 @@
-import google.generativeai as genai  # type: ignore
-from typing import Optional, List, Dict, Any, Tuple, Union
+from typing import Optional, List, Dict, Any, Tuple, Union, Callable
 from ..config import get_settings
+from .eval_cache import evaluation_cache
+from .gemini_scheduler import gemini_scheduler
+from datetime import datetime
 import json
 import asyncio
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 # Type hint for Gemini model - using Any to avoid type checker issues
 GeminiModel = Union[Any, None]
+# Receives streamed feedback text as it is generated; None means discard what was sent (a retry)
+ChunkCallback = Callable[[Optional[str]], None]
+
+_model: GeminiModel = None
+_model_initialized = False
+_model_lock = threading.Lock()
+_health_task: Optional[asyncio.Task] = None
+_health: Dict[str, Any] = {"status": "unknown", "checked_at": None, "error": None}
+
+def is_fake_backend() -> bool:
+    return settings.GEMINI_BACKEND.lower() == "fake"
+
+def is_gemini_configured() -> bool:
+    if is_fake_backend():
+        return True
+    return bool(settings.GEMINI_API_KEY) and settings.GEMINI_API_KEY != "your-gemini-api-key-here"
 
 # Configure the Gemini API
 def configure_gemini() -> GeminiModel:
-    """Configure Gemini API with proper error handling"""
+    """Create the Gemini client without any network round-trip"""
     try:
-        if not settings.GEMINI_API_KEY or settings.GEMINI_API_KEY == "your-gemini-api-key-here":
+        if is_fake_backend():
+            from .fake_gemini import FakeGenerativeModel
+            logger.warning("Using the offline fake Gemini backend. Grades are simulated.")
+            return FakeGenerativeModel(
+                latency_median=settings.FAKE_GEMINI_LATENCY_MEDIAN,
+                latency_sigma=settings.FAKE_GEMINI_LATENCY_SIGMA,
+                error_rate=settings.FAKE_GEMINI_ERROR_RATE,
+                stream_chunks=settings.FAKE_GEMINI_STREAM_CHUNKS,
+                first_token_fraction=settings.FAKE_GEMINI_FIRST_TOKEN_FRACTION,
+                seed=settings.FAKE_GEMINI_SEED
+            )
+
+        if not is_gemini_configured():
             logger.warning("Gemini API key not configured. Auto-evaluation will use fallback mode.")
             return None
         
+        # Deferred so that importing this module stays cheap
+        import google.generativeai as genai  # type: ignore
+        
         genai.configure(api_key=settings.GEMINI_API_KEY)  # type: ignore
-        model = genai.GenerativeModel('gemini-1.5-flash')  # type: ignore
-        
-        # Test the API with a simple call
-        try:
-            test_response = model.generate_content("Test")
-            logger.info("Gemini API configured and tested successfully")
-            return model
-        except Exception as api_error:
-            logger.error(f"Gemini API test failed: {api_error}")
-            logger.warning("Falling back to mock evaluation mode")
-            return None
+        return genai.GenerativeModel(settings.GEMINI_MODEL)  # type: ignore
             
     except Exception as e:
         logger.error(f"Failed to configure Gemini API: {e}")
         logger.warning("Falling back to mock evaluation mode")
         return None
 
-# Initialize model
-model: GeminiModel = configure_gemini()
+def get_model() -> GeminiModel:
+    """Return the Gemini client, creating it on first use"""
+    global _model, _model_initialized
+    if not _model_initialized:
+        with _model_lock:
+            if not _model_initialized:
+                _model = configure_gemini()
+                _model_initialized = True
+    return _model
+
+def _available_model() -> GeminiModel:
+    """The Gemini client, unless the last health probe found the API unusable"""
+    if _health["status"] == "unavailable":
+        return None
+    return get_model()
+
+async def check_gemini_health() -> Dict[str, Any]:
+    """Probe the Gemini API once and cache the result"""
+    # Creating the client imports google.generativeai, so keep it off the event loop
+    model = await asyncio.to_thread(get_model)
+    if not model:
+        _health.update(status="not_configured", checked_at=datetime.utcnow().isoformat(), error=None)
+        return dict(_health)
+    try:
+        await asyncio.wait_for(model.generate_content_async("Test"), timeout=settings.GEMINI_TIMEOUT)
+        _health.update(status="ok", checked_at=datetime.utcnow().isoformat(), error=None)
+        logger.info("Gemini API health check passed")
+    except Exception as e:
+        _health.update(status="unavailable", checked_at=datetime.utcnow().isoformat(), error=str(e) or type(e).__name__)
+        logger.error(f"Gemini API health check failed: {e}")
+        logger.warning("Falling back to mock evaluation mode until the next health check")
+    return dict(_health)
+
+async def _health_loop() -> None:
+    while True:
+        await check_gemini_health()
+        if _health["status"] == "not_configured":
+            return
+        await asyncio.sleep(settings.GEMINI_HEALTH_INTERVAL)
+
+def start_gemini_health_probe() -> None:
+    """Run the health probe in the background so startup never waits on the network"""
+    global _health_task
+    if _health_task is None or _health_task.done():
+        _health_task = asyncio.create_task(_health_loop())
+
+async def stop_gemini_health_probe() -> None:
+    global _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        await asyncio.gather(_health_task, return_exceptions=True)
+        _health_task = None
+
+def gemini_health() -> Dict[str, Any]:
+    """Cached result of the most recent health probe"""
+    return dict(_health)
+
+async def _generate(
+    model: Any,
+    prompt: str,
+    evaluator_id: Optional[int] = None,
+    on_chunk: Optional[ChunkCallback] = None
+) -> str:
+    """
+    Send a prompt to Gemini through the shared scheduler (concurrency, rate, timeout, retries)
+    and return the response text. With on_chunk the response is streamed and every chunk is
+    forwarded as it arrives; the returned text is the same either way.
+    """
+    if on_chunk is None:
+        response = await gemini_scheduler.call(
+            lambda: model.generate_content_async(prompt),  # type: ignore
+            evaluator_id=evaluator_id
+        )
+        return response.text
+
+    started = False
+
+    async def stream_once() -> str:
+        nonlocal started
+        if started:
+            on_chunk(None)
+        started = True
+        response = await model.generate_content_async(prompt, stream=True)  # type: ignore
+        parts = []
+        async for chunk in response:
+            text = chunk.text
+            if text:
+                parts.append(text)
+                on_chunk(text)
+        return "".join(parts)
+
+    return await gemini_scheduler.call(stream_once, evaluator_id=evaluator_id)
+
+def parse_scored_response(response_text: str) -> tuple[int, str]:
+    """Split a "Score: ... / Feedback: ..." response into (score, feedback)"""
+    lines = response_text.split('\n')
+    score_line = next(line for line in lines if line.startswith('Score:'))
+    score = int(score_line.split(':')[1].strip())
+    
+    feedback = '\n'.join(lines[lines.index(next(line for line in lines if line.startswith('Feedback:'))):])\
+        .replace('Feedback:', '').strip()
+    return score, feedback
+
+def _cache_key(
+    evaluator_id: Optional[int],
+    evaluator_version: Optional[str],
+    kind: str,
+    submission: str,
+    *extra: Any
+) -> Optional[str]:
+    """Build a result cache key, or None when the call can't be attributed to an evaluator"""
+    if evaluator_id is None:
+        return None
+    return evaluation_cache.make_key(
+        evaluator_id, evaluator_version, kind, settings.GEMINI_MODEL, submission, *extra
+    )
 
 async def evaluate_quiz(
     quiz_content: str,
     student_answer: str,
-    max_points: int = 100
+    max_points: int = 100,
+    evaluator_id: Optional[int] = None,
+    evaluator_version: Optional[str] = None,
+    on_chunk: Optional[ChunkCallback] = None
 ) -> tuple[int, str]:
     """
     Use Gemini AI to evaluate a quiz submission
     Returns: (score, feedback)
+    Results are cached per evaluator when evaluator_id is given.
     """
+    model = _available_model()
+    cache_key = _cache_key(evaluator_id, evaluator_version, "open_ended", student_answer, max_points)
+    if cache_key and model:
+        cached = await evaluation_cache.get(cache_key)
+        if cached:
+            return cached
+
     try:
         prompt = f"""
         You are an educational AI evaluator. Evaluate the student's answer based on the quiz content.
@@ -71,17 +220,11 @@ async def evaluate_quiz(
             logger.warning("Gemini model not available. Using fallback evaluation.")
             return _mock_evaluate_quiz(quiz_content, student_answer, max_points)
         
-        response = await model.generate_content_async(prompt)  # type: ignore
-        response_text = response.text
-        
-        # Parse the response
-        lines = response_text.split('\n')
-        score_line = next(line for line in lines if line.startswith('Score:'))
-        score = int(score_line.split(':')[1].strip())
-        
-        feedback = '\n'.join(lines[lines.index(next(line for line in lines if line.startswith('Feedback:'))):])\
-            .replace('Feedback:', '').strip()
+        response_text = await _generate(model, prompt, evaluator_id, on_chunk)
+        score, feedback = parse_scored_response(response_text)
         
+        if cache_key:
+            await evaluation_cache.set(cache_key, score, feedback)
         return score, feedback
         
     except Exception as e:
@@ -89,6 +232,10 @@ async def evaluate_quiz(
         logger.error(f"Error in Gemini evaluation: {str(e)}")
         return _mock_evaluate_quiz(quiz_content, student_answer, max_points)
 
+def is_fallback_feedback(feedback: str) -> bool:
+    """Whether feedback came from one of the heuristic fallbacks rather than Gemini"""
+    return "🤖 Note:" in (feedback or "")
+
 def _mock_evaluate_quiz(quiz_content: str, student_answer: str, max_points: int) -> tuple[int, str]:
     """Fallback evaluation when Gemini is not available"""
     # Simple heuristic-based evaluation
@@ -125,10 +272,14 @@ def _mock_evaluate_quiz(quiz_content: str, student_answer: str, max_points: int)
 async def evaluate_multiple_choice(
     correct_answers: list[str],
     student_answers: list[str],
-    points_per_question: Optional[int] = None
+    points_per_question: Optional[int] = None,
+    evaluator_id: Optional[int] = None,
+    evaluator_version: Optional[str] = None,
+    on_chunk: Optional[ChunkCallback] = None
 ) -> tuple[int, str]:
     """
     Evaluate multiple choice questions and provide AI-enhanced feedback
+    Results are cached per evaluator when evaluator_id is given.
     """
     if len(correct_answers) != len(student_answers):
         return 0, "Number of answers doesn't match number of questions"
@@ -137,6 +288,15 @@ async def evaluate_multiple_choice(
     correct_count = sum(1 for ca, sa in zip(correct_answers, student_answers) if ca == sa)
     score = correct_count * points_per_q
     
+    model = _available_model()
+    cache_key = _cache_key(
+        evaluator_id, evaluator_version, "multiple_choice", json.dumps(student_answers), points_per_q
+    )
+    if cache_key and model:
+        cached = await evaluation_cache.get(cache_key)
+        if cached:
+            return cached
+    
     try:
         # Use Gemini to generate detailed feedback
         prompt = f"""As an educational evaluator, provide detailed feedback for this multiple choice quiz:
@@ -160,9 +320,10 @@ async def evaluate_multiple_choice(
             logger.warning("Gemini model not available. Using fallback evaluation.")
             return _mock_evaluate_multiple_choice(correct_answers, student_answers, points_per_q)
         
-        response = await model.generate_content_async(prompt)  # type: ignore
-        detailed_feedback = response.text
+        detailed_feedback = await _generate(model, prompt, evaluator_id, on_chunk)
         
+        if cache_key:
+            await evaluation_cache.set(cache_key, min(score, 100), detailed_feedback)
         return min(score, 100), detailed_feedback
         
     except Exception as e:
@@ -198,12 +359,23 @@ async def evaluate_code(
     problem_description: str,
     test_cases: List[Dict[str, Any]],
     student_code: str,
-    language: str
+    language: str,
+    evaluator_id: Optional[int] = None,
+    evaluator_version: Optional[str] = None,
+    on_chunk: Optional[ChunkCallback] = None
 ) -> tuple[int, str]:
     """
     Evaluate a code submission using Gemini AI.
     Returns a tuple of (score, feedback).
+    Results are cached per evaluator when evaluator_id is given.
     """
+    model = _available_model()
+    cache_key = _cache_key(evaluator_id, evaluator_version, "code", student_code, language)
+    if cache_key and model:
+        cached = await evaluation_cache.get(cache_key)
+        if cached:
+            return cached
+
     try:
         prompt = f"""As a coding evaluator, evaluate this {language} code submission:
         
@@ -232,23 +404,71 @@ async def evaluate_code(
             logger.warning("Gemini model not available. Using fallback evaluation.")
             return _mock_evaluate_code(problem_description, test_cases, student_code, language)
         
-        response = await model.generate_content_async(prompt)  # type: ignore
-        response_text = response.text
-        
-        # Parse the response
-        lines = response_text.split('\n')
-        score_line = next(line for line in lines if line.startswith('Score:'))
-        score = int(score_line.split(':')[1].strip())
-        
-        feedback = '\n'.join(lines[lines.index(next(line for line in lines if line.startswith('Feedback:'))):])\
-            .replace('Feedback:', '').strip()
+        response_text = await _generate(model, prompt, evaluator_id, on_chunk)
+        score, feedback = parse_scored_response(response_text)
         
+        if cache_key:
+            await evaluation_cache.set(cache_key, score, feedback)
         return score, feedback
         
     except Exception as e:
         logger.error(f"Error in Gemini code evaluation: {str(e)}")
         return _mock_evaluate_code(problem_description, test_cases, student_code, language)
 
+async def review_code(
+    problem_description: str,
+    student_code: str,
+    language: str,
+    test_summary: str,
+    evaluator_id: Optional[int] = None,
+    evaluator_version: Optional[str] = None,
+    on_chunk: Optional[ChunkCallback] = None
+) -> Optional[str]:
+    """
+    Ask Gemini for qualitative feedback on code that was already scored by running its test cases.
+    Returns None when Gemini is unavailable; the score never depends on this call.
+    """
+    model = _available_model()
+    if not model:
+        return None
+    cache_key = _cache_key(evaluator_id, evaluator_version, "code_review", student_code, language, test_summary)
+    if cache_key:
+        cached = await evaluation_cache.get(cache_key)
+        if cached:
+            return cached[1]
+
+    try:
+        prompt = f"""As a coding mentor, review this {language} code submission.
+        The code has already been scored automatically by running the test cases, so do not give a score.
+        
+        Problem Description:
+        {problem_description}
+        
+        Student's Code:
+        ```{language}
+        {student_code}
+        ```
+        
+        Test Results:
+        {test_summary}
+        
+        Please comment briefly on:
+        1. Why any failing test cases fail
+        2. Code quality (style, efficiency, readability)
+        3. Error handling and edge cases
+        """
+        
+        review = (await _generate(model, prompt, evaluator_id, on_chunk)).strip()
+        
+        if cache_key:
+            # The cache stores (score, feedback) pairs; reviews carry no score
+            await evaluation_cache.set(cache_key, 0, review)
+        return review
+        
+    except Exception as e:
+        logger.error(f"Error in Gemini code review: {str(e)}")
+        return None
+
 def _mock_evaluate_code(problem_description: str, test_cases: List[Dict[str, Any]], student_code: str, language: str) -> tuple[int, str]:
     """Fallback code evaluation when Gemini is not available"""
     code_length = len(student_code.strip())
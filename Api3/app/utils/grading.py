@@ -0,0 +1,158 @@
+from ..models.evaluator import Evaluator, EvaluatorType, QuizType
+from ..config import get_settings
+from .gemini_utils import (
+    evaluate_quiz,
+    evaluate_multiple_choice,
+    evaluate_code,
+    review_code,
+    is_fallback_feedback,
+    ChunkCallback
+)
+from .eval_cache import evaluator_version
+from .code_runner import can_run_locally, run_test_cases, summarize_test_results
+from .similarity import similarity_index, REUSED_GRADE_NOTE
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Submission statuses used by the auto-grading pipeline
+STATUS_QUEUED = "queued"
+STATUS_GRADING = "grading"
+STATUS_AUTO_GRADED = "auto_graded"
+STATUS_PENDING_MANUAL = "submitted_pending_auto_grade"
+STATUS_AUTO_EVAL_FAILED = "auto_eval_failed"
+STATUS_TEACHER_GRADED = "graded"
+
+MANUAL_REVIEW_FEEDBACK = "Auto-evaluation failed. A teacher will review your submission manually."
+
+def supports_auto_grading(evaluator: Evaluator) -> bool:
+    """Check whether submissions to this evaluator are graded automatically"""
+    is_auto_eval = getattr(evaluator, 'is_auto_eval', 0)
+    evaluator_type = getattr(evaluator, 'type', None)
+    return bool(is_auto_eval) and evaluator_type == EvaluatorType.QUIZ
+
+def score_comes_from_gemini(evaluator: Evaluator) -> bool:
+    """Whether Gemini decides the score, rather than only writing feedback for an exact one"""
+    quiz_type = getattr(evaluator, 'quiz_type', None)
+    if quiz_type == QuizType.MULTIPLE_CHOICE:
+        return False
+    if quiz_type == QuizType.CODE_EVALUATION:
+        quiz_data = getattr(evaluator, 'quiz_data', None) or {}
+        return not can_run_locally(quiz_data.get("language", "python"), quiz_data.get("test_cases", []))
+    return True
+
+def grading_version(evaluator: Evaluator) -> str:
+    """Digest of the evaluator fields that influence grading"""
+    quiz_type = getattr(evaluator, 'quiz_type', None)
+    return evaluator_version(
+        getattr(evaluator, 'description', '') or "",
+        quiz_type.value if quiz_type else None,
+        getattr(evaluator, 'quiz_data', None) or {}
+    )
+
+async def grade_submission(
+    evaluator: Evaluator,
+    submission_content: str,
+    on_chunk: Optional[ChunkCallback] = None,
+    submission_id: Optional[int] = None,
+    reuse_similar: bool = True
+) -> tuple[int, str]:
+    """
+    Grade a submission against an auto-evaluated quiz.
+    Returns: (score, feedback)
+    Raises ValueError when the submission cannot be parsed for the quiz type.
+    on_chunk receives AI feedback text as it is generated, for live streaming.
+    With submission_id, free-text answers that nearly duplicate a graded one reuse its grade
+    unless reuse_similar is False.
+    """
+    quiz_data = getattr(evaluator, 'quiz_data', None) or {}
+    quiz_type = getattr(evaluator, 'quiz_type', None)
+    description = getattr(evaluator, 'description', '') or ""
+    # Identifies this evaluator's grading setup for the evaluation result cache
+    cache_scope = {
+        "evaluator_id": getattr(evaluator, 'id', None),
+        "evaluator_version": grading_version(evaluator)
+    }
+
+    if quiz_type == QuizType.MULTIPLE_CHOICE:
+        # For multiple choice quizzes
+        student_answers = json.loads(submission_content)
+        return await evaluate_multiple_choice(
+            correct_answers=quiz_data.get("correct_answers", []),
+            student_answers=student_answers,
+            on_chunk=on_chunk,
+            **cache_scope
+        )
+    elif quiz_type == QuizType.CODE_EVALUATION:
+        # For code evaluation quizzes
+        language = quiz_data.get("language", "python")
+        test_cases = quiz_data.get("test_cases", [])
+        if can_run_locally(language, test_cases):
+            return await _grade_code_with_test_cases(
+                description, submission_content, language, test_cases, cache_scope, on_chunk
+            )
+        return await evaluate_code(
+            problem_description=description,
+            test_cases=quiz_data.get("test_cases", []),
+            student_code=submission_content,
+            language=quiz_data.get("language", "python"),
+            on_chunk=on_chunk,
+            **cache_scope
+        )
+    else:
+        # For open-ended quizzes
+        use_similarity = (
+            settings.SIMILARITY_ENABLED
+            and submission_id is not None
+            and cache_scope["evaluator_id"] is not None
+        )
+        if use_similarity and reuse_similar:
+            match = await run_in_threadpool(
+                similarity_index.find_graded_match,
+                cache_scope["evaluator_id"], cache_scope["evaluator_version"], submission_id, submission_content
+            )
+            if match:
+                score, feedback, similarity = match
+                logger.info(f"Reusing grade for submission {submission_id} (similarity {similarity:.2f})")
+                return score, f"{feedback}\n\n{REUSED_GRADE_NOTE}"
+        score, feedback = await evaluate_quiz(
+            quiz_content=description,
+            student_answer=submission_content,
+            on_chunk=on_chunk,
+            **cache_scope
+        )
+        if use_similarity and not is_fallback_feedback(feedback):
+            similarity_index.record_grade(
+                cache_scope["evaluator_id"], submission_id, submission_content, score, feedback
+            )
+        return score, feedback
+
+async def _grade_code_with_test_cases(
+    description: str,
+    student_code: str,
+    language: str,
+    test_cases: list,
+    cache_scope: dict,
+    on_chunk: Optional[ChunkCallback] = None
+) -> tuple[int, str]:
+    """Score code by running it against the stored test cases; Gemini only adds commentary"""
+    results = await run_test_cases(student_code, test_cases)
+    score, feedback = summarize_test_results(results)
+    if settings.CODE_RUNNER_LLM_FEEDBACK:
+        if on_chunk:
+            on_chunk(f"{feedback}\n\n")
+        review = await review_code(
+            problem_description=description,
+            student_code=student_code,
+            language=language,
+            test_summary=feedback,
+            on_chunk=on_chunk,
+            **cache_scope
+        )
+        if review:
+            feedback = f"{feedback}\n\n{review}"
+    return score, feedback
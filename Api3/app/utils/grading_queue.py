@@ -0,0 +1,487 @@
+"""
+Durable, database-backed queue for auto-grading submissions.
+
+Submissions are stored with a ``queued`` status together with a GradingJob row
+in the same transaction, so a job survives process restarts. A pool of asyncio
+workers claims due jobs with a conditional UPDATE, grades them and writes the
+result back to the submission. Failed attempts are retried with exponential
+backoff, and jobs left ``running`` by a crashed worker are re-queued once their
+lease expires. Workers renew the lease while a job is in flight, and only write
+a result back while they still hold it. While Gemini is configured, a score that Gemini should have
+decided but only came from the heuristic fallback counts as a failed attempt
+rather than a result; exact scores (multiple choice, code run against its test
+cases) are recorded even when only the commentary fell back. AI feedback is
+streamed to feedback_streams while it is generated.
+
+Jobs created by a bulk re-evaluation run carry its run_id. They are claimed
+after interactive submissions, at most max_parallel at a time per run, and
+leave the submission's current grade in place until a new one is ready.
+"""
+from sqlalchemy import func, case, or_, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, Dict, Any, Union
+from ..config import get_settings
+from ..database.database import SessionLocal
+from ..models.evaluator import Evaluator, EvaluatorSubmission
+from ..models.grading import GradingJob, GradingJobStatus, BulkEvaluationRun, BulkRunStatus
+from .grading import (
+    grade_submission,
+    score_comes_from_gemini,
+    STATUS_QUEUED,
+    STATUS_GRADING,
+    STATUS_AUTO_GRADED,
+    STATUS_PENDING_MANUAL,
+    STATUS_TEACHER_GRADED,
+    MANUAL_REVIEW_FEEDBACK
+)
+from .feedback_stream import feedback_streams
+from .gemini_utils import is_gemini_configured, is_fallback_feedback
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+import random
+import socket
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def enqueue_grading_job(db: Union[Session, AsyncSession], submission: EvaluatorSubmission) -> GradingJob:
+    """
+    Add a grading job for a submission to the session (sync or async).
+    The caller commits, so the submission and its job are persisted atomically.
+    """
+    setattr(submission, 'status', STATUS_QUEUED)
+    job = GradingJob(
+        submission=submission,
+        status=GradingJobStatus.QUEUED.value,
+        attempts=0,
+        max_attempts=settings.GRADING_MAX_ATTEMPTS,
+        next_run_at=datetime.utcnow()
+    )
+    db.add(job)
+    return job
+
+def cancel_pending_jobs(db: Session, submission_id: int) -> int:
+    """
+    Mark queued and running jobs for a submission as completed, e.g. after it was graded inline.
+    A worker still grading one of them loses its lease, so its late result is dropped.
+    """
+    return db.query(GradingJob).filter(
+        GradingJob.submission_id == submission_id,
+        GradingJob.status.in_([GradingJobStatus.QUEUED.value, GradingJobStatus.RUNNING.value])
+    ).update({
+        GradingJob.status: GradingJobStatus.COMPLETED.value,
+        GradingJob.locked_by: None,
+        GradingJob.updated_at: datetime.utcnow()
+    }, synchronize_session=False)
+
+def _lease_held(job_id: int, worker_id: str) -> tuple:
+    """Filter for a job that is still running under this worker's lease"""
+    return (
+        GradingJob.id == job_id,
+        GradingJob.status == GradingJobStatus.RUNNING.value,
+        GradingJob.locked_by == worker_id
+    )
+
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter on top of the base delay"""
+    base = settings.GRADING_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0))
+    return base + random.uniform(0, base)
+
+class GradingWorkerPool:
+    """Pool of asyncio workers that drain the grading_jobs table"""
+
+    def __init__(self, size: int, poll_interval: float, lease_timeout: int):
+        self.size = size
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: list[asyncio.Task] = []
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+        self._in_flight = 0
+        self._processed = 0
+        self._failed = 0
+        self._retried = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Recover abandoned jobs and start the worker tasks"""
+        if self.running or self.size <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        recovered = await run_in_threadpool(self.recover_stale_jobs)
+        if recovered:
+            logger.warning(f"Re-queued {recovered} abandoned grading job(s)")
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self.worker_prefix}:{i}"))
+            for i in range(self.size)
+        ]
+        self._reaper_task = asyncio.create_task(self._reaper())
+        logger.info(f"Started {self.size} grading worker(s)")
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Stop claiming new jobs and wait for in-flight jobs to finish"""
+        if not self.running:
+            return
+        self._stopping = True
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+        self.notify()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        logger.info("Grading workers stopped")
+
+    def notify(self) -> None:
+        """Wake idle workers; safe to call from the event loop or from a thread"""
+        if self._loop is None or self._wake is None:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _worker(self, worker_id: str) -> None:
+        while not self._stopping:
+            try:
+                job_id = await run_in_threadpool(self._claim_next, worker_id)
+            except Exception as e:
+                logger.error(f"Grading worker {worker_id} failed to poll queue: {str(e)}")
+                job_id = None
+            if job_id is None:
+                await self._wait_for_work()
+                continue
+            self._in_flight += 1
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id))
+            try:
+                await self._process(job_id, worker_id)
+            except asyncio.CancelledError:
+                # Hand the job back so another worker can pick it up immediately
+                await run_in_threadpool(self._release, job_id, worker_id)
+                raise
+            except Exception as e:
+                # Keep the worker alive and put the job through the normal retry path
+                logger.error(f"Grading worker {worker_id} crashed on job {job_id}: {str(e)}")
+                try:
+                    await self._fail_crashed(job_id, worker_id, str(e))
+                except Exception as e:
+                    logger.error(f"Could not re-queue grading job {job_id}, it will be recovered when its lease expires: {str(e)}")
+            finally:
+                heartbeat.cancel()
+                self._in_flight -= 1
+
+    async def _heartbeat(self, job_id: int, worker_id: str) -> None:
+        """Keep renewing the job's lease so the reaper doesn't hand a slow job to another worker"""
+        interval = self.lease_timeout / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await run_in_threadpool(self._renew_lease, job_id, worker_id)
+            except Exception as e:
+                logger.error(f"Failed to renew the lease on grading job {job_id}: {str(e)}")
+                continue
+            if not renewed:
+                logger.warning(f"Grading worker {worker_id} lost its lease on job {job_id}")
+                return
+
+    def _renew_lease(self, job_id: int, worker_id: str) -> bool:
+        with SessionLocal() as db:
+            renewed = db.query(GradingJob).filter(*_lease_held(job_id, worker_id)).update(
+                {GradingJob.locked_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+            return bool(renewed)
+
+    async def _reaper(self) -> None:
+        """Periodically re-queue jobs whose worker disappeared"""
+        interval = max(self.lease_timeout / 2, self.poll_interval)
+        while not self._stopping:
+            await asyncio.sleep(interval)
+            try:
+                recovered = await run_in_threadpool(self.recover_stale_jobs)
+                if recovered:
+                    logger.warning(f"Re-queued {recovered} abandoned grading job(s)")
+                    self.notify()
+            except Exception as e:
+                logger.error(f"Failed to recover stale grading jobs: {str(e)}")
+
+    def _claim_next(self, worker_id: str) -> Optional[int]:
+        """Atomically move the oldest due job from queued to running"""
+        with SessionLocal() as db:
+            now = datetime.utcnow()
+            running_in_run = select(func.count(GradingJob.id)).where(
+                GradingJob.run_id == BulkEvaluationRun.id,
+                GradingJob.status == GradingJobStatus.RUNNING.value
+            ).correlate(BulkEvaluationRun).scalar_subquery()
+            # Students waiting on a fresh submission go ahead of bulk re-evaluations
+            candidates = db.query(GradingJob.id, GradingJob.run_id, BulkEvaluationRun.max_parallel).outerjoin(
+                BulkEvaluationRun, GradingJob.run_id == BulkEvaluationRun.id
+            ).filter(
+                GradingJob.status == GradingJobStatus.QUEUED.value,
+                GradingJob.next_run_at <= now,
+                or_(
+                    GradingJob.run_id.is_(None),
+                    and_(
+                        BulkEvaluationRun.status == BulkRunStatus.RUNNING.value,
+                        running_in_run < BulkEvaluationRun.max_parallel
+                    )
+                )
+            ).order_by(GradingJob.run_id.isnot(None), GradingJob.next_run_at, GradingJob.id).limit(5).all()
+
+            for job_id, run_id, max_parallel in candidates:
+                conditions = [GradingJob.id == job_id, GradingJob.status == GradingJobStatus.QUEUED.value]
+                if run_id is not None:
+                    # Re-checked in the UPDATE so concurrent workers can't exceed the run's limit
+                    running = select(func.count(GradingJob.id)).where(
+                        GradingJob.run_id == run_id,
+                        GradingJob.status == GradingJobStatus.RUNNING.value
+                    ).scalar_subquery()
+                    conditions.append(running < max_parallel)
+                claimed = db.query(GradingJob).filter(*conditions).update({
+                    GradingJob.status: GradingJobStatus.RUNNING.value,
+                    GradingJob.locked_by: worker_id,
+                    GradingJob.locked_at: now,
+                    GradingJob.attempts: GradingJob.attempts + 1,
+                    GradingJob.updated_at: now
+                }, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    return job_id
+        return None
+
+    def _load(self, job_id: int) -> Optional[tuple[int, int, Optional[int], Evaluator, str]]:
+        """Mark the submission as grading and return a detached copy of what the grader needs"""
+        with SessionLocal() as db:
+            job = db.query(GradingJob).filter(GradingJob.id == job_id).first()
+            submission = job.submission if job else None
+            evaluator = submission.evaluator if submission else None
+            if not job or not submission or not evaluator:
+                if job:
+                    job.status = GradingJobStatus.FAILED.value
+                    job.last_error = "Submission or evaluator no longer exists"
+                    job.locked_by = None
+                    db.commit()
+                return None
+            db.expunge(evaluator)
+            content = getattr(submission, 'submission_content', '') or ""
+            if job.run_id is None:
+                submission.status = STATUS_GRADING
+            attempts = job.attempts
+            run_id = job.run_id
+            db.commit()
+            return attempts, submission.id, run_id, evaluator, content
+
+    async def _process(self, job_id: int, worker_id: str) -> None:
+        loaded = await run_in_threadpool(self._load, job_id)
+        if loaded is None:
+            return
+        attempts, submission_id, run_id, evaluator, content = loaded
+        try:
+            score, feedback = await grade_submission(
+                evaluator,
+                content,
+                on_chunk=lambda text: feedback_streams.publish(submission_id, text),
+                submission_id=submission_id,
+                # A re-evaluation must not copy an older grade from a similar answer
+                reuse_similar=run_id is None
+            )
+            if is_gemini_configured() and is_fallback_feedback(feedback) and score_comes_from_gemini(evaluator):
+                # Gemini failed this time; retry rather than record (or overwrite a grade with) a heuristic one
+                raise RuntimeError("Gemini evaluation failed, only a fallback grade was produced")
+        except ValueError as e:
+            # Malformed submission content will never parse, so don't retry it
+            logger.error(f"Grading job {job_id} failed permanently: {str(e)}")
+            status = await run_in_threadpool(self._fail, job_id, worker_id, submission_id, str(e), False)
+            self._announce_failure(submission_id, status)
+            return
+        except Exception as e:
+            logger.error(f"Grading job {job_id} attempt {attempts} failed: {str(e)}")
+            status = await run_in_threadpool(self._fail, job_id, worker_id, submission_id, str(e), True)
+            self._announce_failure(submission_id, status)
+            return
+        if not await run_in_threadpool(self._complete, job_id, worker_id, submission_id, score, feedback):
+            # Whoever holds the job now (or the inline grade) decides the result
+            feedback_streams.publish(submission_id, None)
+            return
+        feedback_streams.finish(submission_id, {
+            "status": STATUS_AUTO_GRADED,
+            "provisional_grade": score,
+            "feedback": feedback
+        })
+
+    @staticmethod
+    def _announce_failure(submission_id: int, status: Optional[str]) -> None:
+        """
+        Tell stream subscribers whether the submission went to manual review or back in the queue.
+        Anything else (a bulk re-evaluation, a dropped failure) just resets the stream.
+        """
+        if status == STATUS_PENDING_MANUAL:
+            feedback_streams.finish(submission_id, {
+                "status": STATUS_PENDING_MANUAL,
+                "provisional_grade": None,
+                "feedback": MANUAL_REVIEW_FEEDBACK
+            })
+        else:
+            feedback_streams.publish(submission_id, None)
+
+    async def _fail_crashed(self, job_id: int, worker_id: str, error: str) -> None:
+        """Retry or fail a job whose processing raised, unless this worker no longer holds it"""
+        submission_id = await run_in_threadpool(self._submission_id, job_id)
+        if submission_id is None:
+            return
+        status = await run_in_threadpool(self._fail, job_id, worker_id, submission_id, error, True)
+        self._announce_failure(submission_id, status)
+
+    def _submission_id(self, job_id: int) -> Optional[int]:
+        with SessionLocal() as db:
+            return db.query(GradingJob.submission_id).filter(GradingJob.id == job_id).scalar()
+
+    def _complete(self, job_id: int, worker_id: str, submission_id: int, score: int, feedback: str) -> bool:
+        """Store the grade if this worker still holds the job; returns whether it was stored"""
+        with SessionLocal() as db:
+            now = datetime.utcnow()
+            completed = db.query(GradingJob).filter(*_lease_held(job_id, worker_id)).update({
+                GradingJob.status: GradingJobStatus.COMPLETED.value,
+                GradingJob.locked_by: None,
+                GradingJob.last_error: None,
+                GradingJob.updated_at: now
+            }, synchronize_session=False)
+            if not completed:
+                db.rollback()
+                logger.warning(f"Grading job {job_id} is no longer held by {worker_id}, dropping its result")
+                return False
+            # A teacher's final grade and feedback win over a later re-evaluation
+            teacher_graded = EvaluatorSubmission.status == STATUS_TEACHER_GRADED
+            db.query(EvaluatorSubmission).filter(EvaluatorSubmission.id == submission_id).update({
+                EvaluatorSubmission.provisional_grade: score,
+                EvaluatorSubmission.feedback: case((teacher_graded, EvaluatorSubmission.feedback), else_=feedback),
+                EvaluatorSubmission.status: case((teacher_graded, STATUS_TEACHER_GRADED), else_=STATUS_AUTO_GRADED)
+            }, synchronize_session=False)
+            db.commit()
+        self._processed += 1
+        return True
+
+    def _fail(self, job_id: int, worker_id: str, submission_id: int, error: str, retryable: bool) -> Optional[str]:
+        """
+        Re-queue or permanently fail a job; returns the submission's new status.
+        Returns None without changing anything when this worker no longer holds the job.
+        """
+        with SessionLocal() as db:
+            job = db.query(GradingJob).filter(*_lease_held(job_id, worker_id)).first()
+            if not job:
+                logger.warning(f"Grading job {job_id} is no longer held by {worker_id}, dropping its failure")
+                return None
+            if retryable and job.attempts < job.max_attempts:
+                values = {
+                    GradingJob.status: GradingJobStatus.QUEUED.value,
+                    GradingJob.next_run_at: datetime.utcnow() + timedelta(seconds=_retry_delay(job.attempts))
+                }
+                status = STATUS_QUEUED
+            else:
+                values = {GradingJob.status: GradingJobStatus.FAILED.value}
+                status = STATUS_PENDING_MANUAL
+            # Conditional, so a lease lost since the read above still wins
+            failed = db.query(GradingJob).filter(*_lease_held(job_id, worker_id)).update({
+                **values,
+                GradingJob.last_error: error,
+                GradingJob.locked_by: None,
+                GradingJob.updated_at: datetime.utcnow()
+            }, synchronize_session=False)
+            if not failed:
+                db.rollback()
+                logger.warning(f"Grading job {job_id} is no longer held by {worker_id}, dropping its failure")
+                return None
+            if status == STATUS_QUEUED:
+                self._retried += 1
+            else:
+                self._failed += 1
+            if job.run_id is not None:
+                # Re-evaluations keep the submission's previous result; the run reports the failure
+                db.commit()
+                return None
+            submission = db.query(EvaluatorSubmission).filter(EvaluatorSubmission.id == submission_id).first()
+            if submission:
+                submission.status = status
+                if status == STATUS_PENDING_MANUAL:
+                    submission.feedback = MANUAL_REVIEW_FEEDBACK
+            db.commit()
+            return status
+
+    def _release(self, job_id: int, worker_id: str) -> None:
+        with SessionLocal() as db:
+            released = db.query(GradingJob).filter(*_lease_held(job_id, worker_id)).update({
+                GradingJob.status: GradingJobStatus.QUEUED.value,
+                GradingJob.attempts: GradingJob.attempts - 1,
+                GradingJob.locked_by: None,
+                GradingJob.updated_at: datetime.utcnow()
+            }, synchronize_session=False)
+            if not released:
+                return
+            # The student sees it waiting again rather than stuck in grading
+            submission_id = select(GradingJob.submission_id).where(GradingJob.id == job_id).scalar_subquery()
+            db.query(EvaluatorSubmission).filter(
+                EvaluatorSubmission.id == submission_id,
+                EvaluatorSubmission.status == STATUS_GRADING
+            ).update({EvaluatorSubmission.status: STATUS_QUEUED}, synchronize_session=False)
+            db.commit()
+
+    def recover_stale_jobs(self) -> int:
+        """Re-queue running jobs whose lease has expired"""
+        with SessionLocal() as db:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.lease_timeout)
+            recovered = db.query(GradingJob).filter(
+                GradingJob.status == GradingJobStatus.RUNNING.value,
+                GradingJob.locked_at < cutoff
+            ).update({
+                GradingJob.status: GradingJobStatus.QUEUED.value,
+                GradingJob.locked_by: None,
+                GradingJob.next_run_at: datetime.utcnow()
+            }, synchronize_session=False)
+            db.commit()
+            return recovered
+
+    def stats(self, db: Session) -> Dict[str, Any]:
+        """Queue depth by status plus this process's worker counters"""
+        counts = dict(
+            db.query(GradingJob.status, func.count(GradingJob.id)).group_by(GradingJob.status).all()
+        )
+        return {
+            "jobs": {s.value: counts.get(s.value, 0) for s in GradingJobStatus},
+            "workers": self.size if self.running else 0,
+            "in_flight": self._in_flight,
+            "processed": self._processed,
+            "failed": self._failed,
+            "retried": self._retried
+        }
+
+grading_pool = GradingWorkerPool(
+    size=settings.GRADING_WORKERS,
+    poll_interval=settings.GRADING_POLL_INTERVAL,
+    lease_timeout=settings.GRADING_LEASE_TIMEOUT
+)
@@ -0,0 +1,108 @@
+"""
+Book lending as single conditional statements.
+
+Taking a copy is one UPDATE ... SET copies_available = copies_available - 1
+WHERE copies_available > 0, so requests racing for the last copy can't both
+win and nothing is read into Python first. Returning flips the lending with
+UPDATE ... WHERE is_active = 1 RETURNING book_id, so a lending is only ever
+returned once. The partial unique index uq_book_lendings_active_book_id_username
+makes a second active lending of the same book by the same user fail on
+insert; the transaction then rolls back, taking the copy decrement with it.
+"""
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
+from ..models.book import Book, BookLending
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _take_copy(db: Session, book_id: int) -> bool:
+    result = db.execute(
+        update(Book).where(Book.id == book_id, Book.copies_available > 0).values(
+            copies_available=Book.copies_available - 1
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    return result.rowcount == 1
+
+def rent_book(db: Session, book_id: int, username: str) -> BookLending:
+    if not _take_copy(db, book_id):
+        db.rollback()
+        if db.get(Book, book_id) is None:
+            raise HTTPException(status_code=404, detail="Book not found")
+        raise HTTPException(status_code=400, detail="No copies available")
+
+    lending = BookLending(book_id=book_id, username=username)
+    db.add(lending)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="You already have an active lending for this book")
+    db.refresh(lending)
+    return lending
+
+def rent_books(db: Session, book_ids: List[int], username: str) -> List[Dict[str, Any]]:
+    """Lend every available book in one transaction; each result's status is
+    lent, unavailable, already_lent or not_found"""
+    book_ids = list(dict.fromkeys(book_ids))
+    existing = set(db.scalars(select(Book.id).where(Book.id.in_(book_ids))))
+    held = set(db.scalars(select(BookLending.book_id).where(
+        BookLending.username == username,
+        BookLending.is_active == 1,
+        BookLending.book_id.in_(book_ids)
+    )))
+
+    results = []
+    for book_id in book_ids:
+        lending = None
+        if book_id not in existing:
+            outcome = "not_found"
+        elif book_id in held:
+            outcome = "already_lent"
+        elif not _take_copy(db, book_id):
+            outcome = "unavailable"
+        else:
+            outcome = "lent"
+            lending = BookLending(book_id=book_id, username=username)
+            db.add(lending)
+        results.append({"book_id": book_id, "status": outcome, "lending": lending})
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request lent one of these books to the same user after the check above
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A concurrent request changed your lendings; retry the checkout"
+        )
+
+    lent_ids = [result["lending"].id for result in results if result["lending"] is not None]
+    if lent_ids:
+        # Reload the committed lendings (and their books) in one query rather than one refresh each
+        db.scalars(select(BookLending).where(BookLending.id.in_(lent_ids))).all()
+    return results
+
+def return_lending(db: Session, lending_id: int, username: str) -> None:
+    book_id = db.execute(
+        update(BookLending).where(
+            BookLending.id == lending_id,
+            BookLending.username == username,
+            BookLending.is_active == 1
+        ).values(is_active=0, return_date=datetime.utcnow()).returning(BookLending.book_id),
+        execution_options={"synchronize_session": False}
+    ).scalar_one_or_none()
+    if book_id is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Active lending not found")
+
+    db.execute(
+        update(Book).where(Book.id == book_id).values(copies_available=Book.copies_available + 1),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
@@ -3,8 +3,15 @@ import os
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
+_configured = False
+
 def setup_logging():
-    """Configure application-wide logging"""
+    """Configure application-wide logging; later calls are no-ops"""
+    global _configured
+    if _configured:
+        return logging.getLogger()
+    _configured = True
+
     # Create logs directory if it doesn't exist
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
@@ -0,0 +1,134 @@
+"""
+Vectorized bulk re-scoring of multiple-choice submissions.
+
+Used when a teacher changes an evaluator's answer key: every submission's
+answers are loaded into one NumPy matrix, compared against the key in a single
+pass and the new grades are written back with batched UPDATEs. Per-question
+difficulty statistics fall out of the same matrix. NumPy is only imported
+once a re-score runs, not at startup.
+"""
+from __future__ import annotations
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from typing import TYPE_CHECKING, Any, Dict, List
+from ..models.evaluator import Evaluator, EvaluatorSubmission
+from .grading import STATUS_AUTO_GRADED, STATUS_TEACHER_GRADED
+import json
+import logging
+import time
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+UPDATE_BATCH_SIZE = 1000
+# Submissions the teacher already graded keep their final grade and feedback
+RESCORABLE_STATUSES = [STATUS_AUTO_GRADED, STATUS_TEACHER_GRADED]
+
+def _parse_answers(content: str, question_count: int):
+    try:
+        answers = json.loads(content)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(answers, list) or len(answers) != question_count:
+        return None
+    return [str(answer) for answer in answers]
+
+def _question_stats(key: np.ndarray, answers: np.ndarray, correct: np.ndarray) -> List[Dict[str, Any]]:
+    """Difficulty (share correct) and corrected item-total discrimination per question"""
+    import numpy as np
+    n_students, n_questions = correct.shape
+    correct_f = correct.astype(np.float64)
+    difficulty = correct_f.mean(axis=0) if n_students else np.zeros(n_questions)
+
+    # Correlate each item with the total score on the remaining items
+    rest = correct_f.sum(axis=1, keepdims=True) - correct_f
+    x = correct_f - correct_f.mean(axis=0) if n_students else correct_f
+    y = rest - rest.mean(axis=0) if n_students else rest
+    denominator = np.sqrt((x ** 2).sum(axis=0) * (y ** 2).sum(axis=0))
+    numerator = (x * y).sum(axis=0)
+    discrimination = np.divide(numerator, denominator, out=np.zeros(n_questions), where=denominator > 0)
+
+    stats = []
+    for q in range(n_questions):
+        wrong = answers[~correct[:, q], q]
+        most_common_wrong = None
+        if wrong.size:
+            values, counts = np.unique(wrong, return_counts=True)
+            most_common_wrong = str(values[counts.argmax()])
+        stats.append({
+            "question": q + 1,
+            "correct_answer": str(key[q]),
+            "correct_rate": round(float(difficulty[q]), 4),
+            "discrimination": round(float(discrimination[q]), 4),
+            "most_common_wrong_answer": most_common_wrong
+        })
+    return stats
+
+def rescore_multiple_choice(db: Session, evaluator: Evaluator) -> Dict[str, Any]:
+    """Re-score every graded submission of a multiple-choice evaluator against its current key"""
+    import numpy as np
+    started = time.perf_counter()
+    quiz_data = getattr(evaluator, 'quiz_data', None) or {}
+    key_list = [str(answer) for answer in quiz_data.get("correct_answers", [])]
+    question_count = len(key_list)
+    if not question_count:
+        raise ValueError("Evaluator has no correct_answers to score against")
+    points_per_question = 100 // question_count
+
+    rows = db.query(
+        EvaluatorSubmission.id,
+        EvaluatorSubmission.submission_content,
+        EvaluatorSubmission.status
+    ).filter(
+        EvaluatorSubmission.evaluator_id == evaluator.id,
+        EvaluatorSubmission.status.in_(RESCORABLE_STATUSES)
+    ).all()
+
+    parsed = [_parse_answers(content, question_count) for _, content, _ in rows]
+    valid_index = [i for i, answers in enumerate(parsed) if answers is not None]
+
+    key = np.array(key_list, dtype=str)
+    scores = np.zeros(len(rows), dtype=np.int64)
+    correct_counts = np.zeros(len(rows), dtype=np.int64)
+    if valid_index:
+        answers = np.array([parsed[i] for i in valid_index], dtype=str)
+        correct = answers == key
+        counts = correct.sum(axis=1)
+        correct_counts[valid_index] = counts
+        scores[valid_index] = np.minimum(counts * points_per_question, 100)
+    else:
+        answers = np.empty((0, question_count), dtype=str)
+        correct = np.zeros((0, question_count), dtype=bool)
+
+    auto_graded_params = []
+    teacher_graded_params = []
+    for i, (submission_id, _, status) in enumerate(rows):
+        score = int(scores[i])
+        if status == STATUS_TEACHER_GRADED:
+            teacher_graded_params.append({"id": submission_id, "provisional_grade": score})
+        else:
+            feedback = (
+                f"🎯 Score: {int(correct_counts[i])}/{question_count} correct answers "
+                f"(re-scored after the answer key was updated)"
+                if parsed[i] is not None
+                else "Number of answers doesn't match number of questions"
+            )
+            auto_graded_params.append({"id": submission_id, "provisional_grade": score, "feedback": feedback})
+
+    for params in (auto_graded_params, teacher_graded_params):
+        for offset in range(0, len(params), UPDATE_BATCH_SIZE):
+            db.execute(update(EvaluatorSubmission), params[offset:offset + UPDATE_BATCH_SIZE])
+    db.commit()
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Re-scored {len(rows)} submissions for evaluator {evaluator.id} in {duration_ms:.1f}ms")
+    return {
+        "evaluator_id": evaluator.id,
+        "rescored": len(rows),
+        "invalid_submissions": len(rows) - len(valid_index),
+        "mean_score": round(float(scores.mean()), 2) if len(rows) else None,
+        "duration_ms": round(duration_ms, 2),
+        "questions": _question_stats(key, answers, correct)
+    }
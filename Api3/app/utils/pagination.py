@@ -0,0 +1,135 @@
+"""
+Keyset (cursor) pagination for collection endpoints.
+
+Rows are ordered by (timestamp, id) and each page continues strictly after the
+last row of the previous one, so fetching a page costs the same however deep
+it is. Ranked search pages the same way on (score, id). Cursors are opaque to
+clients: base64url-encoded JSON of the last row's timestamp or score and id.
+The next page's cursor is returned in the X-Next-Cursor header together with a
+Link rel="next" URL; endpoints whose body is already an envelope also include
+it there. Admins can pass unpaginated=true to get every row in one response.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from fastapi import Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from typing import Any, Callable, List, Optional, Tuple, Union
+from ..config import get_settings
+from .external_auth import optional_auth
+import base64
+import binascii
+import json
+
+settings = get_settings()
+
+@dataclass
+class Page:
+    items: List[Any]
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+CursorKey = Union[datetime, float, None]
+
+def encode_cursor(key: CursorKey, row_id: int) -> str:
+    if isinstance(key, float):
+        payload = {"s": key, "i": row_id}
+    else:
+        payload = {"t": key.isoformat() if key else None, "i": row_id}
+    data = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+def decode_cursor(cursor: str) -> Tuple[CursorKey, int]:
+    """(timestamp or score, id) of the row a cursor points at; raises HTTPException(400) for malformed cursors"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if "s" in payload:
+            key: CursorKey = float(payload["s"])
+        else:
+            key = datetime.fromisoformat(payload["t"]) if payload["t"] else None
+        return key, int(payload["i"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise invalid_cursor()
+
+class PageParams:
+    """Query parameters of a paginated endpoint; sets the next-page headers on the response"""
+
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor"),
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX, description="Page size"),
+        unpaginated: bool = Query(False, description="Return every row in one response (admins only)"),
+        user_data: Optional[dict] = Depends(optional_auth)
+    ):
+        if unpaginated and (not user_data or user_data["role"] != "admin"):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only admins can request unpaginated results"
+            )
+        self.request = request
+        self.response = response
+        self.cursor = cursor
+        self.after = decode_cursor(cursor) if cursor else None
+        self.limit = limit
+        self.unpaginated = unpaginated
+
+    def set_headers(self, next_cursor: Optional[str]) -> None:
+        if next_cursor is None:
+            return
+        next_url = self.request.url.include_query_params(cursor=next_cursor)
+        self.response.headers["X-Next-Cursor"] = next_cursor
+        self.response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+def _keyset(query: Any, page: PageParams, timestamp_column: Any, id_column: Any, descending: bool) -> Any:
+    """Order by (timestamp, id), continue after the cursor and fetch one extra row to detect a next page"""
+    key = tuple_(timestamp_column, id_column)
+    if page.after is not None:
+        timestamp, row_id = page.after
+        if isinstance(timestamp, float):
+            # A search cursor replayed against a listing
+            raise invalid_cursor()
+        after = tuple_(literal(timestamp, timestamp_column.type), literal(row_id, id_column.type))
+        query = query.filter(key < after if descending else key > after)
+    if descending:
+        query = query.order_by(timestamp_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(timestamp_column, id_column)
+    return query if page.unpaginated else query.limit(page.limit + 1)
+
+def paginate_rows(rows: List[Any], page: PageParams, cursor_key: Callable[[Any], Tuple[CursorKey, int]]) -> Page:
+    """Page from rows fetched with limit+1; cursor_key gives the (timestamp or score, id) of a row"""
+    if page.unpaginated or len(rows) <= page.limit:
+        return Page(items=rows)
+    rows = rows[:page.limit]
+    next_cursor = encode_cursor(*cursor_key(rows[-1]))
+    page.set_headers(next_cursor)
+    return Page(items=rows, next_cursor=next_cursor)
+
+def _row_key(timestamp_column: Any, id_column: Any) -> Callable[[Any], Tuple[CursorKey, int]]:
+    return lambda row: (getattr(row, timestamp_column.key), getattr(row, id_column.key))
+
+def paginate(query: Any, page: PageParams, timestamp_column: Any, id_column: Any, descending: bool = False) -> Page:
+    """One page of an ORM Query"""
+    rows = _keyset(query, page, timestamp_column, id_column, descending).all()
+    return paginate_rows(rows, page, _row_key(timestamp_column, id_column))
+
+async def paginate_async(
+    db: AsyncSession,
+    statement: Select,
+    page: PageParams,
+    timestamp_column: Any,
+    id_column: Any,
+    descending: bool = False
+) -> Page:
+    """One page of a select() on an async session"""
+    rows = list((await db.scalars(_keyset(statement, page, timestamp_column, id_column, descending))).all())
+    return paginate_rows(rows, page, _row_key(timestamp_column, id_column))
@@ -0,0 +1,51 @@
+"""
+Per-request SQL statement counter.
+
+Every statement executed on any engine (sync, async and read engines alike)
+is counted against the request that issued it. The count is returned in the
+X-Query-Count response header, and requests issuing more than
+QUERY_COUNT_WARN_THRESHOLD statements are logged, which is how N+1 lazy loads
+show up. check_query_counts.py uses count_queries() to fail when an
+endpoint's statement count grows with the number of rows it returns.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Iterator, Optional
+from ..config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+class QueryCount:
+    def __init__(self):
+        self.value = 0
+
+# A mutable holder, so statements run in threadpool copies of the request context still count
+_current: ContextVar[Optional[QueryCount]] = ContextVar("query_count", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter.value += 1
+
+@contextmanager
+def count_queries() -> Iterator[QueryCount]:
+    """Count the statements executed inside the block (including in threads it hands work to)"""
+    counter = QueryCount()
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+async def query_count_middleware(request, call_next):
+    with count_queries() as counter:
+        response = await call_next(request)
+    response.headers["X-Query-Count"] = str(counter.value)
+    if counter.value > settings.QUERY_COUNT_WARN_THRESHOLD:
+        logger.warning(f"{request.method} {request.url.path} ran {counter.value} SQL statements")
+    return response
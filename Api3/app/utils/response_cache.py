@@ -0,0 +1,222 @@
+"""
+Read-through cache of whole responses for public catalog endpoints.
+
+An endpoint opts in with a cached_response(*tables) dependency, declared
+after its auth and pagination parameters so those checks still run on every
+request. Responses are keyed on the path and the sorted query parameters and
+tagged with the versions of the tables they were built from (see
+row_counts.TableVersions); any handler committing a write to one of those
+tables bumps its version, so the entry is never served again. The TTL bounds
+staleness from writes made by other processes.
+
+Every cached response carries a strong ETag, a hash of its body. A request
+whose If-None-Match matches a cached entry gets a 304 before the endpoint
+runs, so no SQL is issued; a hit without a matching ETag is answered from the
+stored body. When a hot key is missing or has expired, the first request
+rebuilds it and identical requests arriving meanwhile wait for its result
+(up to RESPONSE_CACHE_WAIT seconds) instead of all querying the database.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from fastapi import Request, Response
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+from ..config import get_settings
+from .row_counts import Versions, table_versions
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Response headers replayed from the cache along with the body
+STORED_HEADERS = ("content-type", "x-next-cursor", "link")
+CACHE_CONTROL = "no-cache"  # Clients may keep responses but must revalidate them with If-None-Match
+
+@dataclass
+class CachedEntry:
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+    versions: Versions
+    expires_at: float
+
+@dataclass
+class CacheTicket:
+    """Set on request.state by the dependency for the middleware to store the response"""
+    key: str
+    versions: Versions
+    leader: bool
+
+class CachedResponseHit(Exception):
+    """Raised by the cached_response dependency to answer without running the endpoint"""
+
+    def __init__(self, response: Response):
+        self.response = response
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+class ResponseCache:
+    """LRU of response bodies with single-flight rebuilds of missing keys"""
+
+    def __init__(self, ttl: int, max_entries: int, wait: float):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait = wait
+        self._entries: "OrderedDict[str, CachedEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Keys being rebuilt, each with the event its waiters block on; only touched on the event loop
+        self._inflight: Dict[str, asyncio.Event] = {}
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stores = 0
+
+    def get(self, key: str, versions: Versions) -> Optional[CachedEntry]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= now or entry.versions != versions:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, versions: Versions, body: bytes, headers: Dict[str, str]) -> CachedEntry:
+        entry = CachedEntry(
+            body=body,
+            etag=make_etag(body),
+            headers=headers,
+            versions=versions,
+            expires_at=time.time() + self.ttl
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stores += 1
+        return entry
+
+    async def lookup(self, key: str, versions: Versions) -> Tuple[Optional[CachedEntry], bool]:
+        """(cached entry, whether the caller is the one rebuilding it)"""
+        entry = self.get(key, versions)
+        if entry is not None:
+            return entry, False
+        event = self._inflight.get(key)
+        if event is None:
+            self._inflight[key] = asyncio.Event()
+            self.misses += 1
+            return None, True
+        self.coalesced += 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout=self.wait)
+        except asyncio.TimeoutError:
+            logger.warning(f"Gave up waiting {self.wait}s for an identical request to rebuild {key}")
+        # A failed rebuild stores nothing; waiters then build their own responses rather than queueing up again
+        return self.get(key, versions), False
+
+    def release(self, key: str) -> None:
+        event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def record_hit(self, revalidated: bool) -> None:
+        with self._lock:
+            if revalidated:
+                self.revalidated += 1
+            else:
+                self.hits += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            served = self.hits + self.revalidated
+            lookups = served + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "not_modified": self.revalidated,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "rebuilding": len(self._inflight),
+                "stores": self.stores,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0
+            }
+
+response_cache = ResponseCache(
+    ttl=settings.RESPONSE_CACHE_TTL,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    wait=settings.RESPONSE_CACHE_WAIT
+)
+
+def cache_key(request: Request) -> str:
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return f"{request.method} {request.url.netloc}{request.url.path}?{query}"
+
+def cached_response(*tables: str) -> Callable:
+    """Dependency that serves the endpoint's response from the cache while none of tables changed"""
+    async def dependency(request: Request) -> None:
+        key = cache_key(request)
+        versions = table_versions.get(tables)
+        entry, leader = await response_cache.lookup(key, versions)
+        if entry is None:
+            request.state.response_cache = CacheTicket(key=key, versions=versions, leader=leader)
+            return
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            response_cache.record_hit(revalidated=True)
+            raise CachedResponseHit(not_modified(entry.etag))
+        response_cache.record_hit(revalidated=False)
+        raise CachedResponseHit(Response(
+            content=entry.body,
+            headers={**entry.headers, "ETag": entry.etag, "Cache-Control": CACHE_CONTROL}
+        ))
+    return dependency
+
+async def cached_response_handler(request: Request, exc: CachedResponseHit) -> Response:
+    return exc.response
+
+async def response_cache_middleware(request, call_next):
+    try:
+        response = await call_next(request)
+        ticket: Optional[CacheTicket] = getattr(request.state, "response_cache", None)
+        if ticket is None or response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {name: value for name, value in response.headers.items() if name in STORED_HEADERS}
+        entry = response_cache.set(ticket.key, ticket.versions, body, headers)
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            # The client already has this body, e.g. from another worker or before the cache expired
+            return not_modified(entry.etag)
+        response = Response(content=body, status_code=200, headers=dict(response.headers))
+        response.headers["ETag"] = entry.etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        return response
+    finally:
+        ticket = getattr(request.state, "response_cache", None)
+        if ticket is not None and ticket.leader:
+            response_cache.release(ticket.key)
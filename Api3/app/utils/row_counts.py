@@ -0,0 +1,191 @@
+"""
+Total-row counts for paginated list endpoints.
+
+Three strategies, picked per request with ?count=:
+- exact: COUNT(*), cached per filter signature. Each table has a version
+  number that is bumped whenever a session commits writes to it, so a cached
+  count is only served while none of the tables it was counted from changed.
+  The TTL bounds staleness from writes made by other processes.
+- estimate: a recent exact count for the same filters if one is cached,
+  otherwise the planner's row estimate on Postgres, or on SQLite the match
+  rate of the newest COUNT_ESTIMATE_SAMPLE rows scaled to the highest id.
+- none: no count at all; clients rely on has_more from the limit+1 fetch.
+"""
+from collections import OrderedDict
+from itertools import chain
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.util import find_tables
+from typing import Any, Dict, Iterable, Optional, Tuple
+from ..config import get_settings
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+COUNT_MODES = ("exact", "estimate", "none")
+COUNT_MODE_PATTERN = f"^({'|'.join(COUNT_MODES)})$"
+
+Versions = Tuple[Tuple[str, int], ...]
+
+class TableVersions:
+    """Per-table write counters, bumped after each commit that touched the table"""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tables: Iterable[str]) -> Versions:
+        with self._lock:
+            return tuple((table, self._versions.get(table, 0)) for table in sorted(tables))
+
+    def bump(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+table_versions = TableVersions()
+
+def _pending_tables(session: Session) -> set:
+    return session.info.setdefault("count_tables", set())
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    tables = _pending_tables(session)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        tables.update(table.name for table in inspect(obj).mapper.tables)
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_tables(orm_execute_state):
+    # query.update() / query.delete() and ORM bulk inserts bypass the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        _pending_tables(orm_execute_state.session).add(orm_execute_state.statement.table.name)
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    # Bumped only once the rows are visible, so a count taken between flush and
+    # commit is stored under the old version and never served afterwards
+    tables = session.info.pop("count_tables", None)
+    if tables:
+        table_versions.bump(tables)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tables(session):
+    session.info.pop("count_tables", None)
+
+class CountCache:
+    """LRU of exact counts keyed on the query signature, tagged with table versions"""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Versions, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.estimates = 0
+
+    def get(self, key: str, versions: Optional[Versions] = None) -> Optional[int]:
+        """Cached count for key; with versions=None any unexpired count is accepted"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, cached_versions, total = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                elif versions is None:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return total
+                elif cached_versions == versions:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return total
+            if versions is not None:
+                self.misses += 1
+            return None
+
+    def set(self, key: str, versions: Versions, total: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, versions, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_estimate(self) -> None:
+        with self._lock:
+            self.estimates += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "estimates": self.estimates,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+count_cache = CountCache(ttl=settings.COUNT_CACHE_TTL, max_entries=settings.COUNT_CACHE_MAX_ENTRIES)
+
+def _signature(statement: Select) -> str:
+    compiled = statement.compile()
+    payload = json.dumps([str(compiled), sorted(compiled.params.items())], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _planner_rows(db: Session, statement: Select) -> int:
+    compiled = statement.compile(dialect=db.get_bind().dialect)
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def estimate_rows(db: Session, query: Query, id_column: Any) -> int:
+    """Approximate number of rows matched by query, without counting them all"""
+    if db.get_bind().dialect.name == "postgresql":
+        return _planner_rows(db, query.statement)
+    highest = db.query(func.max(id_column)).scalar() or 0
+    sample = settings.COUNT_ESTIMATE_SAMPLE
+    if highest <= sample:
+        return query.count()
+    # Ids are dense enough that the newest ids are a fair sample of the table
+    matched = query.filter(id_column > highest - sample).count()
+    return round(matched * highest / sample)
+
+def count_rows(db: Session, query: Query, mode: str, id_column: Any) -> Optional[int]:
+    """Total rows matched by an unpaginated query using the given count mode; None for mode "none" """
+    if mode == "none":
+        return None
+    query = query.order_by(None)
+    statement = query.statement
+    key = _signature(statement)
+    if mode == "estimate":
+        cached = count_cache.get(key)
+        if cached is not None:
+            return cached
+        count_cache.record_estimate()
+        return estimate_rows(db, query, id_column)
+
+    # Versions are read before counting, so a write committed meanwhile invalidates the result
+    versions = table_versions.get(table.name for table in find_tables(statement))
+    cached = count_cache.get(key, versions)
+    if cached is not None:
+        return cached
+    total = query.count()
+    count_cache.set(key, versions, total)
+    return total
@@ -0,0 +1,271 @@
+"""
+Pre-warmed sandbox worker for running student Python code against test cases.
+
+Started by code_runner.SandboxPool under setpriv and unshare as
+``python -I sandbox_worker.py --confine UNSHARE UID GID``: already running as
+the unprivileged sandbox user, as root of fresh user, mount, network, PID, IPC
+and UTS namespaces. --confine remounts every filesystem but /proc read-only,
+then re-executes the worker through UNSHARE in a nested user namespace as
+UID/GID, which has no capabilities and can't undo the read-only mounts (they
+are locked in the nested namespace). Before serving, the worker checks that it
+isn't root, that every mount is read-only and that no network interface besides
+loopback exists; if any of that fails it answers every request with
+sandbox_error rather than run code. ``--check`` only runs those checks.
+
+It then reads one JSON request per line on stdin and writes one JSON result per
+line on stdout. Each request runs in a forked child with CPU-time,
+address-space, file-size, open-file and process limits applied before the code
+executes, so the per-test cost is a fork rather than a fresh interpreter start.
+
+This module must not import anything from the application.
+"""
+import ctypes
+import io
+import json
+import os
+import resource
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
+
+MAX_OUTPUT_BYTES = 64 * 1024
+MEMORY_ERROR_EXIT = 3
+
+# mount(2) flags
+MS_RDONLY = 1
+MS_NOSUID = 2
+MS_NODEV = 4
+MS_NOEXEC = 8
+MS_REMOUNT = 32
+MS_NOATIME = 1024
+MS_NODIRATIME = 2048
+MS_BIND = 4096
+MS_RELATIME = 1 << 21
+MS_STRICTATIME = 1 << 24
+# Flags that are locked on mounts inherited from the parent namespace, so a remount must keep them
+MOUNT_OPTION_FLAGS = {
+    "nosuid": MS_NOSUID,
+    "nodev": MS_NODEV,
+    "noexec": MS_NOEXEC,
+    "noatime": MS_NOATIME,
+    "nodiratime": MS_NODIRATIME,
+    "relatime": MS_RELATIME,
+    "strictatime": MS_STRICTATIME
+}
+
+def _mounts() -> list:
+    """(mount point, per-mount options) for every filesystem in this mount namespace except procfs
+
+    /proc stays writable: its files belong to the processes they describe, and
+    unshare has to write the nested namespace's uid_map through it.
+    """
+    mounts = []
+    with open("/proc/self/mountinfo", encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if fields[fields.index("-") + 1] == "proc":
+                continue
+            # Spaces and other special characters in paths are octal-escaped
+            path = fields[4].encode("utf-8").decode("unicode_escape").encode("latin-1").decode("utf-8")
+            mounts.append((path, fields[5].split(",")))
+    return mounts
+
+def _remount_read_only() -> None:
+    libc = ctypes.CDLL(None, use_errno=True)
+    for path, options in _mounts():
+        flags = MS_REMOUNT | MS_BIND | MS_RDONLY
+        for option in options:
+            flags |= MOUNT_OPTION_FLAGS.get(option, 0)
+        if libc.mount(None, path.encode("utf-8"), None, flags, None) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"could not remount {path} read-only: {os.strerror(errno)}")
+
+def _confine(unshare: str, uid: str, gid: str, worker_args: list) -> None:
+    """Runs as root of the new namespaces; never returns"""
+    _remount_read_only()
+    os.execv(unshare, [
+        unshare, f"--map-user={uid}", f"--map-group={gid}", "--mount", "--",
+        sys.executable, "-I", os.path.abspath(__file__), *worker_args
+    ])
+
+def _isolation_problems() -> list:
+    problems = []
+    if os.getuid() == 0 or os.geteuid() == 0:
+        problems.append("running as root")
+    for path, _ in _mounts():
+        try:
+            if not os.statvfs(path).f_flag & os.ST_RDONLY:
+                problems.append(f"{path} is writable")
+        except OSError:
+            # Not reachable from here, so not writable either
+            continue
+    interfaces = {name for _, name in socket.if_nameindex()} - {"lo"}
+    if interfaces:
+        problems.append(f"network interfaces available: {', '.join(sorted(interfaces))}")
+    return problems
+
+def _apply_limits(cpu_seconds: int, memory_mb: int) -> None:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    memory_bytes = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (16, 16))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+def _run_child(code: str, stdin_fd: int, stdout_fd: int, stderr_fd: int, request: dict) -> None:
+    """Runs in the forked child; never returns"""
+    exit_code = 1
+    try:
+        os.setsid()
+        os.dup2(stdin_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        os.closerange(3, 256)
+        sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False), encoding="utf-8")
+        sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), encoding="utf-8")
+        sys.stderr = io.TextIOWrapper(io.FileIO(2, "w", closefd=False), encoding="utf-8")
+        _apply_limits(request["cpu_seconds"], request["memory_mb"])
+
+        compiled = compile(code, "<submission>", "exec")
+        try:
+            exec(compiled, {"__name__": "__main__", "__builtins__": __builtins__})
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except MemoryError:
+            exit_code = MEMORY_ERROR_EXIT
+        except BaseException as e:
+            # Skip this module's frame so the traceback only shows the submission
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next if e.__traceback__ else None)
+            exit_code = 1
+    except SyntaxError:
+        traceback.print_exc(limit=0)
+        exit_code = 1
+    except BaseException:
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            pass
+        os._exit(exit_code)
+
+def run_request(request: dict) -> dict:
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    started = time.monotonic()
+
+    pid = os.fork()
+    if pid == 0:
+        os.close(stdin_w)
+        os.close(stdout_r)
+        os.close(stderr_r)
+        _run_child(request["code"], stdin_r, stdout_w, stderr_w, request)
+
+    os.close(stdin_r)
+    os.close(stdout_w)
+    os.close(stderr_w)
+
+    pending_input = request.get("stdin", "").encode("utf-8")
+    if not pending_input:
+        os.close(stdin_w)
+        stdin_w = -1
+    outputs = {stdout_r: bytearray(), stderr_r: bytearray()}
+    open_fds = [stdout_r, stderr_r]
+    deadline = started + request["wall_seconds"]
+    timed_out = output_exceeded = False
+
+    while open_fds:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        writers = [stdin_w] if stdin_w >= 0 else []
+        readable, writable, _ = select.select(open_fds, writers, [], remaining)
+        if writable:
+            try:
+                written = os.write(stdin_w, pending_input[:65536])
+                pending_input = pending_input[written:]
+            except OSError:
+                pending_input = b""
+            if not pending_input:
+                os.close(stdin_w)
+                stdin_w = -1
+        for fd in readable:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                open_fds.remove(fd)
+                continue
+            outputs[fd].extend(chunk)
+            if len(outputs[fd]) > MAX_OUTPUT_BYTES:
+                output_exceeded = True
+        if output_exceeded:
+            break
+
+    if timed_out or output_exceeded:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    _, wait_status, rusage = os.wait4(pid, 0)
+    duration_ms = (time.monotonic() - started) * 1000
+    for fd in (stdin_w, stdout_r, stderr_r):
+        if fd >= 0:
+            os.close(fd)
+
+    if timed_out:
+        status = "timeout"
+    elif output_exceeded:
+        status = "output_limit"
+    elif os.WIFSIGNALED(wait_status):
+        status = "cpu_limit" if os.WTERMSIG(wait_status) in (signal.SIGXCPU, signal.SIGKILL) else "runtime_error"
+    elif os.WEXITSTATUS(wait_status) == MEMORY_ERROR_EXIT:
+        status = "memory_limit"
+    elif os.WEXITSTATUS(wait_status) == 0:
+        status = "ok"
+    else:
+        status = "runtime_error"
+
+    return {
+        "status": status,
+        "stdout": outputs[stdout_r][:MAX_OUTPUT_BYTES].decode("utf-8", errors="replace"),
+        "stderr": outputs[stderr_r][:MAX_OUTPUT_BYTES].decode("utf-8", errors="replace"),
+        "duration_ms": round(duration_ms, 2),
+        "cpu_ms": round((rusage.ru_utime + rusage.ru_stime) * 1000, 2)
+    }
+
+def main() -> None:
+    args = sys.argv[1:]
+    if args[:1] == ["--confine"]:
+        _confine(*args[1:4], args[4:])
+    problems = _isolation_problems()
+    if args[:1] == ["--check"]:
+        sys.stderr.write("; ".join(problems))
+        sys.exit(1 if problems else 0)
+
+    # The protocol stream must not be interrupted by a child's Ctrl+C handling
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    protocol_in = sys.stdin.buffer
+    protocol_out = sys.stdout.buffer
+    for line in protocol_in:
+        try:
+            if problems:
+                raise RuntimeError(f"sandbox isolation failed: {'; '.join(problems)}")
+            result = run_request(json.loads(line))
+        except Exception as e:
+            result = {"status": "sandbox_error", "stdout": "", "stderr": str(e), "duration_ms": 0, "cpu_ms": 0}
+        protocol_out.write(json.dumps(result).encode("utf-8") + b"\n")
+        protocol_out.flush()
+
+if __name__ == "__main__":
+    main()
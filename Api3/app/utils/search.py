@@ -0,0 +1,224 @@
+"""
+Full-text search over books, video lectures and evaluators.
+
+On SQLite each searchable table has an external-content FTS5 index
+(<table>_fts) that reads column values from the table itself and is kept in
+sync by insert/update/delete triggers, so every writer (ORM, bulk statements
+or raw SQL) updates it. Results are ranked with bm25 and highlighted with
+highlight(). On Postgres the equivalent is a GIN index on the to_tsvector of
+the same columns, ranked with ts_rank_cd and highlighted with ts_headline.
+Other databases fall back to per-word ILIKE filters without ranking.
+Highlights are HTML-escaped column text with the matched words wrapped in
+<mark></mark>, so clients can render them as HTML.
+
+User input is reduced to its words, all of which must match; the last word
+also matches as a prefix once it is MIN_PREFIX_LENGTH characters long, so
+results narrow as the user types. Results are ordered best match first and
+paginated on (score, id) like any other keyset listing.
+"""
+from dataclasses import dataclass
+from fastapi import HTTPException, status
+from sqlalchemy import and_, column, event, func, literal, literal_column, or_, select, table, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+from typing import Any, Dict, List, Optional, Tuple
+from ..database.database import Base
+from .pagination import Page, PageParams, invalid_cursor, paginate_rows
+import html
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class SearchIndex:
+    table: str
+    columns: Tuple[str, ...]
+
+    @property
+    def fts_table(self) -> str:
+        return f"{self.table}_fts"
+
+    @property
+    def document(self) -> str:
+        """The Postgres tsvector expression; queries must repeat it exactly for the GIN index to apply"""
+        text = " || ' ' || ".join(f"coalesce({name}, '')" for name in self.columns)
+        return f"to_tsvector('{TS_CONFIG}', {text})"
+
+SEARCH_INDEXES = {
+    index.table: index for index in (
+        SearchIndex("books", ("title", "tags")),
+        SearchIndex("video_lectures", ("title", "description", "subject", "topic")),
+        SearchIndex("evaluators", ("title", "description"))
+    )
+}
+
+TS_CONFIG = "english"  # Postgres text search configuration (stemming and stop words)
+FTS5_OPTIONS = "tokenize='porter unicode61', prefix='3 4'"  # Stemming like TS_CONFIG; indexed prefixes
+MIN_PREFIX_LENGTH = 3  # Shorter prefixes expand to too many terms to rank quickly
+MAX_TERMS = 16
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# The database marks matches with these private-use characters, which survive HTML escaping
+MATCH_START = "\ue000"
+MATCH_END = "\ue001"
+
+def _sqlite_ddl(index: SearchIndex) -> List[str]:
+    fts, columns = index.fts_table, ", ".join(index.columns)
+    new_values = ", ".join(f"new.{name}" for name in index.columns)
+    old_values = ", ".join(f"old.{name}" for name in index.columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{index.table}', content_rowid='id', {FTS5_OPTIONS})",
+        f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {index.table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {index.table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER {fts}_update AFTER UPDATE OF {columns} ON {index.table} BEGIN {delete_old} {insert_new} END",
+        # Index the rows that already exist
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"
+    ]
+
+def create_search_indexes(connection: Connection) -> None:
+    """Create any missing full-text indexes (a no-op for databases without one)"""
+    dialect = connection.dialect.name
+    for index in SEARCH_INDEXES.values():
+        if dialect == "sqlite":
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (index.fts_table,)
+            ).first()
+            if exists:
+                continue
+            logger.info(f"Building full-text index {index.fts_table}")
+            for statement in _sqlite_ddl(index):
+                connection.exec_driver_sql(statement)
+        elif dialect == "postgresql":
+            connection.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_{index.table}_search ON {index.table} USING GIN ({index.document})"
+            )
+
+def drop_search_indexes(connection: Connection) -> None:
+    dialect = connection.dialect.name
+    for index in SEARCH_INDEXES.values():
+        if dialect == "sqlite":
+            for trigger in ("insert", "delete", "update"):
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {index.fts_table}_{trigger}")
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {index.fts_table}")
+        elif dialect == "postgresql":
+            connection.exec_driver_sql(f"DROP INDEX IF EXISTS ix_{index.table}_search")
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_indexes_with_tables(target, connection, **kw):
+    # Databases set up with create_all get their indexes too; migrations create them otherwise
+    create_search_indexes(connection)
+
+def search_terms(text: str) -> List[str]:
+    """The words of a search query; raises HTTPException(400) if there are none"""
+    terms = re.findall(r"[^\W_]+", text.lower())[:MAX_TERMS]
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query must contain at least one word"
+        )
+    return terms
+
+def _fts5_query(terms: List[str]) -> str:
+    parts = [f'"{term}"' for term in terms]
+    if len(terms[-1]) >= MIN_PREFIX_LENGTH:
+        parts[-1] += "*"
+    return " ".join(parts)
+
+def _tsquery(terms: List[str]) -> str:
+    parts = list(terms)
+    if len(terms[-1]) >= MIN_PREFIX_LENGTH:
+        parts[-1] += ":*"
+    return " & ".join(parts)
+
+def _index_for(model: Any) -> SearchIndex:
+    return SEARCH_INDEXES[model.__tablename__]
+
+def _fts5_table(index: SearchIndex):
+    # The hidden column named after the table is what MATCH and the auxiliary functions take
+    return table(index.fts_table, column("rowid"), column(index.fts_table))
+
+def match_filter(db: Session, model: Any, text: str) -> ColumnElement:
+    """WHERE clause keeping the rows of model that match text, for filtering a listing by search"""
+    index, terms = _index_for(model), search_terms(text)
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        fts = _fts5_table(index)
+        return model.id.in_(select(fts.c.rowid).where(fts.c[index.fts_table].match(_fts5_query(terms))))
+    if dialect == "postgresql":
+        return literal_column(index.document).op("@@")(func.to_tsquery(TS_CONFIG, _tsquery(terms)))
+    return _like_filter(model, index, terms)
+
+def _like_filter(model: Any, index: SearchIndex, terms: List[str]) -> ColumnElement:
+    return and_(*(
+        or_(*(getattr(model, name).ilike(f"%{term}%") for name in index.columns))
+        for term in terms
+    ))
+
+def _highlight(text: Optional[str]) -> Optional[str]:
+    """Escape column text for HTML, then turn the database's match markers into <mark> tags"""
+    if text is None:
+        return None
+    return html.escape(text).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_END, HIGHLIGHT_END)
+
+@dataclass
+class SearchHit:
+    """A matching row with its score (lower is better) and highlighted column values"""
+    row: Any
+    score: float
+    highlights: Dict[str, Optional[str]]
+
+    def __getattr__(self, name: str) -> Any:
+        # Lets response models read the row's columns straight off the hit
+        return getattr(self.row, name)
+
+def search(db: Session, model: Any, text: str, page: PageParams) -> Page:
+    """One page of the rows of model matching text, best match first, as SearchHits"""
+    index, terms = _index_for(model), search_terms(text)
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        fts = _fts5_table(index)
+        document = literal_column(index.fts_table)
+        score = func.bm25(document)
+        highlights = [
+            func.highlight(document, position, MATCH_START, MATCH_END)
+            for position in range(len(index.columns))
+        ]
+        statement = select(model, score, *highlights).join_from(fts, model, model.id == fts.c.rowid).where(
+            fts.c[index.fts_table].match(_fts5_query(terms))
+        )
+    elif dialect == "postgresql":
+        query = func.to_tsquery(TS_CONFIG, _tsquery(terms))
+        score = -func.ts_rank_cd(literal_column(index.document), query)
+        options = f'StartSel="{MATCH_START}", StopSel="{MATCH_END}", HighlightAll=true'
+        highlights = [
+            func.ts_headline(TS_CONFIG, func.coalesce(getattr(model, name), ""), query, options)
+            for name in index.columns
+        ]
+        statement = select(model, score, *highlights).where(literal_column(index.document).op("@@")(query))
+    else:
+        score = literal(0.0)
+        highlights = [getattr(model, name) for name in index.columns]
+        statement = select(model, score, *highlights).where(_like_filter(model, index, terms))
+
+    if page.after is not None:
+        after_score, row_id = page.after
+        if not isinstance(after_score, float):
+            raise invalid_cursor()
+        statement = statement.where(tuple_(score, model.id) > tuple_(literal(after_score), literal(row_id)))
+    statement = statement.order_by(score, model.id)
+    if not page.unpaginated:
+        statement = statement.limit(page.limit + 1)
+
+    hits = [
+        SearchHit(
+            row=row[0],
+            score=float(row[1]),
+            highlights={name: _highlight(value) for name, value in zip(index.columns, row[2:])}
+        )
+        for row in db.execute(statement).all()
+    ]
+    return paginate_rows(hits, page, lambda hit: (hit.score, hit.row.id))
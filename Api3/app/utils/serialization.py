@@ -0,0 +1,58 @@
+"""
+JSON encoding for responses.
+
+JSONResponse is FastAPI's ORJSONResponse when orjson is installed (it is in
+requirements.txt) and the standard JSONResponse otherwise; the app uses it as
+its default response class.
+
+json_response() is the single-pass path for the large list endpoints.
+Returning a Response skips FastAPI's response_model round trip, which
+validates the endpoint's return value into models, dumps them back to Python
+dicts and only then encodes those. Here ORM rows are read straight into the
+response schema and written to JSON by pydantic-core in one go, and payloads
+already built with to_dict() are encoded as they are. The response_model stays
+on the route for the OpenAPI docs.
+"""
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from functools import lru_cache
+from pydantic import TypeAdapter
+from typing import Any, Optional
+import json
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as JSONResponse
+except ImportError:
+    orjson = None
+    from fastapi.responses import JSONResponse
+
+__all__ = ["JSONResponse", "dumps", "dump_schema", "json_response"]
+
+MEDIA_TYPE = "application/json"
+# Headers endpoints set on their injected Response (pagination) that a returned Response must keep
+CARRIED_HEADERS = ("x-next-cursor", "link")
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes of dicts, lists and scalars (datetimes included)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(jsonable_encoder(content), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def dump_schema(schema: Any, content: Any) -> bytes:
+    """JSON bytes of ORM rows (or dicts) read into schema, e.g. List[BookResponse]"""
+    adapter = _adapter(schema)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+def json_response(content: Any, schema: Any = None, response: Optional[Response] = None) -> Response:
+    """Response with content encoded in one pass: through schema when given, as-is otherwise.
+    Pagination headers already set on the endpoint's injected response are carried over."""
+    body = dump_schema(schema, content) if schema is not None else dumps(content)
+    headers = {}
+    if response is not None:
+        headers = {name: value for name, value in response.headers.items() if name in CARRIED_HEADERS}
+    return Response(content=body, media_type=MEDIA_TYPE, headers=headers)
@@ -0,0 +1,285 @@
+"""
+Near-duplicate detection for free-text submissions with MinHash and LSH.
+
+Every submission is reduced to a 128-value MinHash signature over word
+3-shingles. Signatures are bucketed into 16 LSH bands of 8 rows, so answers
+with a Jaccard similarity above roughly 0.7 almost always share a bucket, and
+candidates are then checked against the estimated similarity. One index is
+kept per evaluator, built from the database on first use and updated as new
+submissions are graded. The grader uses it to reuse the grade of an almost
+identical answer instead of calling Gemini again, and teachers can list
+clusters of suspiciously similar submissions.
+
+numpy is imported on first use rather than with the module, so it stays off
+the startup path of every worker.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from ..config import get_settings
+from ..database.database import SessionLocal
+from ..models.evaluator import EvaluatorSubmission
+from .gemini_utils import is_fallback_feedback
+import hashlib
+import logging
+import re
+import threading
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+# Submissions whose grade can be reused: auto-graded (grading.STATUS_AUTO_GRADED) or teacher-graded
+ANCHOR_STATUSES = ("auto_graded", "graded")
+REUSED_GRADE_NOTE = "ℹ️ This answer closely matches one that was already evaluated, so the same evaluation was applied."
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def shingles(text: str) -> Set[str]:
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+@lru_cache(maxsize=None)
+def _permutations() -> Tuple[np.uint64, np.uint64, np.ndarray, np.ndarray]:
+    """Mersenne prime, hash mask and the fixed permutation coefficients"""
+    import numpy as np
+    max_hash = np.uint64((1 << 32) - 1)
+    rng = np.random.RandomState(1)
+    return (
+        np.uint64((1 << 61) - 1),
+        max_hash,
+        rng.randint(1, int(max_hash), size=NUM_PERM, dtype=np.uint64),
+        rng.randint(0, int(max_hash), size=NUM_PERM, dtype=np.uint64)
+    )
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """MinHash signature of a text, or None when it has no words"""
+    shingle_set = shingles(text or "")
+    if not shingle_set:
+        return None
+    import numpy as np
+    prime, max_hash, perm_a, perm_b = _permutations()
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingle_set),
+        dtype=np.uint64,
+        count=len(shingle_set)
+    )
+    permuted = (np.outer(hashes, perm_a) + perm_b) % prime & max_hash
+    return permuted.min(axis=0).astype(np.uint32)
+
+class EvaluatorIndex:
+    """LSH index over one evaluator's submissions"""
+
+    def __init__(self, version: Optional[str]):
+        self.version = version
+        self.ids: List[int] = []
+        self.signatures: List[np.ndarray] = []
+        self.grades: Dict[int, Tuple[int, str]] = {}
+        self._positions: Dict[int, int] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+    def add(self, submission_id: int, signature: np.ndarray) -> None:
+        if submission_id in self._positions:
+            return
+        position = len(self.ids)
+        self._positions[submission_id] = position
+        self.ids.append(submission_id)
+        self.signatures.append(signature)
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS:(band + 1) * ROWS].tobytes())
+            self._buckets.setdefault(key, []).append(position)
+
+    def candidates(self, signature: np.ndarray) -> Set[int]:
+        found: Set[int] = set()
+        for band in range(BANDS):
+            found.update(self._buckets.get((band, signature[band * ROWS:(band + 1) * ROWS].tobytes()), ()))
+        return found
+
+    def similarities(self, signature: np.ndarray, positions: List[int]) -> np.ndarray:
+        """Estimated Jaccard similarity between a signature and the given positions"""
+        import numpy as np
+        matrix = np.stack([self.signatures[p] for p in positions])
+        return (matrix == signature).mean(axis=1)
+
+    def best_graded_match(self, submission_id: Optional[int], signature: np.ndarray) -> Optional[Tuple[int, float]]:
+        positions = [
+            p for p in self.candidates(signature)
+            if self.ids[p] != submission_id and self.ids[p] in self.grades
+        ]
+        if not positions:
+            return None
+        scores = self.similarities(signature, positions)
+        best = int(scores.argmax())
+        return self.ids[positions[best]], float(scores[best])
+
+    def clusters(self, threshold: float) -> List[Dict[str, Any]]:
+        """Groups of submissions connected by pairwise similarity >= threshold"""
+        parent = list(range(len(self.ids)))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        edges: Dict[Tuple[int, int], float] = {}
+        for position, signature in enumerate(self.signatures):
+            others = [p for p in self.candidates(signature) if p > position]
+            if not others:
+                continue
+            for other, score in zip(others, self.similarities(signature, others)):
+                if score >= threshold:
+                    edges[(position, other)] = float(score)
+                    parent[find(other)] = find(position)
+
+        groups: Dict[int, List[int]] = {}
+        for position in range(len(self.ids)):
+            groups.setdefault(find(position), []).append(position)
+        edge_scores: Dict[int, List[float]] = {}
+        for (position, _), score in edges.items():
+            edge_scores.setdefault(find(position), []).append(score)
+        result = []
+        for root, members in groups.items():
+            if len(members) < 2:
+                continue
+            scores = edge_scores[root]
+            result.append({
+                "submission_ids": [self.ids[p] for p in members],
+                "mean_similarity": round(sum(scores) / len(scores), 4),
+                "max_similarity": round(max(scores), 4)
+            })
+        result.sort(key=lambda c: (-len(c["submission_ids"]), -c["mean_similarity"]))
+        return result
+
+class SimilarityIndex:
+    """Per-evaluator MinHash/LSH indexes, kept for the most recently used evaluators"""
+
+    def __init__(self, max_evaluators: int, reuse_threshold: float):
+        self.max_evaluators = max(max_evaluators, 1)
+        self.reuse_threshold = reuse_threshold
+        self._indexes: "OrderedDict[int, EvaluatorIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.reused = 0
+        self.builds = 0
+
+    def _build(self, evaluator_id: int, version: Optional[str]) -> EvaluatorIndex:
+        index = EvaluatorIndex(version)
+        with SessionLocal() as db:
+            rows = db.query(
+                EvaluatorSubmission.id,
+                EvaluatorSubmission.submission_content,
+                EvaluatorSubmission.status,
+                EvaluatorSubmission.provisional_grade,
+                EvaluatorSubmission.final_grade,
+                EvaluatorSubmission.feedback
+            ).filter(EvaluatorSubmission.evaluator_id == evaluator_id).order_by(EvaluatorSubmission.id).all()
+        for submission_id, content, status, provisional_grade, final_grade, feedback in rows:
+            signature = minhash(content or "")
+            if signature is None:
+                continue
+            index.add(submission_id, signature)
+            grade = final_grade if status == "graded" else provisional_grade
+            # Reused grades are copies and fallback grades are heuristics, so only original Gemini
+            # or teacher evaluations become anchors
+            if (
+                status in ANCHOR_STATUSES
+                and grade is not None
+                and REUSED_GRADE_NOTE not in (feedback or "")
+                and not is_fallback_feedback(feedback)
+            ):
+                index.grades[submission_id] = (grade, feedback or "")
+        self.builds += 1
+        logger.info(f"Built similarity index for evaluator {evaluator_id} from {len(index.ids)} submissions")
+        return index
+
+    def _index(self, evaluator_id: int, version: Optional[str]) -> EvaluatorIndex:
+        """The evaluator's index, (re)built when missing or when the evaluator was edited"""
+        with self._lock:
+            index = self._indexes.get(evaluator_id)
+            if index is not None and index.version == version:
+                self._indexes.move_to_end(evaluator_id)
+                return index
+        # Build outside the lock so other evaluators aren't blocked on the database
+        index = self._build(evaluator_id, version)
+        with self._lock:
+            current = self._indexes.get(evaluator_id)
+            if current is not None and current.version == version:
+                return current
+            self._indexes[evaluator_id] = index
+            self._indexes.move_to_end(evaluator_id)
+            while len(self._indexes) > self.max_evaluators:
+                self._indexes.popitem(last=False)
+        return index
+
+    def find_graded_match(
+        self,
+        evaluator_id: int,
+        version: Optional[str],
+        submission_id: int,
+        content: str
+    ) -> Optional[Tuple[int, str, float]]:
+        """
+        Add a submission to its evaluator's index and return (score, feedback, similarity)
+        of the most similar graded answer when it clears the reuse threshold.
+        """
+        signature = minhash(content)
+        if signature is None:
+            return None
+        index = self._index(evaluator_id, version)
+        with self._lock:
+            index.add(submission_id, signature)
+            self.lookups += 1
+            match = index.best_graded_match(submission_id, signature)
+            if match is None or match[1] < self.reuse_threshold:
+                return None
+            self.reused += 1
+            score, feedback = index.grades[match[0]]
+            return score, feedback, match[1]
+
+    def record_grade(self, evaluator_id: int, submission_id: int, content: str, score: int, feedback: str) -> None:
+        """Make a graded submission available for reuse, if the evaluator's index is loaded"""
+        with self._lock:
+            index = self._indexes.get(evaluator_id)
+            if index is None:
+                return
+            signature = minhash(content)
+            if signature is None:
+                return
+            index.add(submission_id, signature)
+            index.grades[submission_id] = (score, feedback)
+
+    def clusters(self, evaluator_id: int, version: Optional[str], threshold: float) -> List[Dict[str, Any]]:
+        index = self._index(evaluator_id, version)
+        with self._lock:
+            return index.clusters(threshold)
+
+    def forget(self, evaluator_id: int) -> None:
+        with self._lock:
+            self._indexes.pop(evaluator_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "evaluators": len(self._indexes),
+                "submissions": sum(len(i.ids) for i in self._indexes.values()),
+                "reuse_threshold": self.reuse_threshold,
+                "lookups": self.lookups,
+                "reused": self.reused,
+                "reuse_rate": round(self.reused / self.lookups, 4) if self.lookups else 0.0,
+                "builds": self.builds
+            }
+
+similarity_index = SimilarityIndex(
+    max_evaluators=settings.SIMILARITY_MAX_EVALUATORS,
+    reuse_threshold=settings.SIMILARITY_REUSE_THRESHOLD
+)
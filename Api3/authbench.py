@@ -0,0 +1,113 @@
+"""
+Per-request cost of authenticating a bearer token.
+
+Times resolving the same User Management API token over and over:
+
+- verify: jwt.decode with the HMAC signature check and JSON parsing, which
+  every authenticated request used to do
+- cached: verify_external_token, which verifies a token once and then serves
+  its claims from claims_cache until the token expires
+
+and a local token through get_current_user, with the user read from the
+database each time (user_cache cleared) or from user_cache. A revoked token
+must be rejected from the cache too, and a role change must reach the cached
+user.
+
+    python authbench.py
+    python authbench.py --calls 100000
+"""
+from pathlib import Path
+from typing import Callable
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_workdir = tempfile.TemporaryDirectory(prefix="auth-bench-")
+# Settings are read at import time, so the database has to be chosen first
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_workdir.name) / 'bench.db'}"
+
+from fastapi import HTTPException
+from jose import jwt
+
+from app.database.bootstrap import prepare_database
+from app.database.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.models.user import User
+from app.schemas.user import UserRole
+from app.utils.auth import create_access_token, get_current_user, user_cache
+from app.utils.external_auth import ALGORITHM, JWT_SECRET, claims_cache, revoke_external_token, verify_external_token
+
+def per_call_us(run: Callable[[], object], calls: int, repeat: int = 5) -> float:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            run()
+        latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies) / calls * 1_000_000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-request cost of authenticating a bearer token")
+    parser.add_argument("--calls", type=int, default=20_000, help="Token checks per timed run")
+    args = parser.parse_args()
+
+    prepare_database()
+    token = jwt.encode(
+        {"userId": 7, "email": "student@example.com", "role": "student", "exp": int(time.time()) + 3600},
+        JWT_SECRET,
+        algorithm=ALGORITHM
+    )
+    verify = per_call_us(lambda: jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM]), args.calls)
+    cached = per_call_us(lambda: verify_external_token(token), args.calls)
+    stats = claims_cache.stats()
+
+    print(f"verify (jwt.decode)   {verify:8.2f} us/request")
+    print(f"cached claims         {cached:8.2f} us/request  ({verify / cached:.1f}x faster, hit rate {stats['hit_rate']})")
+
+    with SessionLocal() as db:
+        revoke_external_token(db, token)
+    try:
+        verify_external_token(token)
+        raise SystemExit("A revoked token was accepted")
+    except HTTPException as e:
+        print(f"revoked token         rejected ({e.detail})")
+
+    asyncio.run(bench_current_user(args.calls // 10))
+    _workdir.cleanup()
+
+async def bench_current_user(calls: int) -> None:
+    with SessionLocal() as db:
+        db.add(User(username="teacher", email="teacher@example.com", hashed_password="x", role=UserRole.STUDENT))
+        db.commit()
+    token = create_access_token({"sub": "teacher"})
+
+    async def timed(clear: bool) -> float:
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            for _ in range(calls):
+                if clear:
+                    user_cache.clear()
+                await get_current_user(token, db)
+            return (time.perf_counter() - started) / calls * 1_000_000
+
+    await timed(clear=False)
+    queried = statistics.median([await timed(clear=True) for _ in range(3)])
+    cached = statistics.median([await timed(clear=False) for _ in range(3)])
+    print(f"get_current_user, db  {queried:8.2f} us/request")
+    print(f"get_current_user, hit {cached:8.2f} us/request  ({queried / cached:.1f}x faster)")
+
+    with SessionLocal() as db:
+        db.query(User).filter(User.username == "teacher").first().role = UserRole.TEACHER
+        db.commit()
+    async with AsyncSessionLocal() as db:
+        role = (await get_current_user(token, db)).role
+    if role != UserRole.TEACHER:
+        raise SystemExit("A role change did not reach the cached user")
+    print(f"role change           seen on the next request ({role.value})")
+    # aiosqlite's connection threads would otherwise keep the interpreter alive
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    main()
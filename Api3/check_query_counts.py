@@ -0,0 +1,135 @@
+"""
+N+1 regression check for the list endpoints.
+
+Seeds a temporary SQLite database, calls each list endpoint with a small and
+then a larger number of matching rows, and compares the number of SQL
+statements the request ran (the X-Query-Count header). A statement count that
+grows with the result size means rows are being loaded one at a time, and
+fails the check (exit code 1).
+
+    python check_query_counts.py
+    python check_query_counts.py --small 5 --large 100
+"""
+from pathlib import Path
+from typing import Dict, List, Tuple
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+_workdir = tempfile.TemporaryDirectory(prefix="query-counts-")
+# Settings are read at import time, so the database has to be chosen first
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_workdir.name) / 'counts.db'}"
+
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.config import get_settings
+from app.database.bootstrap import prepare_database
+from app.database.database import SessionLocal
+from app.main import app
+from app.models.book import Book, BookLending
+from app.models.evaluator import Evaluator, EvaluatorSubmission
+from app.models.video import VideoLecture
+from app.utils.external_auth import ALGORITHM, JWT_SECRET
+
+STUDENT = "student@example.com"
+TEACHER = "teacher@example.com"
+
+def bearer(email: str, role: str) -> Dict[str, str]:
+    token = jwt.encode({"userId": 1, "role": role, "email": email, "exp": int(time.time()) + 3600}, JWT_SECRET, algorithm=ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+def seed(db, start: int, stop: int) -> None:
+    """Rows start..stop-1 of every listed kind, each pointing at its own parent row where it has one"""
+    for n in range(start, stop):
+        evaluator = Evaluator(
+            title=f"Quiz {n}",
+            description="Seeded multiple choice quiz",
+            type="quiz",
+            submission_type="text",
+            quiz_type="multiple_choice",
+            quiz_data={"questions": [f"Question {q}" for q in range(20)], "correct_answers": ["A"] * 20},
+            teacher_username=TEACHER
+        )
+        book = Book(title=f"Book {n}", file_path="book.pdf", copies_owned=2, copies_available=1, tags="seed")
+        db.add_all([evaluator, book])
+        db.flush()
+        db.add_all([
+            # Submissions to one evaluator from many students, and one student's attempts at it
+            EvaluatorSubmission(evaluator_id=1, student_username=f"student{n}@example.com", submission_content="A", status="graded"),
+            EvaluatorSubmission(evaluator_id=1, student_username=STUDENT, submission_content="A", status="graded"),
+            BookLending(book_id=book.id, username=STUDENT),
+            VideoLecture(
+                title=f"Lecture {n}",
+                description="Seeded lecture",
+                video_url="https://example.com",
+                teacher_username=TEACHER,
+                subject="Biology",
+                topic="Cells"
+            )
+        ])
+    db.commit()
+
+def endpoints() -> List[Tuple[str, str, Dict[str, str]]]:
+    limit = get_settings().PAGE_SIZE_MAX
+    student, teacher = bearer(STUDENT, "student"), bearer(TEACHER, "instructor")
+    return [
+        ("GET /evaluators/list", f"/api/v1/evaluators/list?limit={limit}", {}),
+        ("GET /evaluators/{id}/submissions", f"/api/v1/evaluators/1/submissions?limit={limit}", teacher),
+        ("GET /evaluators/{id}/result", f"/api/v1/evaluators/1/result?limit={limit}", student),
+        ("GET /books/available", f"/api/v1/books/available?limit={limit}", {}),
+        ("GET /books/active", f"/api/v1/books/active?limit={limit}", student),
+        ("GET /video-lectures/", f"/api/v1/video-lectures/?limit={limit}", {}),
+        ("GET /video-lectures/teacher/lectures", f"/api/v1/video-lectures/teacher/lectures?limit={limit}", teacher)
+    ]
+
+def measure(client: TestClient) -> Dict[str, Tuple[int, int]]:
+    """(rows returned, statements run) per endpoint"""
+    results = {}
+    for name, path, headers in endpoints():
+        response = client.get(path, headers=headers)
+        response.raise_for_status()
+        body = response.json()
+        rows = len(body["items"] if isinstance(body, dict) else body)
+        results[name] = (rows, int(response.headers["X-Query-Count"]))
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that list endpoints run a constant number of queries")
+    parser.add_argument("--small", type=int, default=5, help="Rows per endpoint in the first measurement")
+    parser.add_argument("--large", type=int, default=50, help="Rows per endpoint in the second measurement")
+    args = parser.parse_args()
+    if not 0 < args.small < args.large <= get_settings().PAGE_SIZE_MAX:
+        parser.error("expected 0 < --small < --large <= PAGE_SIZE_MAX")
+
+    # Only the schema is needed, not the background services the app's lifespan starts
+    prepare_database()
+    client = TestClient(app)
+    with SessionLocal() as db:
+        seed(db, 0, args.small)
+    small = measure(client)
+    with SessionLocal() as db:
+        seed(db, args.small, args.large)
+    large = measure(client)
+
+    failures = 0
+    for name in small:
+        (small_rows, small_queries), (large_rows, large_queries) = small[name], large[name]
+        grows = large_queries > small_queries
+        failures += grows
+        print(
+            f"{'FAIL' if grows else 'ok  '}  {name}: {small_queries} queries for {small_rows} rows, "
+            f"{large_queries} for {large_rows}"
+        )
+
+    _workdir.cleanup()
+    if failures:
+        print(f"\n{failures} endpoint{'' if failures == 1 else 's'} ran more queries for more rows")
+        return 1
+    print("\nQuery counts don't grow with result size")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Query-plan regression check for the hot submission, lending, book and page queries.
+
+Seeds a temporary SQLite database with a realistic volume of rows, runs
+ANALYZE, then runs each endpoint's query through the same helpers the endpoint
+uses (paginate, match_filter, search) and asks SQLite for the plan of every
+SELECT they send. Every plan must search through an index; a full table scan,
+or sorting every match for an unranked paginated query, fails the check (exit
+code 1).
+
+    python check_query_plans.py
+    python check_query_plans.py --submissions 200000 --lendings 100000
+"""
+from pathlib import Path
+from datetime import datetime
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, selectinload
+from typing import Any, Callable, List, Optional, Tuple
+import argparse
+import asyncio
+import inspect
+import random
+import re
+import sys
+import tempfile
+
+from app.database.database import Base, create_db_engine
+from app.models.book import Book, BookLending
+from app.models.evaluator import Evaluator, EvaluatorSubmission
+from app.models.video import VideoLecture
+from app.utils.pagination import CursorKey, PageParams, paginate, paginate_async
+from app.utils.search import match_filter, search
+
+STUDENT = "student7@example.com"
+TEACHER = "teacher3@example.com"
+
+class PlanPage(PageParams):
+    """PageParams as an endpoint receives them, without a request to set headers on"""
+
+    def __init__(self, after: Optional[Tuple[CursorKey, int]] = None, limit: int = 50):
+        self.cursor = None
+        self.after = after
+        self.limit = limit
+        self.unpaginated = False
+
+    def set_headers(self, next_cursor: Optional[str]) -> None:
+        pass
+
+FIRST_PAGE = PlanPage()
+NEXT_PAGE = PlanPage(after=(datetime(2024, 1, 1), 1000))
+NEXT_SEARCH_PAGE = PlanPage(after=(-1.0, 1000))
+
+# Runs an endpoint's query on a Session, or on an AsyncSession if it is a coroutine function
+EndpointQuery = Callable[[Any], Any]
+
+async def attempt_count(db: AsyncSession) -> Any:
+    return await db.scalar(select(func.count()).select_from(EvaluatorSubmission).where(
+        EvaluatorSubmission.evaluator_id == 3,
+        EvaluatorSubmission.student_username == STUDENT
+    ))
+
+async def submission_status(db: AsyncSession) -> Any:
+    return await db.scalar(select(EvaluatorSubmission).where(
+        EvaluatorSubmission.evaluator_id == 3,
+        EvaluatorSubmission.student_username == STUDENT
+    ).limit(1))
+
+async def evaluation_results(db: AsyncSession) -> Any:
+    statement = select(EvaluatorSubmission).options(selectinload(EvaluatorSubmission.evaluator)).where(
+        EvaluatorSubmission.evaluator_id == 3,
+        EvaluatorSubmission.student_username == STUDENT
+    )
+    return await paginate_async(db, statement, FIRST_PAGE, EvaluatorSubmission.submission_date, EvaluatorSubmission.id)
+
+def submissions(page: PlanPage) -> EndpointQuery:
+    return lambda db: paginate(
+        db.query(EvaluatorSubmission).filter(EvaluatorSubmission.evaluator_id == 3),
+        page,
+        EvaluatorSubmission.submission_date,
+        EvaluatorSubmission.id
+    )
+
+def endpoint_queries() -> List[Tuple[str, EndpointQuery, bool]]:
+    """(name, query, ranked) for each endpoint, built with the same helpers the endpoint calls
+
+    Ranked search has to sort its matches by score, so only unranked queries
+    must avoid sorting.
+    """
+    return [
+        ("POST /evaluators/{id}/submit (attempt count)", attempt_count, False),
+        ("GET /evaluators/{id}/status", submission_status, False),
+        ("GET /evaluators/{id}/result", evaluation_results, False),
+        ("GET /evaluators/{id}/submissions", submissions(FIRST_PAGE), False),
+        ("GET /evaluators/{id}/submissions (next page)", submissions(NEXT_PAGE), False),
+        ("POST /books/rent/bulk (books already held)", lambda db: db.scalars(select(BookLending.book_id).where(
+            BookLending.username == STUDENT,
+            BookLending.is_active == 1,
+            BookLending.book_id.in_([11, 12, 13])
+        )).all(), False),
+        ("GET /books/active", lambda db: paginate(
+            db.query(BookLending).filter(BookLending.username == STUDENT, BookLending.is_active == 1),
+            FIRST_PAGE,
+            BookLending.borrow_date,
+            BookLending.id
+        ), False),
+        ("GET /books/available", lambda db: paginate(
+            db.query(Book).filter(Book.copies_available > 0), FIRST_PAGE, Book.created_at, Book.id
+        ), False),
+        ("GET /books/search", lambda db: search(db, Book, "book 1", FIRST_PAGE), True),
+        ("GET /books/search (next page)", lambda db: search(db, Book, "book 1", NEXT_SEARCH_PAGE), True),
+        ("GET /evaluators/list (next page)", lambda db: paginate(
+            db.query(Evaluator), NEXT_PAGE, Evaluator.created_at, Evaluator.id
+        ), False),
+        ("GET /evaluators/list?search=", lambda db: paginate(
+            db.query(Evaluator).filter(match_filter(db, Evaluator, "quiz 12")), FIRST_PAGE, Evaluator.created_at, Evaluator.id
+        ), False),
+        ("GET /video-lectures/ (next page)", lambda db: paginate(
+            db.query(VideoLecture), NEXT_PAGE, VideoLecture.created_at, VideoLecture.id
+        ), False),
+        ("GET /video-lectures/teacher/lectures (next page)", lambda db: paginate(
+            db.query(VideoLecture).filter(VideoLecture.teacher_username == TEACHER),
+            NEXT_PAGE,
+            VideoLecture.created_at,
+            VideoLecture.id
+        ), False)
+    ]
+
+def seed(engine, evaluators: int, submissions: int, books: int, lendings: int) -> None:
+    rng = random.Random(42)
+    students = max(submissions // evaluators, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(Evaluator), [
+            {"title": f"Quiz {n}", "description": "Seeded quiz", "type": "quiz", "teacher_username": "seed"}
+            for n in range(evaluators)
+        ])
+        connection.execute(insert(EvaluatorSubmission), [
+            {
+                "evaluator_id": 1 + n % evaluators,
+                "student_username": f"student{rng.randrange(students)}@example.com",
+                "submission_content": "Seeded answer",
+                "status": rng.choice(["auto_graded", "graded", "queued"])
+            }
+            for n in range(submissions)
+        ])
+        # Most books are lent out, as in a busy library
+        connection.execute(insert(Book), [
+            {"title": f"Book {n}", "copies_owned": 3, "copies_available": 0 if rng.random() < 0.9 else 2, "tags": "seed"}
+            for n in range(books)
+        ])
+        lent = [(1 + rng.randrange(books), f"student{rng.randrange(students)}@example.com") for _ in range(lendings)]
+        active = set()
+        rows = []
+        for book_id, username in lent:
+            # A user holds at most one active lending of a book (uq_book_lendings_active_book_id_username)
+            is_active = rng.random() < 0.2 and (book_id, username) not in active
+            if is_active:
+                active.add((book_id, username))
+            rows.append({"book_id": book_id, "username": username, "is_active": int(is_active)})
+        connection.execute(insert(BookLending), rows)
+        connection.execute(insert(VideoLecture), [
+            {"title": f"Lecture {n}", "video_url": "https://example.com", "teacher_username": f"teacher{n % 50}@example.com"}
+            for n in range(books)
+        ])
+        connection.exec_driver_sql("ANALYZE")
+
+def captured_selects(engine, async_engine, run: EndpointQuery) -> List[Tuple[str, Any]]:
+    """Run an endpoint's query and return the SELECT statements it sent to the database"""
+    statements = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    targets = (engine, async_engine.sync_engine)
+    for target in targets:
+        event.listen(target, "before_cursor_execute", capture)
+    try:
+        if inspect.iscoroutinefunction(run):
+            async def run_async() -> None:
+                async with AsyncSession(async_engine) as db:
+                    await run(db)
+            asyncio.run(run_async())
+        else:
+            with Session(engine) as db:
+                run(db)
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", capture)
+    return statements
+
+def query_plan(engine, statement: str, parameters: Any) -> List[str]:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that hot endpoint queries use indexes")
+    parser.add_argument("--evaluators", type=int, default=100)
+    parser.add_argument("--submissions", type=int, default=50_000)
+    parser.add_argument("--books", type=int, default=5_000)
+    parser.add_argument("--lendings", type=int, default=50_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory(prefix="query-plans-")
+    database = Path(workdir.name) / 'plans.db'
+    engine = create_db_engine(f"sqlite:///{database}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+    Base.metadata.create_all(bind=engine)
+    seed(engine, args.evaluators, args.submissions, args.books, args.lendings)
+
+    failures = 0
+    for name, run, ranked in endpoint_queries():
+        plan = [
+            step
+            for statement, parameters in captured_selects(engine, async_engine, run)
+            for step in query_plan(engine, statement, parameters)
+        ]
+        # "SCAN <table>" without an index is a full table scan; sorting every match defeats keyset paging
+        scans = [
+            step for step in plan
+            if re.match(r"SCAN \w+$", step) or (not ranked and "TEMP B-TREE FOR ORDER BY" in step)
+        ]
+        failures += bool(scans)
+        print(f"{'FAIL' if scans else 'ok  '}  {name}")
+        for step in plan:
+            print(f"        {step}")
+
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+    workdir.cleanup()
+    if failures:
+        print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} fell back to a full table scan")
+        return 1
+    print("\nAll queries use an index")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
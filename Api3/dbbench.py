@@ -0,0 +1,148 @@
+"""
+Read/write concurrency benchmark for the SQLite engine configuration.
+
+Seeds a temporary database with submissions, then runs writer threads that
+insert submissions (like /submit) alongside reader threads that run the
+student status query, first with SQLite's defaults (rollback journal,
+synchronous=FULL) and then with the connect-time pragmas from settings
+(WAL, synchronous=NORMAL, mmap, cache size, busy timeout). Reports throughput,
+latency percentiles and lock errors for each.
+
+    python dbbench.py --readers 8 --writers 2 --seconds 10
+"""
+from pathlib import Path
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from typing import Any, Dict, List
+import argparse
+import random
+import tempfile
+import threading
+import time
+
+from app.database.database import Base, create_db_engine, sqlite_pragmas
+from app.models.evaluator import Evaluator, EvaluatorSubmission
+
+ROLLBACK_JOURNAL = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000}
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def seed(url: str, pragmas: Dict[str, Any], evaluators: int, students: int) -> None:
+    engine = create_db_engine(url, pragmas=pragmas)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        for e in range(evaluators):
+            db.add(Evaluator(title=f"Quiz {e}", description="Benchmark quiz", type="quiz", teacher_username="bench"))
+        db.flush()
+        db.add_all(
+            EvaluatorSubmission(
+                evaluator_id=1 + n % evaluators,
+                student_username=f"student{n % students}@example.com",
+                submission_content="Plants turn light into chemical energy.",
+                status="auto_graded",
+                provisional_grade=70
+            )
+            for n in range(evaluators * students)
+        )
+        db.commit()
+    engine.dispose()
+
+def run(label: str, pragmas: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = tempfile.TemporaryDirectory(prefix="dbbench-")
+    url = f"sqlite:///{Path(workdir.name) / 'bench.db'}"
+    seed(url, pragmas, args.evaluators, args.students)
+
+    write_engine = create_db_engine(url, pragmas=pragmas)
+    read_engine = create_db_engine(url, read_only=True, pragmas=pragmas)
+    WriteSession = sessionmaker(bind=write_engine)
+    ReadSession = sessionmaker(bind=read_engine)
+    stop = threading.Event()
+    lock = threading.Lock()
+    results: Dict[str, List[float]] = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+
+    def record(kind: str, started: float, failed: bool) -> None:
+        with lock:
+            if failed:
+                errors[kind] += 1
+            else:
+                results[kind].append(time.perf_counter() - started)
+
+    def reader(seed_value: int) -> None:
+        rng = random.Random(seed_value)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with ReadSession() as db:
+                    db.scalars(select(EvaluatorSubmission).where(
+                        EvaluatorSubmission.evaluator_id == rng.randint(1, args.evaluators),
+                        EvaluatorSubmission.student_username == f"student{rng.randrange(args.students)}@example.com"
+                    )).all()
+                record("read", started, False)
+            except OperationalError:
+                record("read", started, True)
+
+    def writer(seed_value: int) -> None:
+        rng = random.Random(seed_value)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with WriteSession() as db:
+                    db.add(EvaluatorSubmission(
+                        evaluator_id=rng.randint(1, args.evaluators),
+                        student_username=f"new{rng.randrange(10 ** 9)}@example.com",
+                        submission_content="A fresh answer " * 20,
+                        status="queued"
+                    ))
+                    db.commit()
+                record("write", started, False)
+            except OperationalError:
+                record("write", started, True)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    write_engine.dispose()
+    read_engine.dispose()
+    workdir.cleanup()
+
+    summary: Dict[str, Any] = {"config": label}
+    for kind in ("read", "write"):
+        latencies = results[kind]
+        summary[f"{kind}s_per_s"] = round(len(latencies) / args.seconds, 1)
+        summary[f"{kind}_p50_ms"] = round(percentile(latencies, 50) * 1000, 2)
+        summary[f"{kind}_p99_ms"] = round(percentile(latencies, 99) * 1000, 2)
+        summary[f"{kind}_errors"] = errors[kind]
+    return summary
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare SQLite read/write concurrency with and without WAL tuning")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each run")
+    parser.add_argument("--evaluators", type=int, default=50)
+    parser.add_argument("--students", type=int, default=200, help="Seeded submissions per evaluator")
+    args = parser.parse_args()
+
+    rows = [
+        run("rollback journal", ROLLBACK_JOURNAL, args),
+        run("settings (WAL)", sqlite_pragmas(), args)
+    ]
+    columns = list(rows[0])
+    widths = [max(len(c), *(len(str(row[c])) for row in rows)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Concurrency stress test for book lending.
+
+By default it starts the API with uvicorn against a throwaway SQLite database
+(like loadtest.py), then fires hundreds of parallel clients at a few books:
+
+- rent: --clients students rent a book with --copies copies at once, and some
+  of them send the same request twice in parallel
+- return: every successful lending is returned twice in parallel
+- bulk: every student checks out all the books in one bulk request
+
+After each phase it checks the invariants: no more lendings than copies, no
+user holding two active lendings of a book, copies_available equal to copies
+owned minus active lendings, and no server errors. Exits 1 if any fails.
+
+    python lendingstress.py --clients 300 --copies 25
+    python lendingstress.py --base-url http://127.0.0.1:8000
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+import argparse
+import os
+import sys
+import uuid
+
+from loadtest import DEFAULT_SECRET, Client, spawn_server
+
+BOOKS = "/api/v1/books"
+
+def parallel(concurrency: int, calls: List[Tuple[Client, str, str, Any, str]]) -> List[Tuple[int, Any]]:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lambda call: call[0].request(*call[1:]), calls))
+
+def create_book(client: Client, title: str, copies: int) -> int:
+    status, body = client.request("POST", f"{BOOKS}/upload", {
+        "title": title, "copies_owned": copies, "tags": "stress", "file_path": "stress.pdf"
+    })
+    if status != 200:
+        raise SystemExit(f"Could not create a book: {status} {body}")
+    return body["id"]
+
+def copies_available(client: Client, book_id: int, title: str) -> int:
+    status, body = client.request("GET", f"{BOOKS}/search?query={title}")
+    return next(book["copies_available"] for book in body if book["id"] == book_id)
+
+def check(name: str, results: List[Tuple[int, Any]], failures: List[str]) -> Dict[int, int]:
+    statuses: Dict[int, int] = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    if any(status >= 500 for status in statuses):
+        failures.append(f"{name}: server errors {statuses}")
+    print(f"{name}: {dict(sorted(statuses.items()))}")
+    return statuses
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that concurrent lending never oversells a book")
+    parser.add_argument("--base-url", help="Test a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8798, help="Port for the spawned server")
+    parser.add_argument("--secret", default=os.getenv("SECRET_KEY", DEFAULT_SECRET), help="JWT secret of the server")
+    parser.add_argument("--clients", type=int, default=300, help="Students competing for the books")
+    parser.add_argument("--copies", type=int, default=25, help="Copies of each book")
+    parser.add_argument("--books", type=int, default=3, help="Books in each bulk checkout")
+    parser.add_argument("--concurrency", type=int, default=200, help="Requests in flight at once")
+    args = parser.parse_args()
+
+    server = workdir = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server_args = argparse.Namespace(
+            port=args.port, secret=args.secret, latency_median=0.0, latency_sigma=0.0, error_rate=0.0, stream_chunks=1
+        )
+        server, workdir = spawn_server(server_args)
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"Started the API on {base_url}")
+
+    client = Client(base_url, args.secret)
+    students = [(f"stress{n}-{uuid.uuid4().hex[:6]}@example.com") for n in range(args.clients)]
+    tokens = {student: client.token(student, "student") for student in students}
+    failures: List[str] = []
+    try:
+        # Rent: everyone wants the one book; every tenth student double-submits
+        title = f"Stress{uuid.uuid4().hex[:10]}"
+        book_id = create_book(client, title, args.copies)
+        calls = [(client, "POST", f"{BOOKS}/rent", {"book_id": book_id}, tokens[s]) for s in students]
+        calls += [(client, "POST", f"{BOOKS}/rent", {"book_id": book_id}, tokens[s]) for s in students[::10]]
+        results = parallel(args.concurrency, calls)
+        statuses = check("rent", results, failures)
+        lendings = [(body["id"], body["username"]) for status, body in results if status == 200]
+        holders = [username for _, username in lendings]
+        available = copies_available(client, book_id, title)
+        if statuses.get(200, 0) != min(args.copies, len(students)):
+            failures.append(f"rent: {statuses.get(200, 0)} lendings for {args.copies} copies")
+        if len(holders) != len(set(holders)):
+            failures.append("rent: a student holds two active lendings of the book")
+        if available != args.copies - len(lendings):
+            failures.append(f"rent: {available} copies available with {len(lendings)} of {args.copies} lent")
+
+        # Return: each lending twice at once; exactly one of each pair may succeed
+        calls = [(client, "POST", f"{BOOKS}/return/{lending_id}", None, tokens[u]) for lending_id, u in lendings] * 2
+        statuses = check("return", parallel(args.concurrency, calls), failures)
+        available = copies_available(client, book_id, title)
+        if statuses.get(200, 0) != len(lendings):
+            failures.append(f"return: {statuses.get(200, 0)} returns for {len(lendings)} lendings")
+        if available != args.copies:
+            failures.append(f"return: {available} copies available after all {args.copies} came back")
+
+        # Bulk: everyone checks out every book at once
+        titles = [f"Stress{uuid.uuid4().hex[:10]}" for _ in range(args.books)]
+        book_ids = [create_book(client, t, args.copies) for t in titles]
+        calls = [(client, "POST", f"{BOOKS}/rent/bulk", {"book_ids": book_ids}, tokens[s]) for s in students]
+        results = parallel(args.concurrency, calls)
+        check("bulk", results, failures)
+        lent = {book: 0 for book in book_ids}
+        for status, body in results:
+            if status == 200:
+                for item in body:
+                    lent[item["book_id"]] += item["status"] == "lent"
+        for book, t in zip(book_ids, titles):
+            available = copies_available(client, book, t)
+            print(f"bulk book {book}: {lent[book]} lent, {available} available")
+            if lent[book] != min(args.copies, len(students)) or available != args.copies - lent[book]:
+                failures.append(f"bulk: book {book} lent {lent[book]} with {available} of {args.copies} available")
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except Exception:
+                server.kill()
+        if workdir is not None:
+            workdir.cleanup()
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        return 1
+    print("\nNo overselling, duplicate lendings or server errors")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""
+Load test for the grading path, runnable offline on a single machine.
+
+By default it starts the API with uvicorn against a throwaway SQLite database
+and the fake Gemini backend (GEMINI_BACKEND=fake), then drives the submit and
+evaluate endpoints at each concurrency level. For every level it reports
+p50/p95/p99 latency, throughput and errors, plus how the grading queue and the
+Gemini scheduler behaved while the requests were in flight.
+
+    python loadtest.py --concurrency 1,8,32 --requests 200
+    python loadtest.py --latency-median 4 --error-rate 0.1 --mode evaluate
+    python loadtest.py --base-url http://127.0.0.1:8000   # an already running server
+"""
+from concurrent.futures import ThreadPoolExecutor
+from jose import jwt
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+API = "/api/v1/evaluators"
+DEFAULT_SECRET = "your-super-secret-key-change-this-in-production"
+
+class Client:
+    """Minimal JSON client on http.client, one keep-alive connection per thread"""
+
+    def __init__(self, base_url: str, secret: str, timeout: float = 120.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.secret = secret
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def token(self, email: str, role: str) -> str:
+        return jwt.encode(
+            {"userId": 1, "email": email, "role": role, "exp": int(time.time()) + 24 * 3600},
+            self.secret,
+            algorithm="HS256"
+        )
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if not hasattr(self._local, "connection"):
+            self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._local.connection
+
+    def request(self, method: str, path: str, body: Any = None, token: Optional[str] = None) -> Tuple[int, Any]:
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                del self._local.connection
+                # Retry once on a fresh connection if the server closed the keep-alive one
+                if attempt or isinstance(e, TimeoutError):
+                    raise
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, data.decode("utf-8", "replace")
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class MetricsSampler:
+    """Polls /metrics in the background and keeps the peaks of the queue numbers"""
+
+    def __init__(self, client: Client, token: str, interval: float = 0.25):
+        self.client = client
+        self.token = token
+        self.interval = interval
+        self.peak: Dict[str, float] = {}
+        self.last: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self) -> Dict[str, Any]:
+        status, metrics = self.client.request("GET", f"{API}/metrics", token=self.token)
+        if status != 200:
+            return {}
+        jobs = metrics["grading_queue"]["jobs"]
+        scheduler = metrics["gemini_scheduler"]
+        values = {
+            "queued_jobs": jobs.get("queued", 0),
+            "running_jobs": jobs.get("running", 0),
+            "gemini_queue_depth": scheduler["queue_depth"],
+            "gemini_in_flight": scheduler["in_flight"]
+        }
+        for key, value in values.items():
+            self.peak[key] = max(self.peak.get(key, 0), value)
+        self.last = metrics
+        return values
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception:
+                pass
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "MetricsSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+def run_level(client: Client, concurrency: int, calls: List[Tuple[str, str, Any, str]]) -> Dict[str, Any]:
+    """Fire the calls with the given concurrency and summarise latencies"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def call(spec: Tuple[str, str, Any, str]) -> None:
+        method, path, body, token = spec
+        started = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, body, token)
+            error = None if status < 400 else str(status)
+        except Exception as e:
+            error = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, calls))
+    duration = time.perf_counter() - started
+    return {
+        "requests": len(calls),
+        "duration_s": round(duration, 2),
+        "throughput_rps": round(len(calls) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1) if latencies else 0.0,
+        "errors": errors
+    }
+
+def wait_for_drain(sampler: MetricsSampler, timeout: float) -> Optional[float]:
+    """Seconds until the grading queue is empty, or None if it did not drain in time"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        values = sampler.sample()
+        if values and values["queued_jobs"] == 0 and values["running_jobs"] == 0:
+            return round(time.perf_counter() - started, 2)
+        time.sleep(0.25)
+    return None
+
+def create_evaluator(client: Client, teacher_token: str) -> int:
+    status, body = client.request("POST", f"{API}/", {
+        "title": "Load test",
+        "description": f"Explain how photosynthesis works ({uuid.uuid4().hex[:8]})",
+        "type": "quiz",
+        "submission_type": "text",
+        "is_auto_eval": True,
+        "quiz_type": "open_ended",
+        "max_attempts": 10
+    }, teacher_token)
+    if status != 200:
+        raise SystemExit(f"Could not create the evaluator: {status} {body}")
+    return body["id"]
+
+def answer(n: int) -> str:
+    # Distinct answers so neither the evaluation cache nor similarity reuse short-circuit Gemini
+    return f"Answer {n} {uuid.uuid4().hex}: plants turn light, water and carbon dioxide into glucose and oxygen."
+
+def submit_calls(client: Client, evaluator_id: int, count: int) -> List[Tuple[str, str, Any, str]]:
+    # One student per request, so the evaluator's attempt limit never kicks in
+    return [
+        ("POST", f"{API}/{evaluator_id}/submit", {"submission_content": answer(n)},
+         client.token(f"load-{uuid.uuid4().hex[:12]}@example.com", "student"))
+        for n in range(count)
+    ]
+
+def evaluate_calls(client: Client, evaluator_id: int, teacher_token: str, count: int) -> List[Tuple[str, str, Any, str]]:
+    """Create the submissions up front, let the workers grade them, then re-evaluate them on demand"""
+    specs = submit_calls(client, evaluator_id, count)
+    submission_ids = []
+    for _, path, body, token in specs:
+        status, submission = client.request("POST", path, body, token)
+        if status != 200:
+            raise SystemExit(f"Could not create a submission: {status} {submission}")
+        submission_ids.append(submission["id"])
+    return [
+        ("POST", f"{API}/{evaluator_id}/evaluate?submission_id={submission_id}", None, teacher_token)
+        for submission_id in submission_ids
+    ]
+
+def bump_version(client: Client, evaluator_id: int, teacher_token: str) -> None:
+    """Edit the evaluator so earlier cached evaluations no longer apply"""
+    client.request("PUT", f"{API}/{evaluator_id}", {
+        "description": f"Explain how photosynthesis works ({uuid.uuid4().hex[:8]})"
+    }, teacher_token)
+
+def spawn_server(args: argparse.Namespace) -> Tuple[subprocess.Popen, tempfile.TemporaryDirectory]:
+    client = Client(f"http://127.0.0.1:{args.port}", args.secret)
+    try:
+        client.request("GET", "/")
+        raise SystemExit(f"Port {args.port} is already in use; pass --port or --base-url")
+    except OSError:
+        pass
+    workdir = tempfile.TemporaryDirectory(prefix="load-test-")
+    env = dict(
+        os.environ,
+        GEMINI_BACKEND="fake",
+        SECRET_KEY=args.secret,
+        FAKE_GEMINI_LATENCY_MEDIAN=str(args.latency_median),
+        FAKE_GEMINI_LATENCY_SIGMA=str(args.latency_sigma),
+        FAKE_GEMINI_ERROR_RATE=str(args.error_rate),
+        FAKE_GEMINI_STREAM_CHUNKS=str(args.stream_chunks),
+        PYTHONPATH=str(Path(__file__).resolve().parent)
+    )
+    # Runs in the temporary directory so the default SQLite database is created there
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=workdir.name,
+        env=env
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("The API server exited during startup")
+        try:
+            client.request("GET", "/")
+            return server, workdir
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("The API server did not start within 60 seconds")
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    columns = ["mode", "concurrency", "requests", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+               "errors", "peak_queued_jobs", "peak_gemini_queue", "drain_s"]
+    rows = [[str(r.get(c, "")) for c in columns] for r in results]
+    widths = [max(len(c), *(len(row[i]) for row in rows)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the submit and evaluate endpoints")
+    parser.add_argument("--base-url", help="Test a running server instead of starting one with the fake backend")
+    parser.add_argument("--port", type=int, default=8799, help="Port for the spawned server")
+    parser.add_argument("--secret", default=os.getenv("SECRET_KEY", DEFAULT_SECRET), help="JWT secret of the server")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per level")
+    parser.add_argument("--mode", choices=["submit", "evaluate", "both"], default="both")
+    parser.add_argument("--latency-median", type=float, default=2.0, help="Fake Gemini median latency (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Fake Gemini log-normal sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake Gemini calls that fail")
+    parser.add_argument("--stream-chunks", type=int, default=8, help="Chunks per streamed fake response")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (s)")
+    parser.add_argument("--drain-timeout", type=float, default=600.0, help="Max seconds to wait for queued grading")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    modes = ["submit", "evaluate"] if args.mode == "both" else [args.mode]
+
+    server = workdir = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server, workdir = spawn_server(args)
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"Started the API on {base_url} with the fake Gemini backend "
+              f"(median {args.latency_median}s, sigma {args.latency_sigma}, error rate {args.error_rate})")
+
+    client = Client(base_url, args.secret, args.timeout)
+    # Evaluators are created through the API without a teacher, so they belong to "demo-teacher"
+    teacher_token = client.token("demo-teacher", "instructor")
+    results = []
+    try:
+        evaluator_id = create_evaluator(client, teacher_token)
+        for mode in modes:
+            for concurrency in levels:
+                if mode == "submit":
+                    calls = submit_calls(client, evaluator_id, args.requests)
+                else:
+                    calls = evaluate_calls(client, evaluator_id, teacher_token, args.requests)
+                sampler = MetricsSampler(client, teacher_token)
+                if wait_for_drain(sampler, args.drain_timeout) is None:
+                    print("Warning: grading queue did not drain before the level started")
+                if mode == "evaluate":
+                    bump_version(client, evaluator_id, teacher_token)
+                sampler.peak.clear()
+                with sampler:
+                    result = run_level(client, concurrency, calls)
+                    # For submit, grading continues after the responses; measure how long it takes to catch up
+                    drain = wait_for_drain(sampler, args.drain_timeout) if mode == "submit" else None
+                result.update({
+                    "mode": mode,
+                    "concurrency": concurrency,
+                    "peak_queued_jobs": int(sampler.peak.get("queued_jobs", 0)),
+                    "peak_gemini_queue": int(sampler.peak.get("gemini_queue_depth", 0)),
+                    "drain_s": drain if drain is not None else "",
+                    "gemini_p95_wait_ms": sampler.last.get("gemini_scheduler", {}).get("p95_wait_ms")
+                })
+                results.append(result)
+                print(f"{mode} x{concurrency}: p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+                      f"p99 {result['p99_ms']}ms, {result['throughput_rps']} req/s, errors {result['errors']}")
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            workdir.cleanup()
+
+    print()
+    print_report(results)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
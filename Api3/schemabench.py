@@ -0,0 +1,154 @@
+"""
+Per-item cost of serializing evaluators through the response schemas.
+
+Seeds a temporary SQLite database with --items evaluators (20-question quiz
+data, no deadline) and one submission per evaluator, then times turning the
+whole page into JSON bytes:
+
+- legacy: to_dict() validated into the old EvaluatorResponse, which inherited
+  EvaluatorBase and its request validators (title regex, deadline in the
+  future, quiz data checks)
+- lean: the current EvaluatorResponse, read straight from the ORM rows
+- to_dict: to_dict() encoded as it is, without a schema
+
+The same comparison runs for submissions with their evaluator nested
+(SubmissionResponse, as /submit and /grade return). Finally it checks that an
+evaluator with a deadline, past or future, serializes: the legacy deadline
+check compared to_dict()'s isoformat string with a datetime and raised.
+
+    python schemabench.py
+    python schemabench.py --items 1000 --repeat 20
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+_workdir = tempfile.TemporaryDirectory(prefix="schema-bench-")
+# Settings are read at import time, so the database has to be chosen first
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_workdir.name) / 'bench.db'}"
+
+from pydantic import BaseModel, TypeAdapter, ValidationError, model_validator
+
+from app.database.bootstrap import prepare_database
+from app.database.database import SessionLocal
+from app.models.evaluator import Evaluator, EvaluatorSubmission
+from app.schemas.evaluator import EvaluatorBase, EvaluatorResponse, SubmissionResponse
+from app.utils.serialization import dumps
+
+class LegacyEvaluatorResponse(EvaluatorBase):
+    """EvaluatorResponse as it was: request validators included"""
+    id: int
+    teacher_username: str
+    created_at: datetime
+
+    @model_validator(mode='before')
+    @classmethod
+    def convert_auto_eval(cls, data):
+        if not isinstance(data, dict):
+            data = dict(data)
+        if 'is_auto_eval' in data and isinstance(data['is_auto_eval'], int):
+            data['is_auto_eval'] = bool(data['is_auto_eval'])
+        return data
+
+class LegacySubmissionResponse(BaseModel):
+    id: int
+    evaluator_id: int
+    student_username: str
+    submission_content: str
+    submission_date: datetime
+    provisional_grade: Optional[int] = None
+    final_grade: Optional[int] = None
+    feedback: Optional[str] = None
+    status: str
+    evaluator: Optional[LegacyEvaluatorResponse] = None
+
+def seed(db, items: int) -> None:
+    evaluators = [
+        Evaluator(
+            title=f"Photosynthesis quiz {n}",
+            description="Multiple choice quiz about the light-dependent reactions",
+            type="quiz",
+            submission_type="text",
+            is_auto_eval=1,
+            quiz_type="multiple_choice",
+            quiz_data={"questions": [f"Question {q}?" for q in range(20)], "correct_answers": ["A"] * 20},
+            teacher_username="teacher@example.com"
+        )
+        for n in range(items)
+    ]
+    db.add_all(evaluators)
+    db.flush()
+    db.add_all([
+        EvaluatorSubmission(
+            evaluator_id=evaluator.id,
+            student_username="student@example.com",
+            submission_content="A,B,C,D," * 5,
+            status="graded",
+            final_grade=90
+        )
+        for evaluator in evaluators
+    ])
+    db.commit()
+
+def validated(schema: Any, content: List[Any]) -> bytes:
+    adapter = TypeAdapter(List[schema])
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+def per_item_us(run: Callable[[], bytes], items: int, repeat: int) -> float:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - started)
+    return round(statistics.median(latencies) / items * 1_000_000, 2)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-item cost of the evaluator response schemas")
+    parser.add_argument("--items", type=int, default=1000, help="Rows in the page")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs of each serializer")
+    args = parser.parse_args()
+
+    prepare_database()
+    with SessionLocal() as db:
+        seed(db, args.items)
+        evaluators = db.query(Evaluator).order_by(Evaluator.id).all()
+        submissions = db.query(EvaluatorSubmission).order_by(EvaluatorSubmission.id).all()
+
+        results = {
+            "evaluators": {
+                "legacy": per_item_us(lambda: validated(LegacyEvaluatorResponse, [e.to_dict() for e in evaluators]), args.items, args.repeat),
+                "lean": per_item_us(lambda: validated(EvaluatorResponse, evaluators), args.items, args.repeat),
+                "to_dict": per_item_us(lambda: dumps([e.to_dict() for e in evaluators]), args.items, args.repeat)
+            },
+            "submissions with evaluator": {
+                "legacy": per_item_us(lambda: validated(LegacySubmissionResponse, [s.to_dict() for s in submissions]), args.items, args.repeat),
+                "lean": per_item_us(lambda: validated(SubmissionResponse, submissions), args.items, args.repeat),
+                "to_dict": per_item_us(lambda: dumps([s.to_dict() for s in submissions]), args.items, args.repeat)
+            }
+        }
+
+        print(f"Microseconds per item, page of {args.items}\n")
+        print(f"{'':28}{'legacy':>10}{'lean':>10}{'to_dict':>10}")
+        for name, row in results.items():
+            print(f"{name:28}{row['legacy']:>10}{row['lean']:>10}{row['to_dict']:>10}")
+
+        print()
+        for label, days in (("future", 30), ("past", -1)):
+            evaluators[0].deadline = datetime.now() + timedelta(days=days)
+            try:
+                validated(LegacyEvaluatorResponse, [evaluators[0].to_dict()])
+                legacy = "ok"
+            except (ValidationError, TypeError) as e:
+                legacy = f"fails ({type(e).__name__})"
+            validated(EvaluatorResponse, [evaluators[0]])
+            print(f"{label.capitalize()} deadline: legacy {legacy}, lean ok")
+        db.rollback()
+    _workdir.cleanup()
+
+if __name__ == "__main__":
+    main()
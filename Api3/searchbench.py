@@ -0,0 +1,116 @@
+"""
+Search latency benchmark: leading-wildcard LIKE scans vs the full-text index.
+
+Seeds a temporary SQLite database with a catalog of books, then times the
+first and second page of a set of searches both ways: the ILIKE filter the
+book search used to run, and app.utils.search (FTS5, bm25-ranked and
+highlighted). Reports p50/p95 latency and result counts for each.
+
+    python searchbench.py
+    python searchbench.py --books 500000 --repeat 50
+"""
+from pathlib import Path
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+import argparse
+import random
+import tempfile
+import time
+
+from app.database.database import Base, create_db_engine
+from app.models.book import Book
+from app.utils.search import search
+
+SUBJECTS = [
+    "python", "physics", "chemistry", "biology", "history", "algebra", "calculus", "economics",
+    "philosophy", "geometry", "statistics", "astronomy", "literature", "databases", "networks"
+]
+WORDS = [
+    "introduction", "advanced", "principles", "handbook", "modern", "applied", "theory", "practice",
+    "fundamentals", "guide", "essentials", "concepts", "methods", "analysis", "foundations", "course"
+]
+QUERIES = ["python", "advanced calculus", "intro", "statistics methods", "quantum"]
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def seed(engine, books: int) -> None:
+    rng = random.Random(7)
+    with engine.begin() as connection:
+        # Inserted in chunks so the FTS triggers run on a realistic write pattern
+        for start in range(0, books, 10_000):
+            connection.execute(insert(Book), [
+                {
+                    "title": " ".join(rng.sample(WORDS, 2) + rng.sample(SUBJECTS, 1) + [f"vol{rng.randrange(1000)}"]),
+                    "tags": ",".join(rng.sample(SUBJECTS, 2)),
+                    "copies_owned": 1,
+                    "copies_available": 1
+                }
+                for _ in range(start, min(start + 10_000, books))
+            ])
+
+def page_params(limit: int, after: Any = None) -> SimpleNamespace:
+    # Stands in for PageParams outside a request
+    return SimpleNamespace(after=after, limit=limit, unpaginated=False, set_headers=lambda cursor: None)
+
+def like_search(db, text: str, limit: int) -> int:
+    return len(db.query(Book).filter(
+        (Book.title.ilike(f"%{text}%")) | (Book.tags.ilike(f"%{text}%"))
+    ).order_by(Book.created_at, Book.id).limit(limit + 1).all())
+
+def fts_search(db, text: str, limit: int) -> int:
+    first = search(db, Book, text, page_params(limit))
+    if first.items and first.has_more:
+        last = first.items[-1]
+        search(db, Book, text, page_params(limit, (last.score, last.row.id)))
+    return len(first.items)
+
+def timed(run: Callable[[], int], repeat: int) -> Dict[str, Any]:
+    latencies, rows = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = run()
+        latencies.append(time.perf_counter() - started)
+    return {"rows": rows, "p50_ms": round(percentile(latencies, 50) * 1000, 2), "p95_ms": round(percentile(latencies, 95) * 1000, 2)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare LIKE and full-text book search latency")
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs of each query")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory(prefix="searchbench-")
+    engine = create_db_engine(f"sqlite:///{Path(workdir.name) / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    seed(engine, args.books)
+    print(f"Seeded {args.books} books in {time.perf_counter() - started:.1f}s\n")
+
+    rows = []
+    with sessionmaker(bind=engine)() as db:
+        for text in QUERIES:
+            like = timed(lambda: like_search(db, text, args.limit), args.repeat)
+            fts = timed(lambda: fts_search(db, text, args.limit), args.repeat)
+            rows.append({
+                "query": text,
+                "like_p50_ms": like["p50_ms"],
+                "like_p95_ms": like["p95_ms"],
+                "fts_p50_ms": fts["p50_ms"],
+                "fts_p95_ms": fts["p95_ms"],
+                "fts_rows": fts["rows"]
+            })
+    engine.dispose()
+    workdir.cleanup()
+
+    columns = list(rows[0])
+    widths = [max(len(c), *(len(str(row[c])) for row in rows)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+
+if __name__ == "__main__":
+    main()
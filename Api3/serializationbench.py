@@ -0,0 +1,168 @@
+"""
+Serialization micro-benchmark for the largest list endpoints.
+
+Seeds a temporary SQLite database, loads one full page (PAGE_SIZE_MAX rows)
+for each endpoint, then times turning it into response bytes two ways:
+
+- default: what FastAPI does with an endpoint's return value, validating it
+  against the route's response_model, dumping it back to Python objects and
+  encoding those with the standard JSONResponse
+- single-pass: app.utils.serialization.json_response, as the endpoints now do
+
+Both outputs are checked to decode to the same JSON. Also reports the
+payload size and the time to gzip and brotli it.
+
+    python serializationbench.py
+    python serializationbench.py --repeat 200
+"""
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import statistics
+import tempfile
+import time
+
+_workdir = tempfile.TemporaryDirectory(prefix="serialization-bench-")
+# Settings are read at import time, so the database has to be chosen first
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_workdir.name) / 'bench.db'}"
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.config import get_settings
+from app.database.bootstrap import prepare_database
+from app.database.database import SessionLocal
+from app.main import app
+from app.models.book import Book, BookLending
+from app.models.evaluator import Evaluator, EvaluatorSubmission
+from app.models.video import VideoLecture
+from app.schemas.book import BookLendingResponse, BookResponse
+from app.schemas.video import VideoLectureResponse
+from app.utils.compression import brotli
+from app.utils.serialization import json_response
+
+STUDENT = "student@example.com"
+
+def seed(db, rows: int) -> None:
+    for n in range(rows):
+        evaluator = Evaluator(
+            title=f"Quiz {n}",
+            description="Seeded multiple choice quiz about cell biology and photosynthesis",
+            type="quiz",
+            submission_type="text",
+            quiz_type="multiple_choice",
+            quiz_data={"questions": [f"Question {q} about the topic?" for q in range(20)], "correct_answers": ["A"] * 20},
+            teacher_username="teacher@example.com"
+        )
+        book = Book(title=f"Book {n}", file_path="book.pdf", copies_owned=2, copies_available=1, tags="biology,cells")
+        db.add_all([evaluator, book])
+        db.flush()
+        db.add_all([
+            EvaluatorSubmission(
+                evaluator_id=1,
+                student_username=f"student{n}@example.com",
+                submission_content="Plants convert light energy into chemical energy stored in glucose. " * 5,
+                status="graded",
+                provisional_grade=80,
+                final_grade=85,
+                feedback="Good explanation of the light-dependent reactions."
+            ),
+            BookLending(book_id=book.id, username=STUDENT),
+            VideoLecture(
+                title=f"Lecture {n}",
+                description="Seeded lecture on the structure of plant and animal cells",
+                video_url="https://example.com/watch",
+                teacher_username="teacher@example.com",
+                subject="Biology",
+                topic="Cells"
+            )
+        ])
+    db.commit()
+
+def route(path: str) -> APIRoute:
+    return next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path and "GET" in r.methods)
+
+def default_path(path: str, content: Any, loop: asyncio.AbstractEventLoop) -> Callable[[], bytes]:
+    field = route(path).response_field
+
+    def run() -> bytes:
+        return JSONResponse(loop.run_until_complete(serialize_response(field=field, response_content=content))).body
+    return run
+
+def timed(run: Callable[[], bytes], repeat: int) -> float:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies) * 1000
+
+def cases(db, limit: int) -> Dict[str, Dict[str, Any]]:
+    books = db.query(Book).order_by(Book.created_at, Book.id).limit(limit).all()
+    lendings = db.query(BookLending).filter(BookLending.username == STUDENT).limit(limit).all()
+    videos = db.query(VideoLecture).order_by(VideoLecture.created_at, VideoLecture.id).limit(limit).all()
+    submissions = [s.to_dict(evaluator_detail=False) for s in db.query(EvaluatorSubmission).limit(limit).all()]
+    evaluators = {
+        "items": [e.to_dict() for e in db.query(Evaluator).limit(limit).all()],
+        "total": limit,
+        "limit": limit,
+        "has_more": True,
+        "next_cursor": "cursor"
+    }
+    return {
+        "/api/v1/books/available": {"content": books, "schema": List[BookResponse]},
+        "/api/v1/books/active": {"content": lendings, "schema": List[BookLendingResponse]},
+        "/api/v1/video-lectures/": {"content": videos, "schema": List[VideoLectureResponse]},
+        "/api/v1/evaluators/{evaluator_id}/submissions": {"content": submissions, "schema": None},
+        "/api/v1/evaluators/list": {"content": evaluators, "schema": None}
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare default and single-pass response serialization")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs of each serializer")
+    args = parser.parse_args()
+    limit = get_settings().PAGE_SIZE_MAX
+
+    prepare_database()
+    loop = asyncio.new_event_loop()
+    rows = []
+    with SessionLocal() as db:
+        seed(db, limit)
+        for path, case in cases(db, limit).items():
+            content, schema = case["content"], case["schema"]
+            default = default_path(path, content, loop)
+            single = lambda: json_response(content, schema).body
+            body = single()
+            if json.loads(default()) != json.loads(body):
+                raise SystemExit(f"{path}: the single-pass output differs from the default one")
+            compressed_gzip = gzip.compress(body, compresslevel=get_settings().COMPRESSION_GZIP_LEVEL)
+            row = {
+                "endpoint": path,
+                "rows": limit,
+                "default_ms": round(timed(default, args.repeat), 2),
+                "single_pass_ms": round(timed(single, args.repeat), 2),
+                "kb": round(len(body) / 1024, 1),
+                "gzip_kb": round(len(compressed_gzip) / 1024, 1),
+                "gzip_ms": round(timed(lambda: gzip.compress(body, compresslevel=get_settings().COMPRESSION_GZIP_LEVEL), args.repeat), 2)
+            }
+            if brotli is not None:
+                quality = get_settings().COMPRESSION_BROTLI_QUALITY
+                row["br_kb"] = round(len(brotli.compress(body, quality=quality)) / 1024, 1)
+                row["br_ms"] = round(timed(lambda: brotli.compress(body, quality=quality), args.repeat), 2)
+            row["speedup"] = f"{row['default_ms'] / max(row['single_pass_ms'], 0.001):.1f}x"
+            rows.append(row)
+    loop.close()
+    _workdir.cleanup()
+
+    columns = list(rows[0])
+    widths = [max(len(c), *(len(str(row.get(c, ""))) for row in rows)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).ljust(w) for c, w in zip(columns, widths)))
+
+if __name__ == "__main__":
+    main()
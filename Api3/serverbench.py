@@ -0,0 +1,197 @@
+"""
+Throughput per core of the production launcher (python -m app.server) across
+worker counts, event loops and HTTP parsers.
+
+Seeds a throwaway SQLite database, then for every configuration starts the
+server against it, warms it up and drives a mix of read endpoints
+(evaluators/list, video-lectures, books/available, one page each) from
+--concurrency keep-alive connections for --duration seconds. The response
+cache is off (RESPONSE_CACHE_TTL=0) so every request does its real work.
+
+throughput_per_core divides by the cores the workers can actually use,
+min(workers, CPU cores). The load generator runs on the same machine and
+takes its share of the CPU, so compare the rows with each other rather than
+with a dedicated load-testing setup.
+
+    python serverbench.py
+    python serverbench.py --workers 1,2,4 --stacks asyncio:h11,uvloop:httptools --duration 10
+"""
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+_workdir = tempfile.TemporaryDirectory(prefix="server-bench-")
+# Settings are read at import time, so the database has to be chosen first
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_workdir.name) / 'bench.db'}"
+
+from loadtest import Client, DEFAULT_SECRET, percentile
+
+from app.database.bootstrap import prepare_database
+from app.database.database import SessionLocal
+from app.models.book import Book
+from app.models.evaluator import Evaluator
+from app.models.video import VideoLecture
+
+PATHS = [
+    "/api/v1/evaluators/list?limit=50",
+    "/api/v1/video-lectures/?limit=50",
+    "/api/v1/books/available?limit=50"
+]
+
+def seed(rows: int) -> None:
+    prepare_database()
+    with SessionLocal() as db:
+        for n in range(rows):
+            db.add_all([
+                Evaluator(
+                    title=f"Quiz {n}",
+                    description="Seeded multiple choice quiz about cell biology",
+                    type="quiz",
+                    submission_type="text",
+                    quiz_type="multiple_choice",
+                    quiz_data={"questions": [f"Question {q}?" for q in range(10)], "correct_answers": ["A"] * 10},
+                    teacher_username="teacher@example.com"
+                ),
+                Book(title=f"Book {n}", file_path="book.pdf", copies_owned=2, copies_available=1, tags="biology"),
+                VideoLecture(
+                    title=f"Lecture {n}",
+                    description="Seeded lecture on plant cells",
+                    video_url="https://example.com/watch",
+                    teacher_username="teacher@example.com",
+                    subject="Biology",
+                    topic="Cells"
+                )
+            ])
+        db.commit()
+
+def start_server(args: argparse.Namespace, workers: int, loop: str, http: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        SECRET_KEY=args.secret,
+        RESPONSE_CACHE_TTL="0",
+        GRADING_WORKERS="1",
+        CODE_RUNNER_ENABLED="false",
+        PYTHONPATH=str(Path(__file__).resolve().parent)
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--port", str(args.port), "--workers", str(workers),
+         "--loop", loop, "--http", http],
+        cwd=_workdir.name,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    client = Client(f"http://127.0.0.1:{args.port}", args.secret)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"The server exited during startup ({workers} workers, {loop}/{http})")
+        try:
+            client.request("GET", "/")
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("The server did not start within 60 seconds")
+
+def drive(args: argparse.Namespace, duration: float) -> Tuple[int, int, List[float]]:
+    client = Client(f"http://127.0.0.1:{args.port}", args.secret)
+    token = client.token("teacher@example.com", "teacher")
+    stop_at = time.perf_counter() + duration
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors = 0
+
+    def worker(offset: int) -> None:
+        nonlocal errors
+        n = offset
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                status, _ = client.request("GET", PATHS[n % len(PATHS)], token=token)
+            except OSError:
+                status = 0
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+            n += 1
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.concurrency)))
+    return len(latencies), errors, latencies
+
+def run_config(args: argparse.Namespace, workers: int, loop: str, http: str) -> Dict[str, Any]:
+    server = start_server(args, workers, loop, http)
+    try:
+        drive(args, args.warmup)
+        completed, errors, latencies = drive(args, args.duration)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    rps = completed / args.duration
+    cores = min(workers, os.cpu_count() or 1)
+    return {
+        "workers": workers,
+        "loop": loop,
+        "http": http,
+        "requests": completed,
+        "errors": errors,
+        "throughput_rps": round(rps, 1),
+        "throughput_per_core": round(rps / cores, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1)
+    }
+
+def parse_stacks(value: str) -> List[Tuple[str, str]]:
+    stacks = []
+    for stack in value.split(","):
+        loop, _, http = stack.partition(":")
+        missing = [name for name in (loop, http) if name in ("uvloop", "httptools") and find_spec(name) is None]
+        if missing:
+            print(f"Skipping {stack}: {', '.join(missing)} not installed")
+            continue
+        stacks.append((loop, http or "auto"))
+    return stacks
+
+def main() -> None:
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Throughput per core of the production launcher")
+    parser.add_argument("--workers", default=",".join(dict.fromkeys(["1", str(cores), str(cores * 2)])),
+                        help="Comma-separated worker counts")
+    parser.add_argument("--stacks", default="asyncio:h11,uvloop:httptools", help="Comma-separated loop:http pairs")
+    parser.add_argument("--concurrency", type=int, default=16, help="Keep-alive connections driving the load")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds measured per configuration")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds of unmeasured load first")
+    parser.add_argument("--rows", type=int, default=200, help="Rows seeded per table")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--secret", default=DEFAULT_SECRET)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    results = []
+    for workers in (int(w) for w in args.workers.split(",")):
+        for loop, http in parse_stacks(args.stacks):
+            results.append(run_config(args, workers, loop, http))
+            print(f"{workers} worker(s), {loop}/{http}: {results[-1]['throughput_rps']} req/s", flush=True)
+    _workdir.cleanup()
+
+    print(f"\n{cores} CPU core(s), {args.concurrency} connections, {args.duration}s per configuration\n")
+    columns = list(results[0])
+    widths = [max(len(c), *(len(str(row[c])) for row in results)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in results:
+        print("  ".join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Worker startup benchmark: import-to-ready time of the API.
+
+Every run is a fresh Python process, like a uvicorn worker: it times
+`import app.main`, then the app's lifespan startup (schema check, background
+services), against a throwaway SQLite database. The first run starts on an
+empty database, so it includes creating the schema; the others find it at
+the Alembic head. With ENVIRONMENT=production the schema is set up before
+the timed runs, since production workers don't create it. Exits 1 if any run takes longer than the budget, or if
+importing the app touched the database (DDL belongs in the lifespan).
+
+    python startupbench.py
+    python startupbench.py --runs 10 --budget-ms 1500
+    ENVIRONMENT=production python startupbench.py
+"""
+from pathlib import Path
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+WORKER = """
+import asyncio, json, os, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+touched = os.path.exists(os.environ["STARTUP_BENCH_DB"])
+
+async def start():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        ready = time.perf_counter()
+    return ready
+
+ready = asyncio.run(start())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "touched": touched
+}))
+"""
+
+def run_worker(env: Dict[str, str], cwd: str) -> Dict[str, Any]:
+    result = subprocess.run([sys.executable, "-c", WORKER], env=env, cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"Worker failed to start:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check the import-to-ready time of one API worker")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh worker processes to start")
+    parser.add_argument("--budget-ms", type=float, default=3000, help="Largest import-to-ready time allowed per worker")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory(prefix="startup-bench-")
+    database = Path(workdir.name) / "startup.db"
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{database}",
+        STARTUP_BENCH_DB=str(database),
+        GEMINI_BACKEND="fake",
+        CODE_RUNNER_ENABLED="false",
+        PYTHONPATH=str(Path(__file__).resolve().parent)
+    )
+    production = env.get("ENVIRONMENT", "").lower() == "production"
+    if production:
+        # Production won't create the schema, so one development worker sets it up first, like a deploy step
+        run_worker(dict(env, ENVIRONMENT="development"), workdir.name)
+
+    runs: List[Dict[str, Any]] = []
+    failures: List[str] = []
+    for n in range(args.runs):
+        # Run in the temporary directory so the logs/ folder lands there too
+        run = run_worker(env, workdir.name)
+        total = run["import_ms"] + run["startup_ms"]
+        runs.append(run)
+        label = "empty database" if n == 0 and not production else "at head"
+        print(f"run {n + 1} ({label}): import {run['import_ms']:.0f}ms, startup {run['startup_ms']:.0f}ms, total {total:.0f}ms")
+        if total > args.budget_ms:
+            failures.append(f"run {n + 1} took {total:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+        if run["touched"] and n == 0 and not production:
+            failures.append("importing the app created the database")
+    workdir.cleanup()
+
+    print(
+        f"\nmedian: import {statistics.median(r['import_ms'] for r in runs):.0f}ms, "
+        f"startup {statistics.median(r['startup_ms'] for r in runs):.0f}ms"
+    )
+    if failures:
+        print("\n" + "\n".join(failures))
+        return 1
+    print(f"Every worker was ready within {args.budget_ms:.0f}ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())